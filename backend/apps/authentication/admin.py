@@ -15,7 +15,7 @@ class UserAdmin(BaseUserAdmin):
         'user_type', 'center', 'is_active', 'is_center_admin',
         'is_locked', 'date_joined', 'last_login'
     ]
-    search_fields = ['username', 'email', 'first_name', 'last_name', 'phone_number']
+    search_fields = ['username', 'email', 'first_name', 'last_name', 'phone_number', 'army_no']
     ordering = ['username']
     list_per_page = 25
     
@@ -25,7 +25,7 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('first_name', 'last_name', 'email', 'phone_number')
         }),
         (_('System info'), {
-            'fields': ('user_type', 'center', 'is_center_admin')
+            'fields': ('user_type', 'center', 'army_no', 'is_center_admin')
         }),
         (_('Permissions'), {
             'fields': ('is_active', 'is_staff', 'is_superuser', 'is_locked', 'groups', 'user_permissions'),
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .principals import principals
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the user from the principal cache.
+
+    Behaves like simplejwt's ``JWTAuthentication`` but does not query the
+    database while the cached principal is current. Tokens issued before the
+    user's ``tokens_revoked_at`` are rejected.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = principals.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if user.tokens_revoked_at is not None:
+            issued_at = datetime.fromtimestamp(validated_token.get('iat', 0), tz=dt_timezone.utc)
+            if issued_at < user.tokens_revoked_at.replace(microsecond=0):
+                raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
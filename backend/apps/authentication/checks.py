@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from .principals import cache_is_process_local
+
+
+@register(Tags.caches)
+def check_principal_cache_backend(app_configs, **kwargs):
+    """Warn that a process-local cache costs every authenticated request a query."""
+    if settings.DEBUG or not cache_is_process_local():
+        return []
+    return [Warning(
+        f"CACHE_BACKEND {settings.CACHES['default']['BACKEND']} is local to each process.",
+        hint=(
+            "Cached users are then revalidated against the database on every request. "
+            "Point CACHE_BACKEND/CACHE_LOCATION at a shared cache such as Redis to "
+            "authenticate without queries."
+        ),
+        id='authentication.W001',
+    )]
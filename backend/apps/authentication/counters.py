@@ -0,0 +1,86 @@
+"""
+Incrementally maintained counters behind the system status endpoint.
+
+Signal handlers adjust a ``SystemCounter`` row with an ``F()`` update in the
+same transaction as the change that caused it, so the status endpoint reads
+a handful of precomputed rows instead of counting whole tables. Failed logins
+are counted in hourly buckets; "recent" covers the current and previous hour.
+``reconcile()`` recounts everything from the source tables to correct drift
+from bulk operations that bypass signals.
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SystemCounter, User, Center, UserSession, LoginAttempt
+
+
+TOTAL_USERS = 'total_users'
+ACTIVE_USERS = 'active_users'
+TOTAL_CENTERS = 'total_centers'
+ACTIVE_CENTERS = 'active_centers'
+ACTIVE_SESSIONS = 'active_sessions'
+FAILED_LOGINS_PREFIX = 'failed_logins:'
+
+BUCKET_FORMAT = '%Y%m%d%H'
+
+
+def failed_logins_bucket(moment):
+    return FAILED_LOGINS_PREFIX + moment.astimezone(dt_timezone.utc).strftime(BUCKET_FORMAT)
+
+
+def recent_buckets(now=None):
+    now = now or timezone.now()
+    return [failed_logins_bucket(now), failed_logins_bucket(now - timedelta(hours=1))]
+
+
+def increment(name, delta=1):
+    """Adjust a counter, creating it on first use."""
+    if not delta:
+        return
+    updated = SystemCounter.objects.filter(name=name).update(value=F('value') + delta)
+    if not updated:
+        counter, created = SystemCounter.objects.get_or_create(name=name, defaults={'value': delta})
+        if not created:
+            SystemCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def snapshot():
+    """Return the status counters with a single indexed query."""
+    names = [TOTAL_USERS, ACTIVE_USERS, TOTAL_CENTERS, ACTIVE_CENTERS, ACTIVE_SESSIONS]
+    buckets = recent_buckets()
+    values = dict(
+        SystemCounter.objects.filter(name__in=names + buckets).values_list('name', 'value')
+    )
+    data = {name: values.get(name, 0) for name in names}
+    data['recent_failed_attempts'] = sum(values.get(bucket, 0) for bucket in buckets)
+    return data
+
+
+def reconcile():
+    """Recount every counter from its source table and drop stale buckets."""
+    now = timezone.now()
+    since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+    values = {
+        TOTAL_USERS: User.objects.count(),
+        ACTIVE_USERS: User.objects.filter(is_active=True).count(),
+        TOTAL_CENTERS: Center.objects.count(),
+        ACTIVE_CENTERS: Center.objects.filter(is_active=True).count(),
+        ACTIVE_SESSIONS: UserSession.objects.filter(is_active=True).count(),
+    }
+    for bucket in recent_buckets(now):
+        values[bucket] = 0
+    for timestamp in LoginAttempt.objects.filter(success=False, timestamp__gte=since).values_list('timestamp', flat=True):
+        bucket = failed_logins_bucket(timestamp)
+        if bucket in values:
+            values[bucket] += 1
+
+    with transaction.atomic():
+        for name, value in values.items():
+            SystemCounter.objects.update_or_create(name=name, defaults={'value': value})
+        SystemCounter.objects.filter(name__startswith=FAILED_LOGINS_PREFIX).exclude(
+            name__in=recent_buckets(now)
+        ).delete()
+    return values
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.authentication import counters
+
+
+class Command(BaseCommand):
+    help = "Recount the system status counters from their source tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and reconcile every N seconds (default: run once)",
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            values = counters.reconcile()
+            for name, value in sorted(values.items()):
+                self.stdout.write(f"{name}: {value}")
+            self.stdout.write(self.style.SUCCESS("Counters reconciled"))
+            if not interval:
+                return
+            close_old_connections()
+            time.sleep(interval)
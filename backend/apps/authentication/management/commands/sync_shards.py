@@ -0,0 +1,29 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.models import Center, User
+from utils.sharding import replica_aliases, replicate, sharding_enabled
+
+
+class Command(BaseCommand):
+    help = "Migrate every center shard and copy centers and users into it"
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            raise CommandError("CENTER_SHARDS is not set")
+
+        os.makedirs(settings.SHARD_DIR, exist_ok=True)
+        for alias in replica_aliases():
+            self.stdout.write(f"Migrating {alias}")
+            call_command('migrate', database=alias, run_syncdb=True, verbosity=0, interactive=False)
+
+        # Centers first: users reference them
+        replicate(Center.objects.all().iterator(chunk_size=1000))
+        replicate(User.objects.all().iterator(chunk_size=1000))
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {Center.objects.count()} centers and {User.objects.count()} users "
+            f"to {len(replica_aliases())} shards"
+        ))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_remove_center_country_alter_center_city_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginattempt',
+            index=models.Index(fields=['-timestamp', '-id'], name='login_attempt_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(fields=['-login_time', '-id'], name='user_session_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_alter_loginattempt_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='tokens_revoked_at',
+            field=models.DateTimeField(blank=True, help_text='Access tokens issued before this time are rejected', null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    User = apps.get_model('authentication', 'User')
+    Center = apps.get_model('authentication', 'Center')
+    UserSession = apps.get_model('authentication', 'UserSession')
+    SystemCounter = apps.get_model('authentication', 'SystemCounter')
+    SystemCounter.objects.using(db_alias).bulk_create([
+        SystemCounter(name='total_users', value=User.objects.using(db_alias).count()),
+        SystemCounter(name='active_users', value=User.objects.using(db_alias).filter(is_active=True).count()),
+        SystemCounter(name='total_centers', value=Center.objects.using(db_alias).count()),
+        SystemCounter(name='active_centers', value=Center.objects.using(db_alias).filter(is_active=True).count()),
+        SystemCounter(name='active_sessions', value=UserSession.objects.using(db_alias).filter(is_active=True).count()),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_user_tokens_revoked_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'System Counter',
+                'verbose_name_plural': 'System Counters',
+                'db_table': 'system_counters',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
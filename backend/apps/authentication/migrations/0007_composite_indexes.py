@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_systemcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginattempt',
+            index=models.Index(fields=['username', '-timestamp'], name='login_attempt_username_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loginattempt',
+            index=models.Index(fields=['ip_address', '-timestamp'], name='login_attempt_ip_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(fields=['user', 'is_active'], name='user_session_active_idx'),
+        ),
+    ]
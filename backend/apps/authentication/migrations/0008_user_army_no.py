@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='army_no',
+            field=models.CharField(blank=True, help_text='Army number of the candidate this account sits exams as', max_length=20, null=True, unique=True),
+        ),
+    ]
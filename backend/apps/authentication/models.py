@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -32,6 +33,14 @@ class User(AbstractUser):
         help_text=_('Center this user belongs to')
     )
     
+    army_no = models.CharField(
+        max_length=20,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text=_('Army number of the candidate this account sits exams as')
+    )
+    
     phone_number = models.CharField(
         max_length=15,
         blank=True,
@@ -59,6 +68,12 @@ class User(AbstractUser):
         help_text=_('Whether account is locked due to failed attempts')
     )
     
+    tokens_revoked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_('Access tokens issued before this time are rejected')
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -75,6 +90,12 @@ class User(AbstractUser):
         return full_name if full_name else self.username
 
 
+class CenterQuerySet(models.QuerySet):
+    
+    def get_by_natural_key(self, code):
+        return self.get(code=code)
+
+
 class Center(models.Model):
     """
     Model representing examination centers.
@@ -174,6 +195,9 @@ class Center(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Centers are matched by code between nodes, whose primary keys differ
+    objects = CenterQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Center')
         verbose_name_plural = _('Centers')
@@ -183,6 +207,9 @@ class Center(models.Model):
     def __str__(self):
         return f"{self.name} ({self.code})"
 
+    def natural_key(self):
+        return (self.code,)
+
     def save(self, *args, **kwargs):
         # Auto-fill city with the state capital if not provided or mismatched
         capital = self.STATE_CAPITALS.get(self.state)
@@ -225,6 +252,10 @@ class UserSession(models.Model):
         verbose_name_plural = _('User Sessions')
         db_table = 'user_sessions'
         ordering = ['-login_time']
+        indexes = [
+            models.Index(fields=['-login_time', '-id'], name='user_session_keyset_idx'),
+            models.Index(fields=['user', 'is_active'], name='user_session_active_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.ip_address} ({self.login_time})"
@@ -238,14 +269,41 @@ class LoginAttempt(models.Model):
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True)
     success = models.BooleanField(default=False)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set explicitly by the buffered recorder, which writes attempts after the fact
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = _('Login Attempt')
         verbose_name_plural = _('Login Attempts')
         db_table = 'login_attempts'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='login_attempt_keyset_idx'),
+            models.Index(fields=['username', '-timestamp'], name='login_attempt_username_idx'),
+            models.Index(fields=['ip_address', '-timestamp'], name='login_attempt_ip_idx'),
+        ]
     
     def __str__(self):
         status = "Success" if self.success else "Failed"
         return f"{self.username} - {self.ip_address} - {status} ({self.timestamp})"
+
+
+class SystemCounter(models.Model):
+    """
+    Precomputed counter read by the system status endpoint.
+
+    Values are adjusted by model signals as rows change and corrected by the
+    ``reconcile_counters`` management command.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('System Counter')
+        verbose_name_plural = _('System Counters')
+        db_table = 'system_counters'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} = {self.value}"
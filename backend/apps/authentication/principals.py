@@ -0,0 +1,118 @@
+"""
+Per-process cache of authenticated user principals.
+
+Each entry holds a ``User`` (with its ``center`` already joined) together
+with the user's auth version at load time. The current version lives in the
+shared Django cache and is replaced whenever the user or their center is
+saved, the password changes, the account is locked or the user is forced
+out, so a stale entry is detected with a single cache read and reloaded.
+
+A process-local cache (locmem, dummy) cannot carry a version bump to other
+worker processes, which would keep serving a deactivated or logged-out user
+until the entry expires. With such a backend the version is instead the
+user's revocation stamp, read from the database with one primary key lookup.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User
+
+
+VERSION_KEY = 'auth-version:{user_id}'
+
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+# Columns whose change must invalidate a cached principal
+STAMP_FIELDS = (
+    'password', 'is_active', 'is_locked', 'tokens_revoked_at', 'user_type',
+    'is_center_admin', 'updated_at', 'center_id', 'center__updated_at',
+)
+
+
+def cache_is_process_local():
+    return settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_BACKENDS
+
+
+def revocation_stamp(user_id):
+    """The user's ``STAMP_FIELDS`` from the database, or ``None`` if there is no such user."""
+    return User.objects.filter(pk=user_id).values_list(*STAMP_FIELDS).first()
+
+
+def current_version(user_id):
+    """Return the user's auth version, minting a fresh one if it is unknown."""
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # A missing version (eviction, restart) must invalidate every
+        # process's cached principal, so a new random version is minted.
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*user_ids):
+    """Invalidate cached principals for ``user_ids`` in every process."""
+    cache.set_many(
+        {VERSION_KEY.format(user_id=user_id): uuid.uuid4().hex for user_id in user_ids},
+        timeout=None,
+    )
+
+
+class PrincipalCache:
+    """Thread-safe LRU of users keyed by id, validated against the auth version."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """
+        Return a private copy of the user, or ``None`` if the user does not exist.
+        """
+        if cache_is_process_local():
+            version = revocation_stamp(user_id)
+            if version is None:
+                return None
+        else:
+            version = current_version(user_id)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return copy.copy(entry[2])
+            self.misses += 1
+
+        user = User.objects.select_related('center').filter(pk=user_id).first()
+        if user is None:
+            return None
+        with self.lock:
+            self.entries[user_id] = (version, now + self.ttl, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return copy.copy(user)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+principals = PrincipalCache(
+    max_size=settings.AUTH_PRINCIPAL_CACHE_SIZE,
+    ttl=settings.AUTH_PRINCIPAL_CACHE_TTL,
+)
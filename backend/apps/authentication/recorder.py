@@ -0,0 +1,220 @@
+"""
+Buffered recorder for login attempts.
+
+Logins at the start of an exam arrive in bursts, and inserting a
+``LoginAttempt`` row inside every login request turns that burst into a
+write storm. Attempts are queued in-process instead and written with
+``bulk_create`` once ``LOGIN_ATTEMPT_BATCH_SIZE`` records are waiting or the
+oldest has waited ``LOGIN_ATTEMPT_FLUSH_INTERVAL_MS``.
+
+Brute-force detection must not lag behind the database, so recent failures
+are also counted in memory per username and per IP address.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from utils.writes import run_serialized
+from . import counters
+from .models import LoginAttempt
+
+
+logger = logging.getLogger(__name__)
+
+
+class FailureCounter:
+    """Sliding-window count of failed logins per key."""
+
+    def __init__(self, window):
+        self.window = window
+        self.failures = defaultdict(deque)
+        self.lock = threading.Lock()
+
+    def _prune(self, key, now):
+        events = self.failures.get(key)
+        if events is None:
+            return 0
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self.failures[key]
+            return 0
+        return len(events)
+
+    def add(self, key):
+        now = time.monotonic()
+        with self.lock:
+            self._prune(key, now)
+            self.failures[key].append(now)
+
+    def count(self, key):
+        with self.lock:
+            return self._prune(key, time.monotonic())
+
+    def reset(self, key):
+        with self.lock:
+            self.failures.pop(key, None)
+
+    def purge(self):
+        """Drop keys whose failures have all expired."""
+        now = time.monotonic()
+        with self.lock:
+            for key in list(self.failures):
+                self._prune(key, now)
+
+    def total(self):
+        with self.lock:
+            return sum(len(events) for events in self.failures.values())
+
+
+class LoginAttemptRecorder:
+    """Queue login attempts in memory and write them in batches."""
+
+    def __init__(self, batch_size, flush_interval_ms, failure_window, failure_limit):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.failure_limit = failure_limit
+        self.failures = FailureCounter(failure_window)
+        self.queue = []
+        self.oldest_queued_at = None
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+        self.stopped = False
+
+        self.flushed_total = 0
+        self.failed_flushes = 0
+        self.last_flush_at = None
+        self.last_flush_lag_ms = 0.0
+        self.max_flush_lag_ms = 0.0
+        self.last_flush_duration_ms = 0.0
+
+    def start(self):
+        with self.condition:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stopped = False
+            self.thread = threading.Thread(target=self.run, name='login-attempt-recorder', daemon=True)
+            self.thread.start()
+        atexit.register(self.stop)
+
+    def record(self, username, ip_address, user_agent, success):
+        """Queue an attempt and update the in-memory failure counters."""
+        if success:
+            self.failures.reset(('username', username))
+        else:
+            self.failures.add(('username', username))
+            self.failures.add(('ip', ip_address))
+
+        attempt = LoginAttempt(
+            username=username,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            success=success,
+            timestamp=timezone.now(),
+        )
+        self.start()
+        with self.condition:
+            if not self.queue:
+                self.oldest_queued_at = time.monotonic()
+            self.queue.append(attempt)
+            if len(self.queue) >= self.batch_size:
+                self.condition.notify()
+
+    def is_blocked(self, username, ip_address):
+        """Whether recent failures for the username or IP reached the limit."""
+        return (
+            self.failures.count(('username', username)) >= self.failure_limit
+            or self.failures.count(('ip', ip_address)) >= self.failure_limit
+        )
+
+    def flush(self):
+        """Write every queued attempt to the database."""
+        with self.flush_lock:
+            with self.condition:
+                batch, self.queue = self.queue, []
+                queued_at, self.oldest_queued_at = self.oldest_queued_at, None
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            try:
+                run_serialized(LoginAttempt.objects.bulk_create, batch, batch_size=500)
+            except Exception:
+                self.failed_flushes += 1
+                logger.exception('Could not write %d login attempts; will retry', len(batch))
+                with self.condition:
+                    self.queue[:0] = batch
+                    self.oldest_queued_at = queued_at
+                return 0
+
+            finished = time.monotonic()
+            # bulk_create sends no signals, so the status counters are fed here
+            failed = Counter(counters.failed_logins_bucket(a.timestamp) for a in batch if not a.success)
+            try:
+                for bucket, count in failed.items():
+                    counters.increment(bucket, count)
+            except Exception:
+                logger.exception('Could not update failed login counters')
+            self.flushed_total += len(batch)
+            self.last_flush_at = timezone.now()
+            self.last_flush_lag_ms = (finished - queued_at) * 1000
+            self.max_flush_lag_ms = max(self.max_flush_lag_ms, self.last_flush_lag_ms)
+            self.last_flush_duration_ms = (finished - started) * 1000
+            return len(batch)
+
+    def _due(self):
+        if not self.queue:
+            return False
+        if len(self.queue) >= self.batch_size:
+            return True
+        return time.monotonic() - self.oldest_queued_at >= self.flush_interval
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopped or self._due(), timeout=self.flush_interval)
+                if self.stopped:
+                    return
+            try:
+                self.flush()
+                self.failures.purge()
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.flush()
+
+    def metrics(self):
+        """Queue depth and flush-lag figures for monitoring."""
+        with self.condition:
+            queued = len(self.queue)
+            oldest = self.oldest_queued_at
+        return {
+            'queued': queued,
+            'oldest_queued_ms': round((time.monotonic() - oldest) * 1000, 1) if oldest else 0.0,
+            'flushed_total': self.flushed_total,
+            'failed_flushes': self.failed_flushes,
+            'last_flush_at': self.last_flush_at,
+            'last_flush_lag_ms': round(self.last_flush_lag_ms, 1),
+            'max_flush_lag_ms': round(self.max_flush_lag_ms, 1),
+            'last_flush_duration_ms': round(self.last_flush_duration_ms, 1),
+            'tracked_failures': self.failures.total(),
+        }
+
+
+login_attempts = LoginAttemptRecorder(
+    batch_size=settings.LOGIN_ATTEMPT_BATCH_SIZE,
+    flush_interval_ms=settings.LOGIN_ATTEMPT_FLUSH_INTERVAL_MS,
+    failure_window=settings.LOGIN_FAILURE_WINDOW,
+    failure_limit=settings.LOGIN_FAILURE_LIMIT,
+)
@@ -1,11 +1,13 @@
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
+from utils.fieldsets import SparseFieldsetMixin
 from .models import User, Center, UserSession
+from .recorder import login_attempts
 
 
-class CenterSerializer(serializers.ModelSerializer):
+class CenterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Center model."""
     
     class Meta:
@@ -18,7 +20,7 @@ class CenterSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for User model."""
     center = CenterSerializer(read_only=True)
     center_id = serializers.IntegerField(write_only=True, required=False)
@@ -27,7 +29,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name', 'user_type',
-            'center', 'center_id', 'phone_number', 'is_center_admin',
+            'center', 'center_id', 'army_no', 'phone_number', 'is_center_admin',
             'is_active', 'date_joined', 'last_login', 'created_at', 'updated_at'
         ]
         read_only_fields = [
@@ -38,6 +40,13 @@ class UserSerializer(serializers.ModelSerializer):
             'email': {'required': True}
         }
     
+    def validate_army_no(self, value):
+        # The army number decides whose exam attempts the account may answer
+        request = self.context.get('request')
+        if request and request.user.user_type != 'admin':
+            raise serializers.ValidationError("Only administrators can link an account to a candidate")
+        return value or None
+    
     def create(self, validated_data):
         center_id = validated_data.pop('center_id', None)
         password = validated_data.pop('password', None)
@@ -102,7 +111,13 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Custom token serializer with additional user information."""
     
     def validate(self, attrs):
-        data = super().validate(attrs)
+        username = attrs.get(self.username_field)
+        self._check_not_blocked(username)
+        try:
+            data = super().validate(attrs)
+        except exceptions.AuthenticationFailed:
+            self._track_login_attempt(username, False)
+            raise
         
         # Add user information to token response
         user = self.user
@@ -126,17 +141,24 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
     
     def _track_login_attempt(self, username, success):
-        """Track login attempt for security monitoring."""
+        """Queue login attempt for security monitoring."""
         request = self.context.get('request')
         if request:
-            from .models import LoginAttempt
-            LoginAttempt.objects.create(
+            login_attempts.record(
                 username=username,
                 ip_address=self._get_client_ip(request),
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
                 success=success
             )
     
+    def _check_not_blocked(self, username):
+        """Refuse logins while recent failures for the user or IP exceed the limit."""
+        request = self.context.get('request')
+        if request and login_attempts.is_blocked(username, self._get_client_ip(request)):
+            raise exceptions.Throttled(
+                detail=_('Too many failed login attempts. Please try again later.')
+            )
+    
     def _get_client_ip(self, request):
         """Get client IP address from request."""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -157,6 +179,7 @@ class LoginSerializer(serializers.Serializer):
         password = attrs.get('password')
         
         if username and password:
+            self._check_not_blocked(username)
             user = authenticate(username=username, password=password)
             
             if not user:
@@ -176,6 +199,7 @@ class LoginSerializer(serializers.Serializer):
                     _('User account is locked due to multiple failed login attempts.')
                 )
             
+            self._track_login_attempt(username, True)
             attrs['user'] = user
             return attrs
         else:
@@ -184,17 +208,24 @@ class LoginSerializer(serializers.Serializer):
             )
     
     def _track_login_attempt(self, username, success):
-        """Track login attempt for security monitoring."""
+        """Queue login attempt for security monitoring."""
         request = self.context.get('request')
         if request:
-            from .models import LoginAttempt
-            LoginAttempt.objects.create(
+            login_attempts.record(
                 username=username,
                 ip_address=self._get_client_ip(request),
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
                 success=success
             )
     
+    def _check_not_blocked(self, username):
+        """Refuse logins while recent failures for the user or IP exceed the limit."""
+        request = self.context.get('request')
+        if request and login_attempts.is_blocked(username, self._get_client_ip(request)):
+            raise exceptions.Throttled(
+                detail=_('Too many failed login attempts. Please try again later.')
+            )
+    
     def _get_client_ip(self, request):
         """Get client IP address from request."""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -245,7 +276,7 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
         return attrs
 
 
-class UserSessionSerializer(serializers.ModelSerializer):
+class UserSessionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for UserSession model."""
     user = UserSerializer(read_only=True)
     
@@ -258,7 +289,7 @@ class UserSessionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'session_key', 'ip_address', 'user_agent', 'login_time']
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for user profile updates."""
     center = CenterSerializer(read_only=True)
     
@@ -266,10 +297,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name', 'user_type',
-            'center', 'phone_number', 'is_center_admin', 'is_active',
+            'center', 'army_no', 'phone_number', 'is_center_admin', 'is_active',
             'date_joined', 'last_login'
         ]
         read_only_fields = [
-            'id', 'username', 'user_type', 'is_center_admin', 'is_active',
+            'id', 'username', 'user_type', 'army_no', 'is_center_admin', 'is_active',
             'date_joined', 'last_login'
         ]
@@ -0,0 +1,88 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from utils.sharding import replica_aliases, replicate, sharding_enabled
+
+from . import counters
+from .models import User, Center, UserSession
+from .principals import bump_version
+
+
+# (total counter, active counter) maintained for each model
+COUNTED_MODELS = {
+    User: (counters.TOTAL_USERS, counters.ACTIVE_USERS),
+    Center: (counters.TOTAL_CENTERS, counters.ACTIVE_CENTERS),
+    UserSession: (None, counters.ACTIVE_SESSIONS),
+}
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    bump_version(instance.pk)
+
+
+@receiver(post_save, sender=Center)
+def center_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    user_ids = list(User.objects.filter(center=instance).values_list('pk', flat=True))
+    if user_ids:
+        bump_version(*user_ids)
+
+
+@receiver(pre_delete, sender=Center)
+def center_deleted(sender, instance, **kwargs):
+    # Users are detached with a bulk UPDATE, which sends no user signals
+    user_ids = list(User.objects.filter(center=instance).values_list('pk', flat=True))
+    if user_ids:
+        bump_version(*user_ids)
+
+
+@receiver(post_init)
+def remember_is_active(sender, instance, **kwargs):
+    # Deferred fields are absent from __dict__; reading them would query
+    if sender in COUNTED_MODELS and 'is_active' in instance.__dict__:
+        instance._counted_is_active = instance.is_active
+
+
+@receiver(post_save)
+def count_saved(sender, instance, created, using, **kwargs):
+    if sender not in COUNTED_MODELS or using != DEFAULT_DB_ALIAS:
+        return
+    total, active = COUNTED_MODELS[sender]
+    was_active = False if created else getattr(instance, '_counted_is_active', None)
+    if created and total:
+        counters.increment(total)
+    if was_active is not None and was_active != instance.is_active:
+        counters.increment(active, 1 if instance.is_active else -1)
+    instance._counted_is_active = instance.is_active
+
+
+@receiver(post_delete)
+def count_deleted(sender, instance, using, **kwargs):
+    # Shard copies of users and centers are not counted
+    if sender not in COUNTED_MODELS or using != DEFAULT_DB_ALIAS:
+        return
+    total, active = COUNTED_MODELS[sender]
+    if total:
+        counters.increment(total, -1)
+    if getattr(instance, '_counted_is_active', False):
+        counters.increment(active, -1)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Center)
+def replicate_saved(sender, instance, using, raw, **kwargs):
+    # Shards hold a copy of every user and center for their foreign keys
+    if using == DEFAULT_DB_ALIAS and not raw:
+        replicate([instance])
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Center)
+def replicate_deleted(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS or not sharding_enabled():
+        return
+    for alias in replica_aliases():
+        sender._base_manager.using(alias).filter(pk=instance.pk).delete()
@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from utils.testing import QueryCountTestMixin, make_center, make_user
+from .models import LoginAttempt, User
+from .checks import check_principal_cache_backend
+from .principals import PrincipalCache
+
+
+class UserListQueryTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin', make_center()))
+        self.created = 0
+
+    def add_users(self, count):
+        for _ in range(count):
+            self.created += 1
+            make_user(f'user{self.created}', make_center(f'U{self.created:03d}'), user_type='candidate')
+
+    def test_list_query_count_is_constant(self):
+        self.assertConstantQueries('/api/auth/users/', self.add_users)
+
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        self.user = make_user('candidate', make_center(), user_type='candidate')
+        self.principals = PrincipalCache(max_size=10, ttl=300)
+
+    def test_cached_principal_is_reused(self):
+        self.principals.get(self.user.pk)
+        self.principals.get(self.user.pk)
+        self.assertEqual((self.principals.hits, self.principals.misses), (1, 1))
+
+    def test_revocation_by_another_process_is_seen(self):
+        self.principals.get(self.user.pk)
+        # A queryset update sends no signals, like a save made by another worker
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertFalse(self.principals.get(self.user.pk).is_active)
+
+    def test_deleted_user_is_not_returned(self):
+        self.principals.get(self.user.pk)
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertIsNone(self.principals.get(self.user.pk))
+
+
+class SharedCachePrincipalTests(TestCase):
+    """Principals revalidated through a cache every worker process shares."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        settings = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = make_user('candidate', make_center(), user_type='candidate')
+        self.principals = PrincipalCache(max_size=10, ttl=300)
+
+    def test_cached_principal_needs_no_query(self):
+        self.principals.get(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.principals.get(self.user.pk).pk, self.user.pk)
+
+    def test_saved_change_is_seen(self):
+        self.principals.get(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.principals.get(self.user.pk).is_active)
+
+    def test_no_startup_warning(self):
+        self.assertEqual(check_principal_cache_backend(None), [])
+
+    def test_process_local_cache_is_reported(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([warning.id for warning in check_principal_cache_backend(None)], ['authentication.W001'])
+
+
+class LoginAttemptPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin', is_staff=True))
+
+    def walk(self, url):
+        ids, queries = [], []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:500])
+            queries += [query['sql'] for query in context.captured_queries]
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids, queries, response.data['previous']
+
+    def test_rows_sharing_a_timestamp_are_paged_by_key(self):
+        # One batch of buffered writes: every row has the same timestamp
+        now = timezone.now()
+        LoginAttempt.objects.bulk_create(
+            LoginAttempt(username=f'user{number}', ip_address='10.0.0.1', timestamp=now) for number in range(7)
+        )
+        ids, queries, previous = self.walk('/api/auth/login-attempts/?page_size=3')
+        expected = list(LoginAttempt.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertFalse([sql for sql in queries if 'OFFSET' in sql.upper()])
+
+        back = []
+        while previous:
+            response = self.client.get(previous)
+            back = [row['id'] for row in response.data['results']] + back
+            previous = response.data['previous']
+        self.assertEqual(back, expected[:-1])
+
+
+class LoginAttemptIndexTests(TestCase):
+    def test_composite_indexes_exist(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, LoginAttempt._meta.db_table)
+        indexes = {name: info['columns'] for name, info in constraints.items() if info['index']}
+        self.assertEqual(indexes.get('login_attempt_username_idx'), ['username', 'timestamp'])
+        self.assertEqual(indexes.get('login_attempt_ip_idx'), ['ip_address', 'timestamp'])
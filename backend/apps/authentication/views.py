@@ -20,7 +20,10 @@ from .serializers import (
     PasswordResetConfirmSerializer, UserProfileSerializer,
     UserSessionSerializer
 )
+from . import counters
 from .permissions import IsAdminUser, IsCenterAdmin, IsOwnerOrAdmin
+from .recorder import login_attempts
+from utils.queries import RelatedQuerysetMixin
 
 User = get_user_model()
 
@@ -92,7 +95,7 @@ class UserRegistrationView(generics.CreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class UserListView(generics.ListAPIView):
+class UserListView(RelatedQuerysetMixin, generics.ListAPIView):
     """View for listing users (admin only)."""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -117,7 +120,7 @@ class UserListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserDetailView(RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """View for user detail, update, and deletion."""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -239,7 +242,7 @@ class PasswordResetConfirmView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CenterListView(generics.ListCreateAPIView):
+class CenterListView(RelatedQuerysetMixin, generics.ListCreateAPIView):
     """View for listing and creating centers."""
     queryset = Center.objects.all()
     serializer_class = CenterSerializer
@@ -265,7 +268,7 @@ class CenterListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class CenterDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CenterDetailView(RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """View for center detail, update, and deletion."""
     queryset = Center.objects.all()
     serializer_class = CenterSerializer
@@ -293,7 +296,7 @@ class CenterDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
-class UserSessionListView(generics.ListAPIView):
+class UserSessionListView(RelatedQuerysetMixin, generics.ListAPIView):
     """View for listing user sessions (admin only)."""
     queryset = UserSession.objects.all()
     serializer_class = UserSessionSerializer
@@ -360,28 +363,10 @@ class LoginAttemptListView(generics.ListAPIView):
 )
 def system_status(request):
     """Get system status and statistics."""
-    total_users = User.objects.count()
-    active_users = User.objects.filter(is_active=True).count()
-    total_centers = Center.objects.count()
-    active_centers = Center.objects.filter(is_active=True).count()
-    
-    # Get recent login attempts
-    recent_failed_attempts = LoginAttempt.objects.filter(
-        success=False
-    ).order_by('-timestamp')[:10]
-    
-    # Get active sessions
-    active_sessions = UserSession.objects.filter(is_active=True).count()
-    
-    data = {
-        'total_users': total_users,
-        'active_users': active_users,
-        'total_centers': total_centers,
-        'active_centers': active_centers,
-        'active_sessions': active_sessions,
-        'recent_failed_attempts': len(recent_failed_attempts),
-        'system_status': 'healthy' if active_centers > 0 else 'warning'
-    }
+    # Precomputed by signal handlers; see apps.authentication.counters
+    data = counters.snapshot()
+    data['system_status'] = 'healthy' if data['active_centers'] > 0 else 'warning'
+    data['login_recorder'] = login_attempts.metrics()
     
     return Response(data)
 
@@ -404,11 +389,18 @@ def force_logout(request):
     
     try:
         user = User.objects.get(id=user_id)
+        now = timezone.now()
         # Invalidate all active sessions for the user
-        UserSession.objects.filter(user=user, is_active=True).update(
+        closed = UserSession.objects.filter(user=user, is_active=True).update(
             is_active=False,
-            logout_time=timezone.now()
+            logout_time=now
         )
+        # A bulk update sends no signals
+        counters.increment(counters.ACTIVE_SESSIONS, -closed)
+        # Reject access tokens already handed out; saving also refreshes
+        # the cached principal in every process
+        user.tokens_revoked_at = now
+        user.save(update_fields=['tokens_revoked_at'])
         return Response(
             {"detail": f"User {user.username} logged out from all sessions"},
             status=status.HTTP_200_OK
@@ -5,3 +5,15 @@ class CandidatesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.candidates'
     verbose_name = 'Candidates'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_search_index, sender=self)
+
+
+def install_search_index(sender, using, **kwargs):
+    """Create the FTS5 search index once the candidates table exists."""
+    from django.db import connections
+    from .search import install_search_index
+    install_search_index(connections[using])
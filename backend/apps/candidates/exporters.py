@@ -0,0 +1,123 @@
+"""
+Streaming exporters for candidate rosters.
+
+Rows are pulled from the database with ``QuerySet.iterator`` and written to
+the response as they are produced, so memory use does not depend on the size
+of the export.
+"""
+import csv
+import json
+import tempfile
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from utils.sharding import FanOutQuery
+from .models import Candidate
+
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Size of the blocks read back from the temporary XLSX file
+FILE_BLOCK_SIZE = 64 * 1024
+
+EXCLUDED_COLUMNS = {'created_by', 'updated_by'}
+
+EXPORT_COLUMNS = [
+    field.attname if field.is_relation else field.name
+    for field in Candidate._meta.concrete_fields
+    if field.name not in EXCLUDED_COLUMNS
+]
+
+
+class Echo:
+    """File-like object that hands back whatever is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_values(queryset, columns):
+    """
+    Yield value tuples for ``columns`` in database-sized chunks.
+
+    Exports spanning every shard stream one shard after another.
+    """
+    limit = settings.MAX_EXPORT_SIZE
+    if isinstance(queryset, FanOutQuery):
+        rows = chain.from_iterable(iter_values(shard_queryset, columns) for shard_queryset in queryset.shard_querysets())
+        return islice(rows, limit) if limit else rows
+    if limit:
+        queryset = queryset[:limit]
+    return queryset.values_list(*columns).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(queryset, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in iter_values(queryset, columns):
+        yield writer.writerow(row)
+
+
+def iter_json(queryset, columns):
+    encoder = DjangoJSONEncoder()
+    yield '['
+    separator = ''
+    for row in iter_values(queryset, columns):
+        yield separator + encoder.encode(dict(zip(columns, row)))
+        separator = ','
+    yield ']'
+
+
+def iter_xlsx(queryset, columns):
+    """
+    Write the workbook with xlsxwriter in constant_memory mode.
+
+    XLSX is a zip archive that can only be finalised once every row is known,
+    so the workbook is spooled to a temporary file on disk and then streamed
+    back in fixed-size blocks.
+    """
+    import xlsxwriter
+
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {
+            'constant_memory': True,
+            'remove_timezone': True,
+            'default_date_format': 'yyyy-mm-dd',
+        })
+        worksheet = workbook.add_worksheet('Candidates')
+        worksheet.write_row(0, 0, columns)
+        for row_number, row in enumerate(iter_values(queryset, columns), start=1):
+            worksheet.write_row(row_number, 0, row)
+        workbook.close()
+
+        output.seek(0)
+        while True:
+            block = output.read(FILE_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+
+WRITERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+    'xlsx': iter_xlsx,
+}
+
+
+def stream_export(queryset, export_format, filename='candidates', columns=None):
+    """Return a ``StreamingHttpResponse`` with ``queryset`` in ``export_format``."""
+    columns = columns or EXPORT_COLUMNS
+    response = StreamingHttpResponse(
+        WRITERS[export_format](queryset, columns),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
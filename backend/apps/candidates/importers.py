@@ -0,0 +1,283 @@
+"""
+Streaming bulk importer for candidate rosters.
+
+Rows are read one at a time from CSV or XLSX files, validated in chunks and
+written with ``bulk_create`` so that a large intake never has to be held in
+memory or inserted one record at a time.
+
+Uploads through the API are queued on ``upload_worker``, a background thread
+that runs uploads one at a time, so the request returns as soon as the file
+is stored. ``bulk_import_candidates --pending`` runs uploads left pending by
+a process that stopped before reaching them.
+"""
+import csv
+import io
+import logging
+import os
+import queue
+import threading
+from datetime import date, datetime
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, IntegrityError, transaction
+from django.utils import timezone
+
+from utils.sharding import center_alias
+from .models import Candidate, CandidateBulkUpload
+
+
+logger = logging.getLogger(__name__)
+
+# Fields that are filled in by the importer rather than read from the file
+SYSTEM_FIELDS = {'id', 'center', 'created_by', 'updated_by', 'created_at', 'updated_at'}
+
+IMPORTABLE_FIELDS = {
+    field.name for field in Candidate._meta.concrete_fields
+    if field.name not in SYSTEM_FIELDS
+}
+
+# Cap the stored error log so a completely malformed file cannot bloat the row
+MAX_ERROR_LINES = 1000
+
+
+def normalize_header(value):
+    """Map a column heading such as 'Army No.' onto a model field name."""
+    if value is None:
+        return ''
+    header = str(value).strip().lower()
+    for char in (' ', '-', '.', '/'):
+        header = header.replace(char, '_')
+    return header.strip('_')
+
+
+def normalize_cell(value):
+    """Convert a raw cell value into something the model fields can clean."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store phone numbers and PIN codes as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_csv_rows(fileobj):
+    """Yield one dict per data row of a CSV file."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    headers = [normalize_header(h) for h in next(reader, [])]
+    for values in reader:
+        if not any(values):
+            continue
+        yield dict(zip(headers, values))
+
+
+def iter_xlsx_rows(fileobj):
+    """Yield one dict per data row of an XLSX workbook using read-only mode."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [normalize_header(h) for h in next(rows, ())]
+        for values in rows:
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj, filename):
+    """Pick a row reader based on the file extension."""
+    ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    if ext == 'csv':
+        return iter_csv_rows(fileobj)
+    if ext == 'xlsx':
+        return iter_xlsx_rows(fileobj)
+    raise ValueError(f"Unsupported file type '.{ext}'. Upload a .csv or .xlsx file.")
+
+
+class CandidateImporter:
+    """
+    Import candidates from a ``CandidateBulkUpload`` file.
+
+    Each chunk of ``batch_size`` rows is validated, checked for duplicate army
+    numbers with a single query and inserted in its own short transaction, so
+    the database write lock is only held for the duration of one batch.
+    Progress counters on the upload record are updated after every chunk.
+    """
+
+    def __init__(self, upload, batch_size=None, progress=None):
+        self.upload = upload
+        self.batch_size = batch_size or settings.CANDIDATE_IMPORT_BATCH_SIZE
+        self.progress = progress
+        self.using = center_alias(upload.center_id)
+        self.total = 0
+        self.successful = 0
+        self.failed = 0
+        self.errors = []
+        self.seen_army_numbers = set()
+
+    def run(self):
+        """Process the whole file and return the updated upload record."""
+        upload = self.upload
+        upload.status = 'processing'
+        upload.save(update_fields=['status'])
+
+        try:
+            with upload.file.open('rb') as fileobj:
+                rows = enumerate(iter_rows(fileobj, upload.file.name), start=2)
+                while True:
+                    chunk = list(islice(rows, self.batch_size))
+                    if not chunk:
+                        break
+                    self.process_chunk(chunk)
+                    self.save_progress()
+        except Exception as exc:
+            self.log_error(f"Import aborted: {exc}")
+            upload.status = 'failed'
+        else:
+            upload.status = 'completed'
+
+        upload.total_records = self.total
+        upload.successful_records = self.successful
+        upload.failed_records = self.failed
+        upload.error_log = '\n'.join(self.errors)
+        upload.completed_at = timezone.now()
+        upload.save()
+        return upload
+
+    def process_chunk(self, chunk):
+        """Validate a chunk of ``(row_number, row)`` pairs and insert the valid ones."""
+        self.total += len(chunk)
+        candidates = []
+        row_numbers = {}
+
+        for row_number, row in chunk:
+            candidate = self.build_candidate(row_number, row)
+            if candidate is not None:
+                candidates.append(candidate)
+                row_numbers[candidate.army_no] = row_number
+
+        existing = set(
+            Candidate.objects.using(self.using).filter(army_no__in=row_numbers.keys())
+            .values_list('army_no', flat=True)
+        )
+        for army_no in existing:
+            self.log_error(f"Row {row_numbers[army_no]}: army_no '{army_no}' already exists")
+        self.failed += len(existing)
+        candidates = [c for c in candidates if c.army_no not in existing]
+
+        if not candidates:
+            return
+        try:
+            with transaction.atomic(using=self.using):
+                Candidate.objects.using(self.using).bulk_create(candidates, batch_size=self.batch_size)
+        except IntegrityError as exc:
+            first, last = chunk[0][0], chunk[-1][0]
+            self.log_error(f"Rows {first}-{last}: batch rejected by the database ({exc})")
+            self.failed += len(candidates)
+        else:
+            self.successful += len(candidates)
+
+    def build_candidate(self, row_number, row):
+        """Return an unsaved, validated ``Candidate`` or ``None`` if the row is invalid."""
+        data = {
+            name: normalize_cell(value)
+            for name, value in row.items()
+            if name in IMPORTABLE_FIELDS
+        }
+        army_no = data.get('army_no', '')
+        if army_no in self.seen_army_numbers:
+            self.failed += 1
+            self.log_error(f"Row {row_number}: duplicate army_no '{army_no}' in file")
+            return None
+
+        candidate = Candidate(
+            center_id=self.upload.center_id,
+            created_by_id=self.upload.uploaded_by_id,
+            **data
+        )
+        try:
+            candidate.full_clean(
+                exclude=['center', 'created_by', 'updated_by'],
+                validate_unique=False,
+            )
+        except ValidationError as exc:
+            self.failed += 1
+            messages = '; '.join(
+                f"{field}: {' '.join(errors)}"
+                for field, errors in exc.message_dict.items()
+            )
+            self.log_error(f"Row {row_number}: {messages}")
+            return None
+
+        self.seen_army_numbers.add(army_no)
+        return candidate
+
+    def save_progress(self):
+        """Publish running counters so clients can poll the upload record."""
+        CandidateBulkUpload.objects.using(self.upload._state.db).filter(pk=self.upload.pk).update(
+            total_records=self.total,
+            successful_records=self.successful,
+            failed_records=self.failed,
+        )
+        if self.progress:
+            self.progress(self)
+
+    def log_error(self, message):
+        if len(self.errors) < MAX_ERROR_LINES:
+            self.errors.append(message)
+        elif len(self.errors) == MAX_ERROR_LINES:
+            self.errors.append('Further errors omitted.')
+
+
+def run_pending_upload(pk, using, **kwargs):
+    """
+    Run upload ``pk`` if it is still pending; returns ``None`` otherwise.
+
+    The upload is claimed with a conditional update first, so a queued
+    upload and ``bulk_import_candidates --pending`` never run the same file
+    twice.
+    """
+    claimed = CandidateBulkUpload.objects.using(using).filter(pk=pk, status='pending').update(status='processing')
+    if not claimed:
+        return None
+    return CandidateImporter(CandidateBulkUpload.objects.using(using).get(pk=pk), **kwargs).run()
+
+
+class UploadWorker:
+    """Background thread running queued candidate uploads in arrival order."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, upload):
+        """Queue ``upload``; call once its row is committed."""
+        self.queue.put((upload.pk, upload._state.db))
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='candidate-upload', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            pk, using = self.queue.get()
+            try:
+                run_pending_upload(pk, using)
+            except Exception:
+                logger.exception("Candidate upload %s failed", pk)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+upload_worker = UploadWorker()
@@ -0,0 +1,72 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.models import Center
+from apps.candidates.importers import CandidateImporter, run_pending_upload
+from apps.candidates.models import CandidateBulkUpload
+from utils.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = "Import a CSV or XLSX candidate roster into a center"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Roster file")
+        parser.add_argument('--center', type=int, help="Center id")
+        parser.add_argument('--user', help="Username recorded as the uploader")
+        parser.add_argument('--batch-size', type=int, help="Rows per chunk (default: CANDIDATE_IMPORT_BATCH_SIZE)")
+        parser.add_argument(
+            '--pending', action='store_true',
+            help="Run uploaded rosters that are still pending instead of importing a file",
+        )
+
+    def progress(self, importer):
+        self.stdout.write(f"{importer.total} rows: {importer.successful} imported, {importer.failed} failed")
+
+    def report(self, upload):
+        for line in upload.error_log.splitlines()[:20]:
+            self.stderr.write(line)
+        if upload.status != 'completed':
+            raise CommandError(f"Upload {upload.pk} failed")
+        self.stdout.write(self.style.SUCCESS(
+            f"Upload {upload.pk}: {upload.successful_records} candidates imported, "
+            f"{upload.failed_records} rows rejected"
+        ))
+
+    def handle_pending(self, options):
+        failed = []
+        for alias in shard_aliases():
+            pending = CandidateBulkUpload.objects.using(alias).filter(status='pending').order_by('created_at')
+            for pk in pending.values_list('pk', flat=True):
+                upload = run_pending_upload(pk, alias, batch_size=options['batch_size'], progress=self.progress)
+                if upload is None:
+                    continue
+                try:
+                    self.report(upload)
+                except CommandError as exc:
+                    self.stderr.write(str(exc))
+                    failed.append(pk)
+        if failed:
+            raise CommandError(f"{len(failed)} uploads failed")
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            return self.handle_pending(options)
+        if not (options['path'] and options['center'] and options['user']):
+            raise CommandError("path, --center and --user are required unless --pending is given")
+        if not os.path.isfile(options['path']):
+            raise CommandError(f"No such file: {options['path']}")
+        try:
+            center = Center.objects.get(pk=options['center'])
+            user = get_user_model().objects.get(username=options['user'])
+        except (Center.DoesNotExist, get_user_model().DoesNotExist) as exc:
+            raise CommandError(str(exc))
+
+        with open(options['path'], 'rb') as handle:
+            upload = CandidateBulkUpload(center=center, uploaded_by=user)
+            upload.file.save(os.path.basename(options['path']), File(handle))
+
+        self.report(CandidateImporter(upload, options['batch_size'], self.progress).run())
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from apps.candidates.models import CandidateDocument, CandidatePhoto
+from apps.candidates.signals import FILE_FIELDS
+from apps.candidates.storage import BLOB_PREFIX
+from utils.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = "Move candidate photos and documents stored before dedup into the shared blob store"
+
+    def handle(self, *args, **options):
+        for model in (CandidatePhoto, CandidateDocument):
+            field = FILE_FIELDS[model]
+            moved = 0
+            for alias in shard_aliases():
+                legacy = (
+                    model.objects.using(alias)
+                    .exclude(**{f'{field}__startswith': BLOB_PREFIX})
+                    .exclude(**{field: ''})
+                )
+                for instance in legacy.iterator():
+                    field_file = getattr(instance, field)
+                    old_name = field_file.name
+                    if not field_file.storage.exists(old_name):
+                        self.stderr.write(f"{model.__name__} {instance.pk}: {old_name} is missing")
+                        continue
+                    with field_file.open('rb') as content:
+                        new_name = field_file.storage.save(old_name, content)
+                    model.objects.using(alias).filter(pk=instance.pk).update(**{field: new_name})
+                    field_file.storage.retain(new_name)
+                    field_file.storage.delete(old_name)
+                    moved += 1
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} {model._meta.verbose_name_plural}"))
@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.candidates.models import CandidatePhoto
+from apps.candidates.storage import BLOB_PREFIX
+from apps.candidates.variants import VariantError, generate_variants
+from utils.sharding import shard_aliases
+
+
+def render_photo(name, force):
+    # Runs in a worker process and only touches files
+    try:
+        return name, generate_variants(name, force=force), None
+    except VariantError as exc:
+        return name, 0, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Render the resized and WebP variants of every stored candidate photo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+        parser.add_argument('--force', action='store_true', help="Re-render variants that already exist")
+
+    def handle(self, *args, **options):
+        names, legacy = set(), 0
+        for alias in shard_aliases():
+            for name in CandidatePhoto.objects.using(alias).exclude(photo='').values_list('photo', flat=True).iterator():
+                if name.startswith(BLOB_PREFIX):
+                    names.add(name)
+                else:
+                    legacy += 1
+        if legacy:
+            self.stderr.write(f"Skipping {legacy} photos stored before dedup; run deduplicate_candidate_files first")
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'] or os.cpu_count()) as executor:
+            futures = [executor.submit(render_photo, name, options['force']) for name in sorted(names)]
+            for future in as_completed(futures):
+                name, count, error = future.result()
+                written += count
+                if error:
+                    failed += 1
+                    self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {written} variants for {len(names)} photos ({failed} failed)"
+        ))
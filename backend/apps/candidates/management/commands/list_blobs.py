@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.candidates.models import CandidatePhoto
+
+
+class Command(BaseCommand):
+    help = "Print the SHA-256 of every stored candidate file, for build_exam_package --skip-blobs"
+
+    def handle(self, *args, **options):
+        storage = CandidatePhoto._meta.get_field('photo').storage
+        for sha256 in sorted(storage.held_hashes()):
+            self.stdout.write(sha256)
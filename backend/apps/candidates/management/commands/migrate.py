@@ -0,0 +1,44 @@
+from django.core.management.commands import migrate
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+from apps.candidates.models import Candidate
+
+
+INITIAL = ('candidates', '0001_initial')
+
+
+def adopt_syncdb_tables(connection):
+    """
+    Record ``candidates.0001_initial`` on databases that predate it.
+
+    The candidates app used to have no migrations, so ``--run-syncdb`` made
+    its tables while other apps' migrations that depend on it were applied.
+    Existing tables are recorded as they are; if they were never made, the
+    migration is applied out of order. Without this, such databases fail the
+    migration history check.
+    """
+    executor = MigrationExecutor(connection)
+    recorder = executor.recorder
+    if not recorder.has_table():
+        return False
+    applied = recorder.applied_migrations()
+    if INITIAL in applied:
+        return False
+    if Candidate._meta.db_table in connection.introspection.table_names():
+        recorder.record_applied(*INITIAL)
+        return True
+    graph = executor.loader.graph
+    if not any(INITIAL in graph.node_map[key].parents for key in applied if key in graph.node_map):
+        return False
+    state = executor.loader.project_state(INITIAL, at_end=False)
+    executor.apply_migration(state, executor.loader.get_migration(*INITIAL))
+    return True
+
+
+class Command(migrate.Command):
+
+    def handle(self, *args, **options):
+        if adopt_syncdb_tables(connections[options['database']]) and options['verbosity'] >= 1:
+            self.stdout.write(f"Adopted {'.'.join(INITIAL)} on a database that predates it")
+        return super().handle(*args, **options)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.candidates.models import CandidatePhoto
+from apps.candidates.storage import UNREFERENCED_GRACE
+
+
+class Command(BaseCommand):
+    help = "Remove stored candidate files no photo or document has referenced for a day"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=UNREFERENCED_GRACE,
+            help="Seconds an unreferenced file is kept for its upload to commit",
+        )
+
+    def handle(self, *args, **options):
+        storage = CandidatePhoto._meta.get_field('photo').storage
+        removed = storage.prune(options['grace'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} unreferenced files"))
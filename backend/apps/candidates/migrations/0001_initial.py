@@ -0,0 +1,161 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:11
+
+import apps.candidates.models
+import apps.candidates.storage
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+                'db_table': 'candidate_blobs',
+            },
+        ),
+        migrations.CreateModel(
+            name='Candidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('army_no', models.CharField(help_text='Army Service Number', max_length=20, unique=True)),
+                ('rank', models.CharField(help_text='Military Rank', max_length=50)),
+                ('first_name', models.CharField(help_text='First Name', max_length=100)),
+                ('last_name', models.CharField(help_text='Last Name', max_length=100)),
+                ('middle_name', models.CharField(blank=True, help_text='Middle Name (Optional)', max_length=100)),
+                ('date_of_birth', models.DateField(help_text='Date of Birth')),
+                ('gender', models.CharField(choices=[('M', 'Male'), ('F', 'Female'), ('O', 'Other')], help_text='Gender', max_length=1)),
+                ('marital_status', models.CharField(choices=[('single', 'Single'), ('married', 'Married'), ('divorced', 'Divorced'), ('widowed', 'Widowed')], default='single', help_text='Marital Status', max_length=20)),
+                ('blood_group', models.CharField(blank=True, choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], help_text='Blood Group', max_length=3)),
+                ('phone_number', models.CharField(help_text='Phone Number', max_length=15)),
+                ('email', models.EmailField(blank=True, help_text='Email Address (Optional)', max_length=254)),
+                ('address', models.TextField(help_text='Residential Address')),
+                ('city', models.CharField(help_text='City', max_length=100)),
+                ('state', models.CharField(help_text='State', max_length=100)),
+                ('pincode', models.CharField(help_text='PIN Code', max_length=10)),
+                ('father_name', models.CharField(help_text="Father's Name", max_length=200)),
+                ('mother_name', models.CharField(blank=True, help_text="Mother's Name (Optional)", max_length=200)),
+                ('spouse_name', models.CharField(blank=True, help_text='Spouse Name (Optional)', max_length=200)),
+                ('enrollment_date', models.DateField(help_text='Date of Enrollment in Army')),
+                ('trade', models.CharField(help_text='Military Trade/Specialization', max_length=100)),
+                ('unit', models.CharField(help_text='Military Unit', max_length=100)),
+                ('brigade', models.CharField(blank=True, help_text='Brigade', max_length=100)),
+                ('division', models.CharField(blank=True, help_text='Division', max_length=100)),
+                ('corps', models.CharField(blank=True, help_text='Corps', max_length=100)),
+                ('command', models.CharField(blank=True, help_text='Command', max_length=100)),
+                ('training_center', models.CharField(blank=True, help_text='Training Center', max_length=200)),
+                ('qualification', models.CharField(blank=True, help_text='Educational Qualification', max_length=200)),
+                ('level', models.CharField(blank=True, help_text='Skill Level', max_length=50)),
+                ('nsqf_level', models.CharField(blank=True, help_text='NSQF Level', max_length=20)),
+                ('exam_category', models.CharField(blank=True, help_text='Examination Category', max_length=100)),
+                ('is_eligible', models.BooleanField(default=True, help_text='Whether candidate is eligible for examination')),
+                ('eligibility_reason', models.TextField(blank=True, help_text='Reason for eligibility/ineligibility')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('center', models.ForeignKey(help_text='Examination center', on_delete=django.db.models.deletion.CASCADE, related_name='candidates', to='authentication.center')),
+                ('created_by', models.ForeignKey(blank=True, help_text='User who created this candidate record', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_candidates', to=settings.AUTH_USER_MODEL)),
+                ('updated_by', models.ForeignKey(blank=True, help_text='User who last updated this candidate record', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='updated_candidates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Candidate',
+                'verbose_name_plural': 'Candidates',
+                'db_table': 'candidates',
+                'ordering': ['army_no'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CandidatePhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('photo', models.ImageField(help_text='Candidate photograph', storage=apps.candidates.storage.get_candidate_file_storage, upload_to=apps.candidates.models.candidate_photo_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])])),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='photo', to='candidates.candidate')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploaded_photos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Candidate Photo',
+                'verbose_name_plural': 'Candidate Photos',
+                'db_table': 'candidate_photos',
+            },
+        ),
+        migrations.CreateModel(
+            name='CandidateDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(choices=[('aadhar', 'Aadhar Card'), ('pan', 'PAN Card'), ('driving_license', 'Driving License'), ('passport', 'Passport'), ('birth_certificate', 'Birth Certificate'), ('education_certificate', 'Education Certificate'), ('service_certificate', 'Service Certificate'), ('medical_certificate', 'Medical Certificate'), ('other', 'Other')], help_text='Type of document', max_length=50)),
+                ('document', models.FileField(help_text='Document file', storage=apps.candidates.storage.get_candidate_file_storage, upload_to=apps.candidates.models.candidate_document_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png'])])),
+                ('document_number', models.CharField(blank=True, help_text='Document number (if applicable)', max_length=100)),
+                ('description', models.TextField(blank=True, help_text='Additional description of the document')),
+                ('is_verified', models.BooleanField(default=False, help_text='Whether the document has been verified')),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='candidates.candidate')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploaded_documents', to=settings.AUTH_USER_MODEL)),
+                ('verified_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='verified_documents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Candidate Document',
+                'verbose_name_plural': 'Candidate Documents',
+                'db_table': 'candidate_documents',
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CandidateBulkUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(help_text='Bulk upload file', upload_to='candidates/bulk_uploads/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['xlsx', 'xls', 'csv'])])),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_records', models.PositiveIntegerField(default=0)),
+                ('successful_records', models.PositiveIntegerField(default=0)),
+                ('failed_records', models.PositiveIntegerField(default=0)),
+                ('error_log', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bulk_uploads', to='authentication.center')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bulk_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Candidate Bulk Upload',
+                'verbose_name_plural': 'Candidate Bulk Uploads',
+                'db_table': 'candidate_bulk_uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['army_no'], name='candidates_army_no_d5396d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['center'], name='candidates_center__4bcb73_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['trade'], name='candidates_trade_e339f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['unit'], name='candidates_unit_518dc0_idx'),
+        ),
+    ]
@@ -3,12 +3,14 @@ from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
 from django.conf import settings
 import os
+from utils.sharding import CenterManager
+from .storage import get_candidate_file_storage
 
 
 def candidate_photo_path(instance, filename):
     """Generate file path for candidate photos."""
     ext = filename.split('.')[-1]
-    filename = f"candidate_{instance.army_no}_{instance.id}.{ext}"
+    filename = f"candidate_{instance.candidate.army_no}_{instance.id}.{ext}"
     return os.path.join('candidates', 'photos', filename)
 
 
@@ -257,6 +259,8 @@ class Candidate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CenterManager()
+    
     class Meta:
         verbose_name = _('Candidate')
         verbose_name_plural = _('Candidates')
@@ -307,6 +311,7 @@ class CandidatePhoto(models.Model):
     
     photo = models.ImageField(
         upload_to=candidate_photo_path,
+        storage=get_candidate_file_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
         help_text=_('Candidate photograph')
     )
@@ -320,6 +325,8 @@ class CandidatePhoto(models.Model):
         related_name='uploaded_photos'
     )
     
+    objects = CenterManager()
+    
     class Meta:
         verbose_name = _('Candidate Photo')
         verbose_name_plural = _('Candidate Photos')
@@ -327,13 +334,6 @@ class CandidatePhoto(models.Model):
     
     def __str__(self):
         return f"Photo of {self.candidate.get_full_name()}"
-    
-    def delete(self, *args, **kwargs):
-        """Delete the photo file when the model instance is deleted."""
-        if self.photo:
-            if os.path.isfile(self.photo.path):
-                os.remove(self.photo.path)
-        super().delete(*args, **kwargs)
 
 
 class CandidateDocument(models.Model):
@@ -366,6 +366,7 @@ class CandidateDocument(models.Model):
     
     document = models.FileField(
         upload_to=candidate_document_path,
+        storage=get_candidate_file_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png'])],
         help_text=_('Document file')
     )
@@ -405,6 +406,8 @@ class CandidateDocument(models.Model):
         related_name='uploaded_documents'
     )
     
+    objects = CenterManager()
+    
     class Meta:
         verbose_name = _('Candidate Document')
         verbose_name_plural = _('Candidate Documents')
@@ -413,13 +416,6 @@ class CandidateDocument(models.Model):
     
     def __str__(self):
         return f"{self.get_document_type_display()} - {self.candidate.get_full_name()}"
-    
-    def delete(self, *args, **kwargs):
-        """Delete the document file when the model instance is deleted."""
-        if self.document:
-            if os.path.isfile(self.document.path):
-                os.remove(self.document.path)
-        super().delete(*args, **kwargs)
 
 
 class CandidateBulkUpload(models.Model):
@@ -466,6 +462,8 @@ class CandidateBulkUpload(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    objects = CenterManager()
+    
     class Meta:
         verbose_name = _('Candidate Bulk Upload')
         verbose_name_plural = _('Candidate Bulk Uploads')
@@ -474,3 +472,25 @@ class CandidateBulkUpload(models.Model):
     
     def __str__(self):
         return f"Bulk Upload {self.id} - {self.status}"
+
+
+class Blob(models.Model):
+    """
+    A stored file shared by every photo and document with the same content.
+
+    ``refcount`` is maintained by ``ContentAddressedStorage``; the file is
+    deleted when it drops to zero.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Blob')
+        verbose_name_plural = _('Blobs')
+        db_table = 'candidate_blobs'
+    
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
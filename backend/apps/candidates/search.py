@@ -0,0 +1,152 @@
+"""
+Full-text candidate search.
+
+On SQLite an FTS5 index, ``candidates_fts``, mirrors the searchable columns
+of ``candidates`` and is kept in step by triggers, so every write path
+(including bulk imports and sync) updates it. Queries match every term, the
+last one as a prefix so army-number autocomplete works while typing, and
+rank hits with BM25 weighted towards the army number and names. Army numbers
+keep their hyphens and slashes as part of the token.
+
+The index is created by ``post_migrate`` and filled from the table the
+first time. Other databases fall
+back to ``icontains`` lookups.
+
+With center shards each shard has its own index; ``search_every_shard``
+queries them concurrently and merges the hits by their BM25 rank.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from utils.sharding import fan_out
+from .models import Candidate
+
+
+FTS_TABLE = 'candidates_fts'
+
+# Indexed columns and their BM25 weights
+SEARCH_COLUMNS = {
+    'army_no': 10.0,
+    'first_name': 5.0,
+    'middle_name': 2.0,
+    'last_name': 5.0,
+    'father_name': 1.0,
+    'unit': 1.0,
+    'trade': 1.0,
+}
+
+TOKEN = re.compile(r'[\w\-/]+', re.UNICODE)
+
+
+def _has_table(connection, table):
+    return table in connection.introspection.table_names()
+
+
+def install_search_index(connection):
+    """Create the FTS5 index and its triggers, filling it when first created."""
+    table = Candidate._meta.db_table
+    if connection.vendor != 'sqlite' or not _has_table(connection, table):
+        return
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    created = not _has_table(connection, FTS_TABLE)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            f"{columns}, content='{table}', content_rowid='id', "
+            f"tokenize=\"unicode61 remove_diacritics 2 tokenchars '-/'\", prefix='2 3 4')"
+        )
+        cursor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {table} BEGIN '
+            f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {table} BEGIN '
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        cursor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON {table} BEGIN '
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+        )
+        if created:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query: every term must match, the last as a prefix.
+
+    Returns ``None`` when the text holds no searchable terms.
+    """
+    terms = TOKEN.findall(query)
+    if not terms:
+        return None
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_candidates(query, center_id=None, limit=20, using=None):
+    """
+    Return up to ``limit`` candidates matching ``query``, best match first.
+
+    Each hit carries its ``search_rank`` (BM25, lower is better; ``None``
+    without the FTS index).
+    """
+    using = using or router.db_for_read(Candidate)
+    connection = connections[using]
+    queryset = Candidate.objects.using(using)
+    if center_id is not None:
+        queryset = queryset.filter(center_id=center_id)
+
+    if connection.vendor != 'sqlite' or not _has_table(connection, FTS_TABLE):
+        terms = TOKEN.findall(query)
+        if not terms:
+            return []
+        for term in terms:
+            condition = Q(army_no__istartswith=term)
+            for column in SEARCH_COLUMNS:
+                if column != 'army_no':
+                    condition |= Q(**{f'{column}__icontains': term})
+            queryset = queryset.filter(condition)
+        candidates = list(queryset.order_by('army_no')[:limit])
+        for candidate in candidates:
+            candidate.search_rank = None
+        return candidates
+
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    weights = ', '.join(str(weight) for weight in SEARCH_COLUMNS.values())
+    sql = (
+        f'SELECT c.id, bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} JOIN {Candidate._meta.db_table} c ON c.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s'
+    )
+    params = [expression]
+    if center_id is not None:
+        sql += ' AND c.center_id = %s'
+        params.append(center_id)
+    sql += f' ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ranks = dict(cursor.fetchall())
+    candidates = queryset.in_bulk(list(ranks))
+    hits = []
+    for pk, rank in ranks.items():
+        if pk in candidates:
+            candidates[pk].search_rank = rank
+            hits.append(candidates[pk])
+    return hits
+
+
+def search_every_shard(query, limit=20):
+    """``search_candidates`` over every shard, merged best match first."""
+    shard_hits = fan_out(lambda alias: search_candidates(query, limit=limit, using=alias))
+    hits = [candidate for candidates in shard_hits.values() for candidate in candidates]
+    hits.sort(key=lambda candidate: (candidate.search_rank is None, candidate.search_rank or 0, candidate.army_no))
+    return hits[:limit]
@@ -1,9 +1,49 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Candidate
+from utils.fieldsets import SparseFieldsetMixin
+from .models import Candidate, CandidateBulkUpload
+from .variants import variant_names
 
 
-class CandidateSerializer(serializers.ModelSerializer):
+class CandidateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    photo_variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = Candidate
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
+        method_sources = {'photo_variants': ['photo.photo']}
+    
+    def get_photo_variants(self, obj):
+        """URLs of the resized photos, e.g. ``thumb_webp`` for rosters."""
+        try:
+            photo = obj.photo
+        except ObjectDoesNotExist:
+            return None
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in variant_names(photo.photo.name).items():
+            url = reverse('candidates:candidate-photo-variant', kwargs={'name': name})
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls or None
+
+
+class CandidateSearchSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Compact candidate row for search results and autocomplete."""
+    class Meta:
+        model = Candidate
+        fields = (
+            'id', 'army_no', 'rank', 'first_name', 'middle_name', 'last_name',
+            'father_name', 'unit', 'trade', 'center',
+        )
+
+
+class CandidateBulkUploadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CandidateBulkUpload
+        fields = '__all__'
+        read_only_fields = (
+            'status', 'total_records', 'successful_records', 'failed_records',
+            'error_log', 'uploaded_by', 'center', 'created_at', 'completed_at'
+        )
@@ -0,0 +1,72 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import CandidateDocument, CandidatePhoto
+from .variants import VariantError, generate_variants
+
+
+logger = logging.getLogger(__name__)
+
+# The file field of each model whose blobs are reference counted
+FILE_FIELDS = {
+    CandidatePhoto: 'photo',
+    CandidateDocument: 'document',
+}
+
+
+def retain_file(field_file, name, using):
+    """Take a reference to ``name`` once the surrounding transaction commits."""
+    transaction.on_commit(lambda: field_file.storage.retain(name), using=using)
+
+
+def release_file(field_file, name, using):
+    """Drop the reference to ``name`` once the surrounding transaction commits."""
+    transaction.on_commit(lambda: field_file.storage.delete(name), using=using)
+
+
+@receiver(post_init, sender=CandidatePhoto)
+@receiver(post_init, sender=CandidateDocument)
+def remember_file(sender, instance, **kwargs):
+    field = FILE_FIELDS[sender]
+    if field in instance.__dict__:
+        instance._stored_file = instance.__dict__[field]
+
+
+@receiver(post_save, sender=CandidatePhoto)
+@receiver(post_save, sender=CandidateDocument)
+def file_replaced(sender, instance, using, raw=False, created=False, **kwargs):
+    field_file = getattr(instance, FILE_FIELDS[sender])
+    if raw:
+        # Rows applied by sync, whose references sync takes itself
+        instance._stored_file = field_file.name
+        return
+    # Unknown when the file field was deferred and so never replaced
+    known = hasattr(instance, '_stored_file')
+    previous = getattr(instance, '_stored_file', None)
+    previous = getattr(previous, 'name', previous)
+    if field_file.name and (created or (known and previous != field_file.name)):
+        retain_file(field_file, field_file.name, using)
+    if previous and previous != field_file.name and not created:
+        release_file(field_file, previous, using)
+    if sender is CandidatePhoto and field_file.name and previous != field_file.name:
+        transaction.on_commit(lambda name=field_file.name: render_variants(name), using=using)
+    instance._stored_file = field_file.name
+
+
+def render_variants(name):
+    # A photo that cannot be resized is still served in full
+    try:
+        generate_variants(name)
+    except VariantError:
+        logger.warning('Could not render variants of %s', name, exc_info=True)
+
+
+@receiver(post_delete, sender=CandidatePhoto)
+@receiver(post_delete, sender=CandidateDocument)
+def file_deleted(sender, instance, using, **kwargs):
+    field_file = getattr(instance, FILE_FIELDS[sender])
+    if field_file.name:
+        release_file(field_file, field_file.name, using)
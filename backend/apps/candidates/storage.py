@@ -0,0 +1,194 @@
+"""
+Content-addressed storage for candidate photos and documents.
+
+Uploads are stored once per distinct content under
+``blobs/<aa>/<bb>/<sha256><ext>``, so the same scanned certificate uploaded
+for many candidates, or again for the same one, occupies a single file. Each
+row naming a blob holds one reference to it: ``retain()`` adds one once the
+row is committed (see ``signals.py``) and ``delete()`` drops one; the file is
+removed when the last reference goes. Reference counts live in the ``Blob``
+table of the default database, next to the media directory they describe.
+
+``save()`` only stores the file, so an upload whose transaction rolls back
+takes no reference. Until its row commits the file is protected by its age
+instead: a blob written or re-saved in the last ``UNREFERENCED_GRACE``
+seconds is kept when its last reference goes, and ``prune()`` removes such
+files once they are older and still unreferenced.
+
+A blob being released while another upload of the same content is saved is
+resolved by moving the file aside before its row is deleted: the saver then
+finds the file missing and writes it again, and identical content makes the
+rewrite harmless.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+BLOB_PREFIX = 'blobs/'
+
+READ_SIZE = 1024 * 1024
+
+# Seconds an unreferenced blob is kept for the upload that wrote it to commit
+UNREFERENCED_GRACE = 24 * 60 * 60
+
+BLOB_NAME = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})(?:\.[a-z0-9]{1,10})?$')
+
+
+def blob_name(sha256, ext=''):
+    return f'{BLOB_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}{ext.lower()}'
+
+
+def blob_hash(name):
+    """SHA-256 of a blob name, or ``None`` for files stored before dedup."""
+    if not name or not name.startswith(BLOB_PREFIX):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files by content and counts references."""
+
+    @property
+    def blobs(self):
+        return apps.get_model('candidates', 'Blob').objects.db_manager(DEFAULT_DB_ALIAS)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks(READ_SIZE):
+            digest.update(chunk)
+        name = blob_name(digest.hexdigest(), os.path.splitext(name)[1])
+
+        try:
+            # Restart the grace period of a blob whose last reference is going
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            content.seek(0)
+            self._write(name, content)
+        return name
+
+    def _write(self, name, content):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f'{path}.{uuid.uuid4().hex}.part'
+        with open(partial, 'wb') as handle:
+            for chunk in content.chunks(READ_SIZE):
+                handle.write(chunk)
+        if self.file_permissions_mode is not None:
+            os.chmod(partial, self.file_permissions_mode)
+        # Concurrent writers of one blob write identical bytes
+        os.replace(partial, path)
+
+    def retain(self, name, size=None):
+        """Add a reference to blob ``name``, stored by ``save()`` beforehand."""
+        if blob_hash(name) is None:
+            return
+        if size is None:
+            try:
+                size = self.size(name)
+            except FileNotFoundError:
+                size = 0
+        while True:
+            if self.blobs.filter(name=name).update(refcount=F('refcount') + 1):
+                return
+            try:
+                self.blobs.create(name=name, size=size, refcount=1)
+                return
+            except IntegrityError:
+                # Created concurrently; count on the existing row
+                continue
+
+    def delete(self, name):
+        """Drop a reference, removing the file with the last one."""
+        if not name:
+            return
+        if blob_hash(name) is None:
+            # Files stored before dedup are not shared
+            return super().delete(name)
+
+        self.blobs.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        if self.blobs.filter(name=name, refcount__gt=0).exists():
+            return
+        self._remove(name, UNREFERENCED_GRACE)
+
+    def _remove(self, name, grace):
+        """Remove an unreferenced blob unless it was saved in the last ``grace`` seconds."""
+        path = self.path(name)
+        trash = f'{path}.{uuid.uuid4().hex}.deleted'
+        try:
+            os.replace(path, trash)
+        except FileNotFoundError:
+            trash = None
+        if trash is not None and time.time() - os.path.getmtime(trash) < grace:
+            # Possibly saved for a row that has not committed yet
+            os.replace(trash, path)
+            return False
+        deleted, _ = self.blobs.filter(name=name, refcount=0).delete()
+        if trash is None:
+            return False
+        if deleted or not self.blobs.filter(name=name).exists():
+            os.remove(trash)
+            from .variants import delete_variants
+            delete_variants(blob_hash(name))
+            return True
+        # Referenced again meanwhile; put the identical bytes back
+        os.replace(trash, path)
+        return False
+
+    def prune(self, grace=UNREFERENCED_GRACE):
+        """
+        Remove blobs unreferenced for longer than ``grace`` seconds.
+
+        These are uploads whose rows never committed and blobs whose last
+        reference went within the grace period. Returns the number removed.
+        """
+        root = self.path(BLOB_PREFIX)
+        if not os.path.isdir(root):
+            return 0
+        cutoff = time.time() - grace
+        referenced = set(self.blobs.filter(refcount__gt=0).values_list('name', flat=True))
+        removed = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.location).replace(os.sep, '/')
+                try:
+                    if os.path.getmtime(path) >= cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                if filename.endswith(('.part', '.deleted')):
+                    # Left by a writer or remover that died
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                elif BLOB_NAME.match(name) and name not in referenced:
+                    removed += self._remove(name, grace)
+        return removed
+
+    def held_hashes(self):
+        """SHA-256 of every blob this node references."""
+        return {blob_hash(name) for name in self.blobs.filter(refcount__gt=0).values_list('name', flat=True)}
+
+
+candidate_file_storage = ContentAddressedStorage()
+
+
+def get_candidate_file_storage():
+    return candidate_file_storage
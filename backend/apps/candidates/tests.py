@@ -0,0 +1,254 @@
+import csv
+import io
+import shutil
+import tempfile
+from datetime import date, datetime
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from utils.testing import make_candidate, make_center, make_user
+from .importers import CandidateImporter, run_pending_upload
+from .models import Blob, Candidate, CandidateBulkUpload, CandidateDocument
+from .search import search_candidates
+
+
+HEADERS = [
+    'Army No.', 'Rank', 'First Name', 'Last Name', 'Date of Birth', 'Gender', 'Phone Number', 'Address',
+    'City', 'State', 'Pincode', 'Father Name', 'Enrollment Date', 'Trade', 'Unit',
+]
+
+
+def roster_row(army_no, **fields):
+    row = {
+        'Army No.': army_no, 'Rank': 'Sepoy', 'First Name': 'Ram', 'Last Name': 'Singh',
+        'Date of Birth': '2000-01-01', 'Gender': 'M', 'Phone Number': '9999999999', 'Address': 'Lines',
+        'City': 'Delhi', 'State': 'Delhi', 'Pincode': '110001', 'Father Name': 'Father',
+        'Enrollment Date': '2020-01-01', 'Trade': 'Clerk', 'Unit': '1 Signals',
+    }
+    row.update(fields)
+    return [row[header] for header in HEADERS]
+
+
+def csv_file(rows):
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(HEADERS)
+    writer.writerows(rows)
+    return text.getvalue().encode('utf-8-sig')
+
+
+def xlsx_file(rows):
+    workbook = Workbook()
+    workbook.active.append(HEADERS)
+    for row in rows:
+        workbook.active.append(row)
+    content = io.BytesIO()
+    workbook.save(content)
+    return content.getvalue()
+
+
+class CandidateImportTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.center = make_center()
+        self.admin = make_user('admin', self.center)
+
+    def import_file(self, name, content, batch_size=2):
+        upload = CandidateBulkUpload(center=self.center, uploaded_by=self.admin)
+        upload.file.save(name, ContentFile(content))
+        return CandidateImporter(upload, batch_size=batch_size).run()
+
+    def test_csv_rows_are_imported_in_batches(self):
+        upload = self.import_file('roster.csv', csv_file([roster_row(f'JC{number:05d}') for number in range(5)]))
+        self.assertEqual(upload.status, 'completed')
+        self.assertEqual((upload.total_records, upload.successful_records, upload.failed_records), (5, 5, 0))
+        candidate = Candidate.objects.get(army_no='JC00003')
+        self.assertEqual((candidate.center, candidate.created_by), (self.center, self.admin))
+        self.assertEqual(candidate.date_of_birth, date(2000, 1, 1))
+
+    def test_xlsx_cells_are_normalised(self):
+        rows = [
+            roster_row('JC00001', **{'Date of Birth': datetime(1999, 5, 17), 'Phone Number': 9876543210.0}),
+            roster_row('JC00002', **{'Pincode': 110002.0}),
+        ]
+        upload = self.import_file('roster.xlsx', xlsx_file(rows))
+        self.assertEqual((upload.status, upload.successful_records), ('completed', 2), upload.error_log)
+        candidate = Candidate.objects.get(army_no='JC00001')
+        self.assertEqual((candidate.date_of_birth, candidate.phone_number), (date(1999, 5, 17), '9876543210'))
+        self.assertEqual(Candidate.objects.get(army_no='JC00002').pincode, '110002')
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        rows = [
+            roster_row('JC00001'),
+            roster_row('JC00002', **{'Gender': 'X'}),
+            roster_row('JC00003', **{'Date of Birth': 'yesterday'}),
+            roster_row('JC00004'),
+        ]
+        upload = self.import_file('roster.csv', csv_file(rows))
+        self.assertEqual(upload.status, 'completed')
+        self.assertEqual((upload.successful_records, upload.failed_records), (2, 2))
+        errors = upload.error_log.splitlines()
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith('Row 3: gender:'), errors)
+        self.assertTrue(errors[1].startswith('Row 4: date_of_birth:'), errors)
+        self.assertCountEqual(Candidate.objects.values_list('army_no', flat=True), ['JC00001', 'JC00004'])
+
+    def test_duplicate_army_numbers_are_rejected(self):
+        make_candidate(self.center, 'JC00009')
+        rows = [roster_row('JC00001'), roster_row('JC00009'), roster_row('JC00002'), roster_row('JC00001')]
+        upload = self.import_file('roster.csv', csv_file(rows))
+        self.assertEqual((upload.successful_records, upload.failed_records), (2, 2))
+        self.assertIn("Row 3: army_no 'JC00009' already exists", upload.error_log)
+        self.assertIn("Row 5: duplicate army_no 'JC00001' in file", upload.error_log)
+        self.assertEqual(Candidate.objects.filter(army_no='JC00001').count(), 1)
+
+    def test_upload_is_queued_and_run_once(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        content = csv_file([roster_row('JC00001'), roster_row('JC00002')])
+        with mock.patch('apps.candidates.views.upload_worker') as worker:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(
+                    '/api/candidates/bulk-upload/', {'file': SimpleUploadedFile('roster.csv', content)},
+                    format='multipart',
+                )
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertFalse(Candidate.objects.exists())
+        upload = worker.submit.call_args.args[0]
+        self.assertEqual(upload.pk, response.data['id'])
+
+        self.assertEqual(run_pending_upload(upload.pk, upload._state.db).status, 'completed')
+        self.assertIsNone(run_pending_upload(upload.pk, upload._state.db))
+        detail = client.get(f'/api/candidates/bulk-upload/{upload.pk}/')
+        self.assertEqual((detail.data['status'], detail.data['successful_records']), ('completed', 2))
+
+
+class CandidateFileStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.candidate = make_candidate(make_center(), 'JC00001')
+        self.storage = CandidateDocument._meta.get_field('document').storage
+
+    def upload(self, content=b'%PDF-1.4 scanned pan card'):
+        return CandidateDocument.objects.create(
+            candidate=self.candidate, document_type='pan', document=SimpleUploadedFile('pan.pdf', content)
+        )
+
+    def refcount(self, name):
+        return Blob.objects.filter(name=name).values_list('refcount', flat=True).first()
+
+    def test_reference_is_taken_when_the_row_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            document = self.upload()
+        name = document.document.name
+        self.assertTrue(name.startswith('blobs/'))
+        self.assertIsNone(self.refcount(name))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_rolled_back_upload_takes_no_reference_and_is_pruned(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    name = self.upload().document.name
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertIsNone(self.refcount(name))
+        self.assertTrue(self.storage.exists(name))
+        # Still within the grace period of an upload that may yet commit
+        self.assertEqual(self.storage.prune(), 0)
+        self.assertEqual(self.storage.prune(grace=0), 1)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_shared_blob_goes_with_its_last_reference(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = self.upload(), self.upload()
+        name = first.document.name
+        self.assertEqual(second.document.name, name)
+        self.assertEqual(self.refcount(name), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(self.storage.exists(name))
+
+        with mock.patch('apps.candidates.storage.UNREFERENCED_GRACE', 0), self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertIsNone(self.refcount(name))
+        self.assertFalse(self.storage.exists(name))
+
+
+class CandidateSearchTests(TestCase):
+    """FTS5 on SQLite, ``icontains`` lookups on other databases."""
+
+    def setUp(self):
+        self.center = make_center()
+        make_candidate(self.center, 'JC-1001/A', first_name='Ram', last_name='Singh')
+        make_candidate(self.center, 'JC-1002/B', first_name='Shyam', last_name='Singh')
+        make_candidate(make_center('CTR002'), 'JC-1003/C', first_name='Ram', last_name='Lal')
+
+    def army_numbers(self, query, **kwargs):
+        return sorted(candidate.army_no for candidate in search_candidates(query, **kwargs))
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.army_numbers('ram singh'), ['JC-1001/A'])
+        self.assertEqual(self.army_numbers('singh'), ['JC-1001/A', 'JC-1002/B'])
+
+    def test_army_number_prefix_keeps_punctuation(self):
+        self.assertEqual(self.army_numbers('JC-100'), ['JC-1001/A', 'JC-1002/B', 'JC-1003/C'])
+        self.assertEqual(self.army_numbers('JC-1002/'), ['JC-1002/B'])
+
+    def test_center_filter_and_empty_query(self):
+        self.assertEqual(self.army_numbers('ram', center_id=self.center.pk), ['JC-1001/A'])
+        self.assertEqual(search_candidates(' ?! '), [])
+
+
+class CandidatePaginationTests(TestCase):
+    def setUp(self):
+        center = make_center()
+        self.admin = make_user('admin', center)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        # Ordering on a nullable, non-unique column: half the rows are NULL
+        for number in range(7):
+            make_candidate(center, f'JC{number:05d}', updated_by=self.admin if number % 2 else None)
+
+    def walk(self, ordering):
+        url, ids = f'/api/candidates/?ordering={ordering}&page_size=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:500])
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_nullable_ordering_pages_every_row_once(self):
+        ids = list(Candidate.objects.order_by('id').values_list('id', flat=True))
+        edited = [pk for number, pk in enumerate(ids) if number % 2]
+        untouched = [pk for number, pk in enumerate(ids) if not number % 2]
+        # NULLs last ascending, first descending, on any backend
+        self.assertEqual(self.walk('updated_by'), edited + untouched)
+        self.assertEqual(self.walk('-updated_by'), untouched[::-1] + edited[::-1])
+
+    def test_tampered_cursor_is_not_found(self):
+        response = self.client.get('/api/candidates/?cursor=cD0lNUIlMjJ4JTIyJTVE')
+        self.assertEqual(response.status_code, 404)
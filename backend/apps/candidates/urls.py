@@ -10,5 +10,8 @@ urlpatterns = [
     path('<int:pk>/update/', views.CandidateUpdateView.as_view(), name='candidate-update'),
     path('<int:pk>/delete/', views.CandidateDeleteView.as_view(), name='candidate-delete'),
     path('bulk-upload/', views.CandidateBulkUploadView.as_view(), name='candidate-bulk-upload'),
+    path('bulk-upload/<int:pk>/', views.CandidateBulkUploadDetailView.as_view(), name='candidate-bulk-upload-detail'),
     path('export/', views.CandidateExportView.as_view(), name='candidate-export'),
+    path('search/', views.CandidateSearchView.as_view(), name='candidate-search'),
+    path('photos/<path:name>', views.PhotoVariantView.as_view(), name='candidate-photo-variant'),
 ]
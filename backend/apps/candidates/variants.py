@@ -0,0 +1,134 @@
+"""
+Resized and WebP variants of candidate photos.
+
+Rosters and admit cards show dozens of photos at a time, so they are served
+small derived images instead of the uploaded originals. Every variant is
+rendered with Pillow from a photo blob (see ``storage.py``) and cached on
+disk under ``variants/``, named after the blob's SHA-256 and the variant
+spec. A name therefore always denotes the same bytes and can be cached by
+clients forever; a new upload gets a new name.
+
+Variants are rendered when a photo is uploaded, on first request when
+missing (e.g. photos staged from an exam package), or in bulk with the
+``generate_photo_variants`` command.
+"""
+import glob
+import io
+import os
+import re
+import uuid
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .storage import blob_hash, candidate_file_storage
+
+
+VARIANT_PREFIX = 'variants/'
+
+# name: (bounding box, format, extension, save options)
+VARIANTS = {
+    'thumb': ((120, 150), 'JPEG', '.jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+    'thumb_webp': ((120, 150), 'WEBP', '.webp', {'quality': 75, 'method': 4}),
+    'medium': ((360, 450), 'JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'medium_webp': ((360, 450), 'WEBP', '.webp', {'quality': 78, 'method': 4}),
+}
+
+VARIANT_NAME = re.compile(
+    r'^variants/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})-(?P<variant>[a-z_]+)-\d+x\d+\.(?:jpg|webp)$'
+)
+
+
+class VariantError(Exception):
+    """A variant that cannot be rendered, e.g. its source photo is gone."""
+
+
+def variant_name(sha256, variant):
+    (width, height), _, ext, _ = VARIANTS[variant]
+    return f'{VARIANT_PREFIX}{sha256[:2]}/{sha256}-{variant}-{width}x{height}{ext}'
+
+
+def variant_path(name):
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+
+def variant_names(photo_name):
+    """``{variant: name}`` for a stored photo, or ``{}`` before dedup."""
+    sha256 = blob_hash(photo_name)
+    if sha256 is None:
+        return {}
+    return {variant: variant_name(sha256, variant) for variant in VARIANTS}
+
+
+def _source_name(sha256):
+    pattern = os.path.join(candidate_file_storage.path('blobs'), sha256[:2], sha256[2:4], f'{sha256}.*')
+    for path in glob.glob(pattern):
+        if not path.endswith(('.part', '.deleted')):
+            return os.path.relpath(path, candidate_file_storage.location)
+    return None
+
+
+def render(source_path, variant):
+    """Render ``variant`` of the image at ``source_path`` and return its bytes."""
+    size, image_format, _, options = VARIANTS[variant]
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail(size, Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+def ensure_variant(name):
+    """
+    Return the path of the variant ``name``, rendering it if it is missing.
+
+    Raises ``VariantError`` for names that are not variants or whose source
+    photo is not stored on this node.
+    """
+    match = VARIANT_NAME.match(name)
+    if match is None or match['variant'] not in VARIANTS or variant_name(match['sha256'], match['variant']) != name:
+        raise VariantError(f"Unknown variant {name}")
+    path = variant_path(name)
+    if os.path.exists(path):
+        return path
+    source = _source_name(match['sha256'])
+    if source is None:
+        raise VariantError(f"No stored photo for {name}")
+
+    try:
+        data = render(candidate_file_storage.path(source), match['variant'])
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise VariantError(f"Cannot render {name}: {exc}") from exc
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{uuid.uuid4().hex}.part'
+    with open(partial, 'wb') as handle:
+        handle.write(data)
+    # Concurrent renders of one variant produce identical bytes
+    os.replace(partial, path)
+    return path
+
+
+def generate_variants(photo_name, force=False):
+    """Render every variant of a stored photo; returns how many were written."""
+    written = 0
+    for name in variant_names(photo_name).values():
+        if force and os.path.exists(variant_path(name)):
+            os.remove(variant_path(name))
+        elif os.path.exists(variant_path(name)):
+            continue
+        ensure_variant(name)
+        written += 1
+    return written
+
+
+def delete_variants(sha256):
+    """Remove the cached variants of a blob that is no longer stored."""
+    pattern = os.path.join(settings.MEDIA_ROOT, VARIANT_PREFIX, sha256[:2], f'{sha256}-*')
+    for path in glob.glob(pattern):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
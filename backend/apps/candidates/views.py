@@ -1,11 +1,23 @@
+import os
+
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
-from .models import Candidate
-from .serializers import CandidateSerializer
+from apps.authentication.models import Center
+from utils.queries import RelatedQuerysetMixin
+from utils.sharding import center_alias, CenterShardMixin, FanOutQuery
+from .models import Candidate, CandidateBulkUpload
+from .serializers import CandidateSerializer, CandidateBulkUploadSerializer, CandidateSearchSerializer
+from .importers import upload_worker
+from .exporters import stream_export
+from .search import search_candidates, search_every_shard
+from .variants import VariantError, ensure_variant
 
-class CandidateListView(generics.ListCreateAPIView):
+class CandidateListView(CenterShardMixin, RelatedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
     permission_classes = [IsAuthenticated]
@@ -15,33 +27,118 @@ class CandidateCreateView(generics.CreateAPIView):
     serializer_class = CandidateSerializer
     permission_classes = [IsAuthenticated]
 
-class CandidateDetailView(generics.RetrieveAPIView):
+class CandidateDetailView(CenterShardMixin, RelatedQuerysetMixin, generics.RetrieveAPIView):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
     permission_classes = [IsAuthenticated]
 
-class CandidateUpdateView(generics.UpdateAPIView):
+class CandidateUpdateView(CenterShardMixin, generics.UpdateAPIView):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
     permission_classes = [IsAuthenticated]
 
-class CandidateDeleteView(generics.DestroyAPIView):
+class CandidateDeleteView(CenterShardMixin, generics.DestroyAPIView):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
     permission_classes = [IsAuthenticated]
 
 class CandidateBulkUploadView(generics.CreateAPIView):
+    """
+    Import a CSV or XLSX candidate roster into a center.
+    
+    The file is stored and queued, and the upload record is returned with
+    202 Accepted; poll ``bulk-upload/<id>/`` for its status and counters.
+    Only admins may upload to a center other than their own.
+    """
+    queryset = CandidateBulkUpload.objects.all()
+    serializer_class = CandidateBulkUploadSerializer
     permission_classes = [IsAuthenticated]
     
     def post(self, request, *args, **kwargs):
-        # TODO: Implement bulk upload functionality
-        return Response({"message": "Bulk upload functionality coming soon"}, status=status.HTTP_200_OK)
+        center_id = request.data.get('center_id') or request.user.center_id
+        if not center_id:
+            return Response({"detail": "center_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if request.user.user_type != 'admin' and str(center_id) != str(request.user.center_id):
+            return Response({"detail": "You can only upload candidates to your own center"}, status=status.HTTP_403_FORBIDDEN)
+        center = get_object_or_404(Center, pk=center_id)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(uploaded_by=request.user, center=center)
+        
+        transaction.on_commit(lambda: upload_worker.submit(upload), using=upload._state.db)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_202_ACCEPTED)
+
+class CandidateBulkUploadDetailView(CenterShardMixin, RelatedQuerysetMixin, generics.RetrieveAPIView):
+    queryset = CandidateBulkUpload.objects.all()
+    serializer_class = CandidateBulkUploadSerializer
+    permission_classes = [IsAuthenticated]
 
-class CandidateExportView(generics.ListAPIView):
+class CandidateExportView(CenterShardMixin, generics.ListAPIView):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
     permission_classes = [IsAuthenticated]
+    filterset_fields = ['center', 'trade', 'unit', 'is_eligible', 'exam_category']
+    
+    def get(self, request, *args, **kwargs):
+        # ``format`` is reserved by DRF for renderer selection
+        export_format = request.query_params.get('export_format', 'csv').lower()
+        if export_format not in settings.EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Unsupported export format. Choose one of: {', '.join(settings.EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.fans_out():
+            queryset = FanOutQuery(queryset)
+        return stream_export(queryset, export_format)
+
+class CandidateSearchView(generics.GenericAPIView):
+    """
+    Ranked full-text search over army number, names, unit and trade.
+
+    ``?q=`` matches every term, the last one as a prefix, so it also serves
+    army-number autocomplete. Narrow with ``?center=`` and ``?limit=``.
+    """
+    serializer_class = CandidateSearchSerializer
+    permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
-        # TODO: Implement export functionality
-        return Response({"message": "Export functionality coming soon"}, status=status.HTTP_200_OK)
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', settings.CANDIDATE_SEARCH_LIMIT)), 100)
+            center_id = request.query_params.get('center')
+            center_id = int(center_id) if center_id else None
+        except ValueError:
+            return Response({"detail": "limit and center must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not query:
+            return Response([])
+        if center_id is None:
+            candidates = search_every_shard(query, limit=max(limit, 1))
+        else:
+            candidates = search_candidates(query, center_id=center_id, limit=max(limit, 1), using=center_alias(center_id))
+        return Response(self.get_serializer(candidates, many=True).data)
+
+
+class PhotoVariantView(generics.GenericAPIView):
+    """
+    Serve a resized candidate photo, rendering it on first request.
+
+    Variant names are derived from the photo's content, so responses never
+    change and may be cached indefinitely.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, name):
+        etag = '"%s"' % os.path.basename(name)
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            try:
+                path = ensure_variant(name)
+            except VariantError:
+                raise Http404
+            response = FileResponse(open(path, 'rb'))
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluation', '0003_evaluation_evaluation_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['evaluator', 'status'], name='evaluation_evaluator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['exam', 'status'], name='evaluation_exam_status_idx'),
+        ),
+    ]
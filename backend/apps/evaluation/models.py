@@ -5,6 +5,7 @@ from apps.authentication.models import User, Center
 from apps.candidates.models import Candidate
 from apps.exams.models import Exam
 from apps.exam_results.models import Result
+from utils.sharding import CenterManager
 
 class Evaluation(models.Model):
     EVALUATION_TYPES = [
@@ -50,8 +51,15 @@ class Evaluation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CenterManager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='evaluation_keyset_idx'),
+            models.Index(fields=['evaluator', 'status'], name='evaluation_evaluator_idx'),
+            models.Index(fields=['exam', 'status'], name='evaluation_exam_status_idx'),
+        ]
         verbose_name = 'Evaluation'
         verbose_name_plural = 'Evaluations'
     
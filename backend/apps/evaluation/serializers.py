@@ -1,11 +1,12 @@
 from rest_framework import serializers
+from utils.fieldsets import SparseFieldsetMixin
 from .models import Evaluation
 from apps.candidates.serializers import CandidateSerializer
 from apps.exams.serializers import ExamSerializer
 from apps.exam_results.serializers import ResultSerializer
 from apps.authentication.serializers import CenterSerializer, UserSerializer
 
-class EvaluationSerializer(serializers.ModelSerializer):
+class EvaluationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     result = ResultSerializer(read_only=True)
     candidate = CandidateSerializer(read_only=True)
     exam = ExamSerializer(read_only=True)
@@ -1,3 +1,37 @@
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from utils.testing import QueryCountTestMixin, make_candidate, make_center, make_exam, make_result, make_user
+from .models import Evaluation
+
+
+class EvaluationListQueryTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin', make_center()))
+        self.created = 0
+
+    def add_evaluations(self, count):
+        for _ in range(count):
+            self.created += 1
+            center = make_center(f'V{self.created:03d}')
+            exam = make_exam(center, make_user(f'setter{self.created}', center), title=f'Exam {self.created}')
+            result = make_result(make_candidate(center, f'JC{self.created:05d}'), exam)
+            Evaluation.objects.create(
+                result=result, candidate=result.candidate, exam=exam, center=center,
+                evaluator=make_user(f'evaluator{self.created}', center, user_type='evaluator'),
+                evaluation_type='written', max_marks=exam.total_marks,
+            )
+
+    def test_list_query_count_is_constant(self):
+        self.assertConstantQueries('/api/evaluation/', self.add_evaluations)
+
+
+class EvaluationIndexTests(TestCase):
+    def test_composite_indexes_exist(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Evaluation._meta.db_table)
+        indexes = {name: info['columns'] for name, info in constraints.items() if info['index']}
+        self.assertEqual(indexes.get('evaluation_evaluator_idx'), ['evaluator_id', 'status'])
+        self.assertEqual(indexes.get('evaluation_exam_status_idx'), ['exam_id', 'status'])
@@ -2,30 +2,33 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from utils.queries import RelatedQuerysetMixin
+from utils.sharding import CenterShardMixin
+from utils.writes import SerializedWriteMixin
 from .models import Evaluation
 from .serializers import EvaluationSerializer
 
-class EvaluationListView(generics.ListCreateAPIView):
+class EvaluationListView(CenterShardMixin, RelatedQuerysetMixin, SerializedWriteMixin, generics.ListCreateAPIView):
     queryset = Evaluation.objects.all()
     serializer_class = EvaluationSerializer
     permission_classes = [IsAuthenticated]
 
-class EvaluationCreateView(generics.CreateAPIView):
+class EvaluationCreateView(SerializedWriteMixin, generics.CreateAPIView):
     queryset = Evaluation.objects.all()
     serializer_class = EvaluationSerializer
     permission_classes = [IsAuthenticated]
 
-class EvaluationDetailView(generics.RetrieveAPIView):
+class EvaluationDetailView(CenterShardMixin, RelatedQuerysetMixin, generics.RetrieveAPIView):
     queryset = Evaluation.objects.all()
     serializer_class = EvaluationSerializer
     permission_classes = [IsAuthenticated]
 
-class EvaluationUpdateView(generics.UpdateAPIView):
+class EvaluationUpdateView(CenterShardMixin, SerializedWriteMixin, generics.UpdateAPIView):
     queryset = Evaluation.objects.all()
     serializer_class = EvaluationSerializer
     permission_classes = [IsAuthenticated]
 
-class EvaluationDeleteView(generics.DestroyAPIView):
+class EvaluationDeleteView(CenterShardMixin, SerializedWriteMixin, generics.DestroyAPIView):
     queryset = Evaluation.objects.all()
     serializer_class = EvaluationSerializer
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,237 @@
+"""
+Item analysis of an exam's objective questions.
+
+Classical test theory statistics are computed from the same response matrix
+that grading builds (see ``grading.py``), so shuffled papers are mapped back
+to the answer key first and every statistic is a whole-array operation:
+
+- p-value: share of candidates answering correctly (omissions count wrong).
+- Point-biserial: correlation of answering correctly with the candidate's
+  score on the rest of the paper, so an item does not correlate with itself.
+- Discrimination index: p-value in the top 27% by score minus the bottom 27%.
+- Distractors: how many candidates picked each option A-D and how picking it
+  correlates with the rest score; a working distractor correlates negatively.
+- KR-20: internal consistency reliability of the objective part of the paper.
+
+An analysis is cached per database under a stamp of the exam's results and
+questions, so it is recomputed once new attempts are submitted or a question
+changes. The p-values can replace the hand-tagged ``Question.difficulty``
+once enough candidates have answered (``recalibrate_difficulty``).
+"""
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from apps.exams.models import ExamQuestion
+from apps.exams.shuffling import OPTION_LETTERS
+from apps.questions.models import Question
+from .autosave import answer_buffer
+from .grading import UNANSWERED, AnswerKey, load_responses, unshuffle_responses
+from .models import Result
+
+
+ANALYSED_STATUSES = ('completed', 'evaluated')
+
+CACHE_KEY = 'item-analysis:{using}:{exam_id}:{stamp}'
+
+# Share of candidates in each of the upper and lower scoring groups
+GROUP_FRACTION = 0.27
+
+
+def suggested_difficulty(p_value):
+    """Difficulty level matching an observed p-value."""
+    if p_value >= settings.ITEM_ANALYSIS_EASY_P_VALUE:
+        return 'easy'
+    if p_value < settings.ITEM_ANALYSIS_HARD_P_VALUE:
+        return 'hard'
+    return 'medium'
+
+
+def _rounded(values, digits=4):
+    """JSON-ready floats; undefined statistics become ``None``."""
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+
+def rest_correlations(indicators, rest):
+    """
+    Column-wise Pearson correlation of ``indicators`` with ``rest``.
+
+    Both are ``(candidates, questions)``; columns without variance give NaN.
+    """
+    if not len(indicators):
+        return np.full(indicators.shape[1], np.nan)
+    indicators = indicators - indicators.mean(axis=0)
+    rest = rest - rest.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (indicators * rest).sum(axis=0) / np.sqrt((indicators ** 2).sum(axis=0) * (rest ** 2).sum(axis=0))
+
+
+def analyse_responses(key, responses):
+    """
+    Item statistics of a ``(candidates x questions)`` response matrix.
+
+    Returns ``(exam_statistics, item_statistics)``; items are in paper order.
+    """
+    candidates, questions = responses.shape
+    correct = (responses == key.codes[np.newaxis, :]).astype(np.float64)
+    scores = correct @ key.marks
+    # Score on the rest of the paper, per question
+    rest = scores[:, np.newaxis] - correct * key.marks[np.newaxis, :]
+
+    p_values = correct.mean(axis=0) if candidates else np.full(questions, np.nan)
+    point_biserial = rest_correlations(correct, rest)
+
+    group = int(round(candidates * GROUP_FRACTION))
+    if group:
+        order = np.argsort(scores, kind='stable')
+        discrimination = correct[order[-group:]].mean(axis=0) - correct[order[:group]].mean(axis=0)
+    else:
+        discrimination = np.full(questions, np.nan)
+
+    # Number-correct variance, as KR-20 assumes dichotomous items
+    total_variance = correct.sum(axis=1).var() if candidates else 0.0
+    if questions > 1 and total_variance > 0:
+        kr20 = questions / (questions - 1) * (1 - (p_values * (1 - p_values)).sum() / total_variance)
+    else:
+        kr20 = np.nan
+
+    options = {}
+    multiple_choice = np.array([question_type == 'multiple_choice' for question_type in key.question_types], dtype=bool)
+    for letter in OPTION_LETTERS:
+        code = key.vocabulary.get(letter)
+        chosen = (responses == code).astype(np.float64) if code is not None else np.zeros_like(correct)
+        options[letter] = (chosen.sum(axis=0).astype(np.int64), rest_correlations(chosen, rest))
+    omitted = (responses == UNANSWERED).sum(axis=0)
+
+    columns = {
+        'p_value': _rounded(p_values),
+        'point_biserial': _rounded(point_biserial),
+        'discrimination': _rounded(discrimination),
+    }
+    option_columns = {
+        letter: (counts.tolist(), _rounded(counts / candidates if candidates else counts * np.nan), _rounded(correlations))
+        for letter, (counts, correlations) in options.items()
+    }
+    items = []
+    for index, question_id in enumerate(key.question_ids.tolist()):
+        item = {
+            'question': question_id,
+            'question_type': key.question_types[index],
+            'marks': int(key.marks[index]),
+            'omitted': int(omitted[index]),
+            **{name: values[index] for name, values in columns.items()},
+        }
+        if multiple_choice[index]:
+            key_code = int(key.codes[index])
+            item['options'] = {
+                letter: {
+                    'count': counts[index],
+                    'proportion': proportions[index],
+                    'point_biserial': correlations[index],
+                    'correct': key.vocabulary.get(letter) == key_code,
+                }
+                for (letter, (counts, proportions, correlations)), text in zip(option_columns.items(), key.options[index])
+                if text
+            }
+        items.append(item)
+
+    exam_statistics = {
+        'candidates': candidates,
+        'questions': questions,
+        'max_marks': key.max_marks,
+        'mean_score': _rounded([scores.mean() if candidates else np.nan], 2)[0],
+        'score_sd': _rounded([scores.std() if candidates else np.nan], 2)[0],
+        'kr20': _rounded([kr20])[0],
+    }
+    return exam_statistics, items
+
+
+def analysis_stamp(exam):
+    """Digest of everything an analysis depends on; changes invalidate the cache."""
+    using = exam._state.db
+    results = Result.objects.using(using).filter(exam=exam, status__in=ANALYSED_STATUSES).aggregate(
+        count=Count('id'), updated=Max('updated_at')
+    )
+    paper = ExamQuestion.objects.using(using).filter(exam=exam).aggregate(
+        count=Count('id'), updated=Max('question__updated_at')
+    )
+    parts = [exam.updated_at, results['count'], results['updated'], paper['count'], paper['updated']]
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def build_analysis(exam):
+    """Compute the item analysis of ``exam`` from its submitted results."""
+    # Answers still buffered by any worker count too
+    answer_buffer.flush_all()
+    key = AnswerKey(exam)
+    results = list(
+        Result.objects.using(exam._state.db).filter(exam=exam, status__in=ANALYSED_STATUSES)
+        .order_by('id').values_list('id', 'candidate_id')
+    )
+    responses = load_responses(key, [result_id for result_id, _ in results])
+    if key.shuffle_options:
+        unshuffle_responses(key, responses, [candidate_id for _, candidate_id in results])
+    exam_statistics, items = analyse_responses(key, responses)
+
+    difficulties = dict(
+        Question.objects.using(exam._state.db).filter(id__in=key.question_ids.tolist())
+        .values_list('id', 'difficulty')
+    )
+    for item in items:
+        item['difficulty'] = difficulties.get(item['question'])
+        item['suggested_difficulty'] = (
+            suggested_difficulty(item['p_value']) if item['p_value'] is not None else None
+        )
+    return {
+        'exam': exam.pk,
+        **exam_statistics,
+        'generated_at': timezone.now().isoformat(),
+        'items': items,
+    }
+
+
+def item_analysis(exam):
+    """Return the cached item analysis of ``exam``, computing it on a miss."""
+    key = CACHE_KEY.format(using=exam._state.db, exam_id=exam.pk, stamp=analysis_stamp(exam))
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = build_analysis(exam)
+        cache.set(key, analysis, settings.ITEM_ANALYSIS_CACHE_TIMEOUT)
+    return analysis
+
+
+def recalibrate_difficulty(exam, min_candidates=None, commit=True):
+    """
+    Set ``difficulty`` of ``exam``'s objective questions from their p-values.
+
+    Nothing changes until at least ``min_candidates`` results were analysed.
+    Questions are updated with one query per difficulty level. Returns the
+    changes as ``{question_id: (old, new)}``.
+    """
+    if min_candidates is None:
+        min_candidates = settings.ITEM_ANALYSIS_MIN_CANDIDATES
+    analysis = item_analysis(exam)
+    if analysis['candidates'] < min_candidates:
+        return {}
+    changes = {
+        item['question']: (item['difficulty'], item['suggested_difficulty'])
+        for item in analysis['items']
+        if item['suggested_difficulty'] and item['suggested_difficulty'] != item['difficulty']
+    }
+    if commit and changes:
+        levels = defaultdict(list)
+        for question_id, (_, difficulty) in changes.items():
+            levels[difficulty].append(question_id)
+        using = exam._state.db
+        now = timezone.now()
+        with transaction.atomic(using=using):
+            for difficulty, question_ids in levels.items():
+                # updated_at marks the rows for sync and re-fingerprinting
+                Question.objects.using(using).filter(pk__in=question_ids).update(difficulty=difficulty, updated_at=now)
+    return changes
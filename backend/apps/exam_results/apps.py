@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ExamResultsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.exam_results'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,349 @@
+"""
+Write-behind buffer for answer autosave.
+
+Autosave requests only append to a per-process journal file and update an
+in-memory map keyed by ``(alias, result_id, question_id)``; the request is
+acknowledged as soon as the journal line is on disk. A background thread
+periodically swaps the map out and writes the coalesced, last-write-wins
+answers to the database in one transaction per database alias, so an
+attempt's answers land on the shard its result was read from.
+
+The journal makes acknowledged answers crash-safe. Every flush rotates it
+into a segment that is deleted once the batch is committed; segments and
+journals left behind by a process that died are replayed the next time a
+buffer starts. File names carry a token that is unique per buffer start as
+well as the pid, so a process that reuses a dead one's pid replays its
+files instead of appending to or overwriting them.
+
+Grading and item analysis need every acknowledged answer in the database,
+including those still buffered by other workers. ``flush_all`` writes the
+journals of every process sharing ``AUTOSAVE_JOURNAL_DIR`` as well; replaying
+is last-write-wins, so writing an answer twice is harmless.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from utils.sharding import center_alias
+from utils.writes import run_serialized
+from .models import Answer, Result
+
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PREFIX = 'answers-'
+
+RESULT_STATE_KEY = 'autosave-result:{using}:{result_id}'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_answers(entries):
+    """
+    Upsert ``{(alias, result_id, question_id): (response, answered_at)}``.
+
+    Rows that already hold a newer answer are left alone, so replaying an
+    old journal can never overwrite a later save.
+    """
+    databases = defaultdict(dict)
+    for (using, result_id, question_id), value in entries.items():
+        databases[using][(result_id, question_id)] = value
+    return sum(_write_database(using, answers) for using, answers in databases.items())
+
+
+def _write_database(using, entries):
+    # Attempts deleted since the answer was journalled are dropped
+    result_ids = set(
+        Result.objects.using(using).filter(pk__in={result_id for result_id, _ in entries})
+        .values_list('pk', flat=True)
+    )
+    stored = {
+        (result_id, question_id): answered_at
+        for result_id, question_id, answered_at in Answer.objects.using(using).filter(
+            result_id__in=result_ids
+        ).values_list('result_id', 'question_id', 'answered_at')
+    }
+    answers = [
+        Answer(result_id=result_id, question_id=question_id, response=response, answered_at=answered_at)
+        for (result_id, question_id), (response, answered_at) in entries.items()
+        if result_id in result_ids and stored.get((result_id, question_id), answered_at) <= answered_at
+    ]
+    run_serialized(_upsert_answers, answers, using, using=using)
+    return len(answers)
+
+
+def _upsert_answers(answers, using):
+    with transaction.atomic(using=using):
+        Answer.objects.using(using).bulk_create(
+            answers,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['result', 'question'],
+            update_fields=['response', 'answered_at'],
+        )
+
+
+def get_result_state(result_id, using):
+    """
+    Return ``{'exam_id', 'status', 'army_no'}`` for an attempt on ``using``.
+
+    ``army_no`` is the candidate's, which ties the attempt to the account
+    linked to that candidate. Served from the cache when possible. Returns
+    ``None`` for unknown attempts.
+    """
+    key = RESULT_STATE_KEY.format(using=using, result_id=result_id)
+    state = cache.get(key)
+    if state is not None:
+        return state
+    row = (
+        Result.objects.using(using).filter(pk=result_id)
+        .values('exam_id', 'status', army_no=F('candidate__army_no')).first()
+    )
+    if row is None:
+        return None
+    cache.set(key, row, settings.AUTOSAVE_STATE_CACHE_TIMEOUT)
+    return row
+
+
+def start_attempt(result_id, using, state):
+    """Move a pending attempt to ``in_progress`` on its first autosave."""
+    if state['status'] != 'pending':
+        return state
+    Result.objects.using(using).filter(pk=result_id, status='pending').update(
+        status='in_progress', started_at=timezone.now()
+    )
+    state = {**state, 'status': 'in_progress'}
+    cache.set(RESULT_STATE_KEY.format(using=using, result_id=result_id), state, settings.AUTOSAVE_STATE_CACHE_TIMEOUT)
+    return state
+
+
+def forget_result_state(*result_ids, using):
+    cache.delete_many([RESULT_STATE_KEY.format(using=using, result_id=result_id) for result_id in result_ids])
+
+
+def read_journal(path):
+    """
+    Load a journal file into a coalesced entry map, skipping a torn last line.
+
+    Lines written before answers were routed by database carry no alias and
+    belong to the local center's database.
+    """
+    entries = {}
+    with open(path, encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                fields = json.loads(line)
+                if len(fields) == 4:
+                    fields = [center_alias(settings.CENTER_ID), *fields]
+                using, result_id, question_id, response, answered_at = fields
+            except (TypeError, ValueError):
+                continue
+            answered_at = datetime.fromisoformat(answered_at)
+            key = (using, result_id, question_id)
+            if key not in entries or entries[key][1] <= answered_at:
+                entries[key] = (response, answered_at)
+    return entries
+
+
+class AnswerBuffer:
+    """Per-process autosave buffer with a durable journal."""
+
+    def __init__(self, journal_dir, flush_interval, fsync=True):
+        self.journal_dir = str(journal_dir)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.pid = os.getpid()
+        self.token = None
+        self.pending = {}
+        self.segments = []
+        self.segment_number = 0
+        self.journal = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.started = False
+        self.thread = None
+        self.stopped = threading.Event()
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.journal_dir, f'{JOURNAL_PREFIX}{self.token}.jsonl')
+
+    def start(self):
+        """Recover orphaned journals and start the flush thread (idempotent)."""
+        with self.lock:
+            if self.started and self.pid == os.getpid():
+                return
+            # A forked worker must not share its parent's journal or thread
+            self.pid = os.getpid()
+            self.token = f'{self.pid}-{uuid.uuid4().hex}'
+            self.pending = {}
+            self.segments = []
+            self.segment_number = 0
+            self.journal = None
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self.started = True
+
+        self.recover()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='answer-autosave', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def add(self, result_id, answers, using):
+        """
+        Journal and buffer ``answers`` (``{question_id: response}``).
+
+        ``using`` is the database the attempt's result lives in.
+
+        Returns the server timestamp recorded for the batch once it is durable.
+        """
+        self.start()
+        answered_at = timezone.now()
+        stamp = answered_at.isoformat()
+        lines = ''.join(
+            json.dumps([using, result_id, question_id, response, stamp]) + '\n'
+            for question_id, response in answers.items()
+        )
+        with self.lock:
+            if self.journal is None:
+                self.journal = open(self.journal_path, 'a', encoding='utf-8')
+            self.journal.write(lines)
+            self.journal.flush()
+            if self.fsync:
+                os.fsync(self.journal.fileno())
+            for question_id, response in answers.items():
+                self.pending[(using, result_id, question_id)] = (response, answered_at)
+        return answered_at
+
+    def rotate(self):
+        """Close the live journal into a numbered segment. Caller holds ``lock``."""
+        if self.journal is None:
+            return
+        self.journal.close()
+        self.journal = None
+        self.segment_number += 1
+        segment = os.path.join(
+            self.journal_dir, f'{JOURNAL_PREFIX}{self.token}-{self.segment_number}.segment'
+        )
+        os.replace(self.journal_path, segment)
+        self.segments.append(segment)
+
+    def flush(self):
+        """Write everything buffered so far to the database."""
+        if not self.started or self.pid != os.getpid():
+            return 0
+        with self.flush_lock:
+            with self.lock:
+                batch, self.pending = self.pending, {}
+                self.rotate()
+            if not batch:
+                return 0
+            try:
+                written = write_answers(batch)
+            except Exception:
+                logger.exception('Answer autosave flush failed; will retry')
+                with self.lock:
+                    # Keep newer answers that arrived during the failed flush
+                    for key, value in batch.items():
+                        self.pending.setdefault(key, value)
+                return 0
+            for segment in self.segments:
+                os.remove(segment)
+            self.segments = []
+            return written
+
+    def journal_names(self):
+        if not os.path.isdir(self.journal_dir):
+            return []
+        return sorted(name for name in os.listdir(self.journal_dir) if name.startswith(JOURNAL_PREFIX))
+
+    def recover(self):
+        """
+        Replay segments and journals left behind by dead processes.
+
+        Files of this pid under another token were left by an earlier process
+        that had the same pid, so they are replayed too. Another worker may
+        replay and remove the same file at the same time.
+        """
+        for name in self.journal_names():
+            if name.startswith(f'{JOURNAL_PREFIX}{self.token}'):
+                continue
+            pid = int(name[len(JOURNAL_PREFIX):].split('-')[0].split('.')[0])
+            if pid != self.pid and _pid_alive(pid):
+                continue
+            path = os.path.join(self.journal_dir, name)
+            try:
+                write_answers(read_journal(path))
+            except FileNotFoundError:
+                continue
+            except Exception:
+                logger.exception('Could not replay answer journal %s', path)
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            logger.info('Replayed answer journal %s', path)
+
+    def flush_all(self):
+        """
+        Write the answers buffered by every process to the database.
+
+        Flushes this process's buffer, then writes the journals and segments
+        of all processes sharing the journal directory, live ones included.
+        Files are left for their owners to remove. A journal rotated into a
+        segment while being read shows up under its new name on the next
+        pass. Raises when answers cannot be written, so callers never work
+        from a partial set.
+        """
+        self.flush()
+        done = set()
+        while True:
+            names = [name for name in self.journal_names() if name not in done]
+            if not names:
+                return
+            for name in names:
+                done.add(name)
+                try:
+                    entries = read_journal(os.path.join(self.journal_dir, name))
+                except FileNotFoundError:
+                    # Rotated or written and removed by its owner meanwhile
+                    continue
+                write_answers(entries)
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+        self.flush()
+
+
+answer_buffer = AnswerBuffer(
+    settings.AUTOSAVE_JOURNAL_DIR,
+    settings.AUTOSAVE_FLUSH_INTERVAL,
+    fsync=settings.AUTOSAVE_FSYNC,
+)
@@ -0,0 +1,264 @@
+"""
+Vectorised auto-grading for objective questions.
+
+The answer key of an exam and every submitted response are encoded as small
+integers and loaded into NumPy arrays, so a whole exam is scored with a single
+comparison and matrix product instead of a Python loop per candidate.
+
+On exams with ``shuffle_options`` a candidate answers with the letter shown
+on their copy of the paper. Those letters are encoded apart from the answer
+key's letters and mapped back per candidate by ``unshuffle_responses``,
+again as whole-array operations (see ``apps.exams.shuffling``).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from apps.exams.models import ExamQuestion
+from apps.exams.shuffling import OPTION_LETTERS, option_orders
+from utils.writes import run_serialized
+from .autosave import answer_buffer, forget_result_state
+from .models import Answer, Result
+
+
+AUTO_GRADED_TYPES = ('multiple_choice', 'true_false')
+
+TRUE_FALSE_ALIASES = {
+    'T': 'TRUE', 'TRUE': 'TRUE', 'YES': 'TRUE',
+    'F': 'FALSE', 'FALSE': 'FALSE', 'NO': 'FALSE',
+}
+
+# Response codes that can never match a key entry
+UNANSWERED = -1
+NO_KEY = -2
+INVALID_CHOICE = -3
+
+# Candidates of an exam whose option orders are computed at once
+UNSHUFFLE_BATCH = 2048
+
+
+def normalize_answer(question_type, options, value):
+    """
+    Reduce an answer to a canonical token.
+
+    Multiple choice answers become an option letter, accepting either the
+    letter itself or the option text; true/false answers become TRUE/FALSE.
+    """
+    token = (value or '').strip().upper()
+    if not token:
+        return ''
+    if question_type == 'multiple_choice':
+        if token in OPTION_LETTERS:
+            return token
+        for letter, text in zip(OPTION_LETTERS, options):
+            if text and token == text.strip().upper():
+                return letter
+        return token
+    if question_type == 'true_false':
+        return TRUE_FALSE_ALIASES.get(token, token)
+    return token
+
+
+class AnswerKey:
+    """Answer key of an exam paper encoded as parallel NumPy arrays."""
+
+    def __init__(self, exam):
+        self.exam_id = exam.pk
+        self.shuffle_options = exam.shuffle_options
+        # The exam's shard holds its paper, results and answers
+        self.using = exam._state.db
+        rows = list(
+            ExamQuestion.objects.using(self.using).filter(exam=exam)
+            .order_by('order', 'id')
+            .values_list(
+                'question_id', 'question__question_type', 'question__marks',
+                'question__correct_answer', 'question__option_a', 'question__option_b',
+                'question__option_c', 'question__option_d',
+            )
+        )
+        self.fully_objective = all(row[1] in AUTO_GRADED_TYPES for row in rows)
+        rows = [row for row in rows if row[1] in AUTO_GRADED_TYPES]
+
+        self.vocabulary = {}
+        self.question_types = [row[1] for row in rows]
+        self.options = [row[4:8] for row in rows]
+        self.question_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.marks = np.array([row[2] for row in rows], dtype=np.int64)
+        self.codes = np.array(
+            [self.encode(index, row[3]) for index, row in enumerate(rows)],
+            dtype=np.int32,
+        )
+        # A question without a usable key must not match unanswered cells
+        self.codes[self.codes == UNANSWERED] = NO_KEY
+        self.columns = {qid: index for index, qid in enumerate(self.question_ids.tolist())}
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    @property
+    def max_marks(self):
+        return int(self.marks.sum())
+
+    def encode(self, column, value):
+        """Return the integer code of ``value`` for the question in ``column``."""
+        token = normalize_answer(self.question_types[column], self.options[column], value)
+        if not token:
+            return UNANSWERED
+        return self.vocabulary.setdefault(token, len(self.vocabulary))
+    
+    def encode_response(self, column, value):
+        """
+        Like ``encode``, for a candidate's response.
+
+        Letters picked on a shuffled paper are kept as displayed letters,
+        distinct from the key's letters, until ``unshuffle_responses``.
+        """
+        if self.shuffle_options and self.question_types[column] == 'multiple_choice':
+            token = (value or '').strip().upper()
+            if token in OPTION_LETTERS:
+                return self.vocabulary.setdefault(('shown', token), len(self.vocabulary))
+        return self.encode(column, value)
+
+
+def load_responses(key, result_ids):
+    """
+    Build the ``(results x questions)`` response matrix for ``result_ids``.
+
+    Unanswered cells hold ``UNANSWERED``.
+    """
+    result_ids = np.asarray(result_ids, dtype=np.int64)
+    matrix = np.full((len(result_ids), len(key)), UNANSWERED, dtype=np.int32)
+    if not len(result_ids) or not len(key):
+        return matrix
+
+    rows = (
+        Answer.objects.using(key.using)
+        .filter(result_id__in=result_ids.tolist(), question_id__in=key.question_ids.tolist())
+        .values_list('result_id', 'question_id', 'response')
+        .iterator(chunk_size=10000)
+    )
+    answer_results, answer_columns, answer_codes = [], [], []
+    codes = {}
+    for result_id, question_id, response in rows:
+        column = key.columns[question_id]
+        code = codes.get((column, response))
+        if code is None:
+            code = codes[(column, response)] = key.encode_response(column, response)
+        answer_results.append(result_id)
+        answer_columns.append(column)
+        answer_codes.append(code)
+
+    if answer_results:
+        order = np.argsort(result_ids)
+        positions = order[np.searchsorted(result_ids, answer_results, sorter=order)]
+        matrix[positions, answer_columns] = answer_codes
+    return matrix
+
+
+def unshuffle_responses(key, responses, candidate_ids):
+    """
+    Map displayed letters in ``responses`` back to the key's letters, in place.
+
+    Row ``i`` holds the responses of candidate ``candidate_ids[i]``.
+    """
+    columns = np.array(
+        [index for index, question_type in enumerate(key.question_types) if question_type == 'multiple_choice'],
+        dtype=np.int64,
+    )
+    if not len(columns) or not len(responses):
+        return responses
+
+    letter_codes = np.array([key.vocabulary.setdefault(letter, len(key.vocabulary)) for letter in OPTION_LETTERS])
+    # Displayed position of every code; -1 for codes that are not a displayed letter
+    positions = np.full(len(key.vocabulary), -1, dtype=np.int64)
+    for position, letter in enumerate(OPTION_LETTERS):
+        code = key.vocabulary.get(('shown', letter))
+        if code is not None:
+            positions[code] = position
+    present = np.array([[bool(text) for text in key.options[column]] for column in columns], dtype=bool)
+    option_counts = present.sum(axis=1)
+    question_ids = key.question_ids[columns]
+
+    candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+    for start in range(0, len(responses), UNSHUFFLE_BATCH):
+        stop = start + UNSHUFFLE_BATCH
+        block = responses[start:stop][:, columns]
+        shown = np.where(block >= 0, positions[np.maximum(block, 0)], -1)
+        orders = option_orders(key.exam_id, candidate_ids[start:stop], question_ids, present)
+        original = np.take_along_axis(orders, np.maximum(shown, 0)[..., np.newaxis], axis=-1)[..., 0]
+        # A letter beyond the question's options can never be right
+        mapped = np.where(shown < option_counts, letter_codes[original], INVALID_CHOICE)
+        responses[start:stop, columns] = np.where(shown >= 0, mapped, block)
+    return responses
+
+
+def score_responses(key, responses):
+    """Return the marks obtained by each row of the response matrix."""
+    correct = responses == key.codes[np.newaxis, :]
+    return correct.astype(np.int64) @ key.marks
+
+
+def _write_scores(groups, values, using):
+    with transaction.atomic(using=using):
+        for (obtained, percentage), ids in groups.items():
+            Result.objects.using(using).filter(pk__in=ids).update(
+                marks_obtained=obtained,
+                percentage=Decimal(str(percentage)).quantize(Decimal('0.01')),
+                **values
+            )
+    if 'status' in values:
+        # update() sends no signals, so drop the autosave state cached for the attempts
+        forget_result_state(*(pk for ids in groups.values() for pk in ids), using=using)
+
+
+def grade_exam(exam, statuses=('completed',)):
+    """
+    Grade every submitted result of ``exam`` in one pass.
+
+    Marks and percentages are written back in a single transaction. Results are
+    only marked ``evaluated`` when the paper has no subjective questions;
+    otherwise the objective marks are recorded and the status is left for
+    manual evaluation to finish.
+    """
+    # Answers still buffered by any worker must be graded too
+    answer_buffer.flush_all()
+    key = AnswerKey(exam)
+    results = list(
+        Result.objects.using(key.using).filter(exam=exam, status__in=statuses)
+        .values_list('id', 'total_marks', 'candidate_id')
+    )
+    if not results:
+        return {'exam': exam.pk, 'graded': 0, 'evaluated': 0, 'average_marks': None}
+
+    result_ids = [result_id for result_id, _, _ in results]
+    responses = load_responses(key, result_ids)
+    if key.shuffle_options:
+        unshuffle_responses(key, responses, [candidate_id for _, _, candidate_id in results])
+    marks = score_responses(key, responses)
+
+    totals = np.array([total or key.max_marks for _, total, _ in results], dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(totals > 0, np.round(marks * 100.0 / totals, 2), 0.0)
+
+    # Scores cluster on a small set of values, so one UPDATE per distinct
+    # (marks, percentage) pair is far cheaper than a per-row CASE expression.
+    groups = defaultdict(list)
+    for result_id, obtained, percentage in zip(result_ids, marks.tolist(), percentages.tolist()):
+        groups[(obtained, percentage)].append(result_id)
+
+    values = {}
+    if key.fully_objective:
+        values = {'status': 'evaluated', 'evaluated_at': timezone.now()}
+    run_serialized(_write_scores, groups, values, key.using, using=key.using)
+
+    return {
+        'exam': exam.pk,
+        'graded': len(results),
+        'evaluated': len(results) if key.fully_objective else 0,
+        'questions_graded': len(key),
+        'max_marks': key.max_marks,
+        'average_marks': round(float(marks.mean()), 2),
+    }
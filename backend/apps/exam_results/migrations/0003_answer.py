@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+        ('exam_results', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Answer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response', models.TextField(blank=True)),
+                ('answered_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='questions.question')),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='exam_results.result')),
+            ],
+            options={
+                'verbose_name': 'Answer',
+                'verbose_name_plural': 'Answers',
+                'ordering': ['result', 'question'],
+                'unique_together': {('result', 'question')},
+            },
+        ),
+    ]
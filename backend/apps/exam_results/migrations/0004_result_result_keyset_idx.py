@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_results', '0003_answer'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['-created_at', '-id'], name='result_keyset_idx'),
+        ),
+    ]
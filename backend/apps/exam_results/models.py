@@ -4,6 +4,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.authentication.models import User, Center
 from apps.candidates.models import Candidate
 from apps.exams.models import Exam
+from apps.questions.models import Question
+from utils.sharding import CenterManager
 
 class Result(models.Model):
     STATUS_CHOICES = [
@@ -38,8 +40,15 @@ class Result(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CenterManager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='result_keyset_idx'),
+            models.Index(fields=['exam', 'status'], name='result_exam_status_idx'),
+            models.Index(fields=['center', 'status'], name='result_center_status_idx'),
+        ]
         unique_together = ['candidate', 'exam', 'attempt_number']
         verbose_name = 'Result'
         verbose_name_plural = 'Results'
@@ -65,3 +74,25 @@ class Result(models.Model):
             self.percentage = (self.marks_obtained / self.total_marks) * 100
             self.save()
         return self.percentage
+
+
+class Answer(models.Model):
+    """A candidate's response to a single question of an exam attempt."""
+    result = models.ForeignKey(Result, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
+    
+    # Option letter for objective questions, free text otherwise
+    response = models.TextField(blank=True)
+    
+    answered_at = models.DateTimeField(default=timezone.now)
+    
+    objects = CenterManager()
+    
+    class Meta:
+        ordering = ['result', 'question']
+        unique_together = ['result', 'question']
+        verbose_name = 'Answer'
+        verbose_name_plural = 'Answers'
+    
+    def __str__(self):
+        return f"Result {self.result_id} - Question {self.question_id}"
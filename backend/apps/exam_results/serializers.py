@@ -1,10 +1,11 @@
 from rest_framework import serializers
+from utils.fieldsets import SparseFieldsetMixin
 from .models import Result
 from apps.candidates.serializers import CandidateSerializer
 from apps.exams.serializers import ExamSerializer
 from apps.authentication.serializers import CenterSerializer
 
-class ResultSerializer(serializers.ModelSerializer):
+class ResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     candidate = CandidateSerializer(read_only=True)
     exam = ExamSerializer(read_only=True)
     center = CenterSerializer(read_only=True)
@@ -25,3 +26,17 @@ class ResultSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Attempt number must be positive")
         
         return data
+
+
+class AutosaveItemSerializer(serializers.Serializer):
+    question = serializers.IntegerField(min_value=1)
+    response = serializers.CharField(allow_blank=True, trim_whitespace=False)
+
+
+class AnswerAutosaveSerializer(serializers.Serializer):
+    answers = AutosaveItemSerializer(many=True, allow_empty=False)
+
+
+class DifficultyRecalibrationSerializer(serializers.Serializer):
+    min_candidates = serializers.IntegerField(min_value=1, required=False)
+    dry_run = serializers.BooleanField(default=False)
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .autosave import forget_result_state
+from .models import Result
+
+
+@receiver([post_save, post_delete], sender=Result)
+def result_changed(sender, instance, using, **kwargs):
+    forget_result_state(instance.pk, using=using)
@@ -1,3 +1,312 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from utils.testing import (
+    QueryCountTestMixin, make_candidate, make_center, make_exam, make_question, make_result, make_user,
+)
+from apps.exams.shuffling import OPTION_LETTERS, option_orders
+from .autosave import JOURNAL_PREFIX, RESULT_STATE_KEY, AnswerBuffer, write_answers
+from .analysis import analyse_responses, recalibrate_difficulty
+from .grading import UNANSWERED, AnswerKey, grade_exam
+from apps.questions.models import Question
+from .models import Answer, Result
+
+
+class ResultListQueryTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin', make_center()))
+        self.created = 0
+
+    def add_results(self, count):
+        for _ in range(count):
+            self.created += 1
+            center = make_center(f'R{self.created:03d}')
+            exam = make_exam(center, make_user(f'setter{self.created}', center), title=f'Exam {self.created}')
+            make_result(make_candidate(center, f'JC{self.created:05d}'), exam)
+
+    def test_list_query_count_is_constant(self):
+        self.assertConstantQueries('/api/results/', self.add_results)
+
+
+class ResultIndexTests(TestCase):
+    def test_composite_indexes_exist(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Result._meta.db_table)
+        indexes = {name: info['columns'] for name, info in constraints.items() if info['index']}
+        self.assertEqual(indexes.get('result_exam_status_idx'), ['exam_id', 'status'])
+        self.assertEqual(indexes.get('result_center_status_idx'), ['center_id', 'status'])
+
+
+class AnswerAutosaveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        center = make_center()
+        admin = make_user('admin', center)
+        self.question = make_question(center, admin)
+        exam = make_exam(center, admin, questions=[self.question])
+        self.result = make_result(make_candidate(center, 'JC00001'), exam, status='pending')
+        self.url = f'/api/results/{self.result.pk}/answers/'
+        self.body = {'answers': [{'question': self.question.pk, 'response': 'B'}]}
+        self.client = APIClient()
+
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir, ignore_errors=True)
+        self.buffer = AnswerBuffer(self.journal_dir, flush_interval=3600, fsync=False)
+        self.addCleanup(self.buffer.stopped.set)
+        patcher = mock.patch('apps.exam_results.views.answer_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_candidate_saves_own_attempt(self):
+        self.client.force_authenticate(make_user('jc00001', user_type='candidate', army_no='JC00001'))
+        response = self.client.post(self.url, self.body, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        self.buffer.flush()
+        self.assertEqual(Answer.objects.get(result=self.result, question=self.question).response, 'B')
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.status, 'in_progress')
+
+    def test_other_candidate_is_rejected(self):
+        self.client.force_authenticate(make_user('jc00002', user_type='candidate', army_no='JC00002'))
+        response = self.client.post(self.url, self.body, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.status, 'pending')
+        self.assertFalse(os.listdir(self.journal_dir))
+
+    def test_journal_of_a_dead_process_with_the_same_pid_is_replayed(self):
+        # Left by an earlier process that had this pid: an old-style segment
+        # that a new segment 1 must neither skip nor overwrite
+        segment = os.path.join(self.journal_dir, f'{JOURNAL_PREFIX}{os.getpid()}-1.segment')
+        with open(segment, 'w', encoding='utf-8') as journal:
+            journal.write(json.dumps(
+                [DEFAULT_DB_ALIAS, self.result.pk, self.question.pk, 'C', '2030-01-01T00:00:00+00:00']
+            ) + '\n')
+        self.buffer.start()
+        self.assertEqual(Answer.objects.get(result=self.result, question=self.question).response, 'C')
+        self.assertFalse(os.path.exists(segment))
+
+    def test_segment_replayed_by_another_worker_meanwhile_is_skipped(self):
+        segment = os.path.join(self.journal_dir, f'{JOURNAL_PREFIX}{os.getpid()}-1.segment')
+        with open(segment, 'w', encoding='utf-8') as journal:
+            journal.write(json.dumps(
+                [DEFAULT_DB_ALIAS, self.result.pk, self.question.pk, 'C', '2030-01-01T00:00:00+00:00']
+            ) + '\n')
+
+        def replayed_elsewhere_too(entries):
+            os.remove(segment)
+            return write_answers(entries)
+
+        with mock.patch('apps.exam_results.autosave.write_answers', side_effect=replayed_elsewhere_too):
+            self.buffer.start()
+        self.assertEqual(Answer.objects.get(result=self.result, question=self.question).response, 'C')
+
+    def test_grading_includes_answers_buffered_by_other_workers(self):
+        other_worker = AnswerBuffer(self.journal_dir, flush_interval=3600, fsync=False)
+        # A live worker that has not flushed yet
+        other_worker.started, other_worker.token = True, '1-other'
+        other_worker.add(self.result.pk, {self.question.pk: 'B'}, DEFAULT_DB_ALIAS)
+        Result.objects.filter(pk=self.result.pk).update(status='completed')
+        state_key = RESULT_STATE_KEY.format(using=DEFAULT_DB_ALIAS, result_id=self.result.pk)
+        cache.set(state_key, {'status': 'completed'})
+
+        with mock.patch('apps.exam_results.grading.answer_buffer', self.buffer):
+            grade_exam(self.result.exam)
+
+        self.result.refresh_from_db()
+        self.assertEqual((self.result.marks_obtained, self.result.status), (1, 'evaluated'))
+        self.assertIsNone(cache.get(state_key))
+        # The other worker still owns its journal
+        self.assertTrue(os.path.exists(other_worker.journal_path))
+
+
+class GradingEngineTests(TestCase):
+    def setUp(self):
+        self.center = make_center()
+        self.setter = make_user('setter', self.center)
+        self.capital = make_question(self.center, self.setter, marks=2)
+        self.planet = make_question(
+            self.center, self.setter, question_text='Largest planet?', option_a='Mars', option_b='Venus',
+            option_c='Jupiter', option_d='', correct_answer='C', marks=3,
+        )
+        self.sun = make_question(
+            self.center, self.setter, question_type='true_false', question_text='The sun is a star?',
+            option_a='True', option_b='False', option_c='', option_d='', correct_answer='True',
+        )
+        self.questions = [self.capital, self.planet, self.sun]
+
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir, ignore_errors=True)
+        buffer = AnswerBuffer(journal_dir, flush_interval=3600, fsync=False)
+        patcher = mock.patch('apps.exam_results.grading.answer_buffer', buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sit(self, exam, army_no, **responses):
+        result = make_result(make_candidate(self.center, army_no), exam)
+        for question, response in zip(self.questions, (responses.get(name) for name in ('capital', 'planet', 'sun'))):
+            if response is not None:
+                Answer.objects.create(result=result, question=question, response=response)
+        return result
+
+    def scores(self, *results):
+        return [
+            (result.marks_obtained, str(result.percentage), result.status)
+            for result in Result.objects.filter(pk__in=[result.pk for result in results]).order_by('pk')
+        ]
+
+    def test_marks_weighted_aliases_and_unanswered(self):
+        exam = make_exam(self.center, self.setter, questions=self.questions, total_marks=6)
+        results = [
+            # Letters in any case, option text and true/false aliases all count
+            self.sit(exam, 'JC00001', capital='b', planet='Jupiter', sun='yes'),
+            self.sit(exam, 'JC00002', capital='B', planet='A', sun='F'),
+            self.sit(exam, 'JC00003'),
+            self.sit(exam, 'JC00004', capital=' delhi ', sun='T'),
+            self.sit(exam, 'JC00005', capital='B', planet='', sun='no'),
+        ]
+        summary = grade_exam(exam)
+        self.assertEqual(
+            (summary['graded'], summary['evaluated'], summary['max_marks'], summary['average_marks']), (5, 5, 6, 2.6)
+        )
+        self.assertEqual(self.scores(*results), [
+            (6, '100.00', 'evaluated'),
+            (2, '33.33', 'evaluated'),
+            (0, '0.00', 'evaluated'),
+            (3, '50.00', 'evaluated'),
+            (2, '33.33', 'evaluated'),
+        ])
+
+    def test_one_update_per_distinct_score(self):
+        exam = make_exam(self.center, self.setter, questions=self.questions, total_marks=6)
+        for number in range(6):
+            self.sit(exam, f'JC{number:05d}', capital='B' if number % 2 else 'A', sun='True' if number % 3 else '')
+        with CaptureQueriesContext(connection) as queries:
+            grade_exam(exam)
+        updates = [query['sql'] for query in queries if query['sql'].startswith(f'UPDATE "{Result._meta.db_table}"')]
+        # Scores 0, 1, 2 and 3 out of six candidates
+        self.assertEqual(len(updates), 4)
+
+    def test_subjective_questions_leave_results_for_manual_evaluation(self):
+        essay = make_question(self.center, self.setter, question_type='essay', correct_answer='', marks=4)
+        exam = make_exam(self.center, self.setter, questions=[*self.questions, essay], total_marks=10)
+        result = self.sit(exam, 'JC00001', capital='B', planet='C', sun='True')
+        self.assertEqual(grade_exam(exam)['evaluated'], 0)
+        self.assertEqual(self.scores(result), [(6, '60.00', 'completed')])
+
+    def test_shuffled_letters_are_mapped_back_to_the_key(self):
+        exam = make_exam(self.center, self.setter, questions=self.questions, total_marks=6, shuffle_options=True)
+        key = AnswerKey(exam)
+        present = [[bool(text) for text in options] for options in key.options[:2]]
+
+        def shown(result, column, slot):
+            """Letter under which ``result``'s copy shows option ``slot``."""
+            orders = option_orders(exam.pk, [result.candidate_id], key.question_ids[:2], present)[0]
+            return OPTION_LETTERS[orders[column].tolist().index(slot)]
+
+        right = self.sit(exam, 'JC00001')
+        Answer.objects.create(result=right, question=self.capital, response=shown(right, 0, 1))
+        Answer.objects.create(result=right, question=self.planet, response=shown(right, 1, 2))
+        Answer.objects.create(result=right, question=self.sun, response='true')
+        # A copy that does not show the right capital under the key's letter
+        wrong = next(
+            result for result in (self.sit(exam, f'JC{number:05d}') for number in range(2, 50))
+            if shown(result, 0, 1) != 'B'
+        )
+        Answer.objects.create(result=wrong, question=self.capital, response='B')
+        # Beyond the three options the question has
+        Answer.objects.create(result=wrong, question=self.planet, response='D')
+
+        grade_exam(exam)
+        self.assertEqual(self.scores(right, wrong), [(6, '100.00', 'evaluated'), (0, '0.00', 'evaluated')])
+
+
+class ItemAnalysisTests(TestCase):
+    # Rows are candidates, columns questions: 1 right (B), 0 wrong (A), None omitted
+    CORRECT = [
+        [1, 1, 1, 1],
+        [1, 1, 1, 0],
+        [1, 1, 0, 0],
+        [1, 0, 0, 0],
+        [None, 0, 0, 1],
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.center = make_center()
+        self.setter = make_user('setter', self.center)
+        self.questions = [
+            make_question(self.center, self.setter, question_text=f'Question {number}?') for number in range(4)
+        ]
+        self.exam = make_exam(self.center, self.setter, questions=self.questions)
+
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir, ignore_errors=True)
+        buffer = AnswerBuffer(journal_dir, flush_interval=3600, fsync=False)
+        patcher = mock.patch('apps.exam_results.analysis.answer_buffer', buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def response_matrix(self, key):
+        letters = {1: 'B', 0: 'A'}
+        return np.array([
+            [UNANSWERED if cell is None else key.encode(column, letters[cell]) for column, cell in enumerate(row)]
+            for row in self.CORRECT
+        ], dtype=np.int32)
+
+    def test_statistics_match_hand_computed_values(self):
+        key = AnswerKey(self.exam)
+        exam_statistics, items = analyse_responses(key, self.response_matrix(key))
+
+        # Scores 4, 3, 2, 1, 1: mean 2.2, variance 1.36
+        self.assertEqual((exam_statistics['mean_score'], exam_statistics['score_sd']), (2.2, 1.17))
+        # 4/3 * (1 - (.16 + .24 + .24 + .24) / 1.36)
+        self.assertEqual(exam_statistics['kr20'], 0.4706)
+        self.assertEqual([item['p_value'] for item in items], [0.8, 0.6, 0.4, 0.4])
+        # Top 27% is the first candidate, bottom 27% the first of the two scoring 1
+        self.assertEqual([item['discrimination'] for item in items], [0.0, 1.0, 1.0, 1.0])
+        # Correlation with the rest score, e.g. question 1: .4 / sqrt(.8 * 5.2)
+        self.assertEqual(items[0]['point_biserial'], 0.1961)
+        self.assertEqual(items[3]['point_biserial'], -0.21)
+        self.assertEqual([item['omitted'] for item in items], [1, 0, 0, 0])
+        # A is question 2's only wrong answer, so it mirrors the key's correlation
+        self.assertEqual(items[1]['point_biserial'], 0.6124)
+        self.assertEqual(
+            items[1]['options']['A'], {'count': 2, 'proportion': 0.4, 'point_biserial': -0.6124, 'correct': False}
+        )
+        self.assertTrue(items[1]['options']['B']['correct'])
+
+    def sit_exam(self, rows):
+        for number, row in enumerate(rows):
+            result = make_result(make_candidate(self.center, f'JC{number:05d}'), self.exam)
+            for question, cell in zip(self.questions, row):
+                if cell is not None:
+                    Answer.objects.create(result=result, question=question, response='B' if cell else 'A')
+
+    def difficulties(self):
+        questions = Question.objects.filter(pk__in=[question.pk for question in self.questions]).order_by('pk')
+        return [question.difficulty for question in questions]
+
+    def test_recalibration_waits_for_enough_candidates(self):
+        self.sit_exam(self.CORRECT)
+        self.assertEqual(recalibrate_difficulty(self.exam, min_candidates=6), {})
+        self.assertEqual(self.difficulties(), ['medium'] * 4)
+
+        dry_run = recalibrate_difficulty(self.exam, min_candidates=5, commit=False)
+        self.assertEqual(dry_run, {self.questions[0].pk: ('medium', 'easy')})
+        self.assertEqual(self.difficulties(), ['medium'] * 4)
 
-# Create your tests here.
+        self.assertEqual(recalibrate_difficulty(self.exam, min_candidates=5), dry_run)
+        self.assertEqual(self.difficulties(), ['easy', 'medium', 'medium', 'medium'])
@@ -9,6 +9,10 @@ urlpatterns = [
     path('<int:pk>/', views.ResultDetailView.as_view(), name='result-detail'),
     path('<int:pk>/update/', views.ResultUpdateView.as_view(), name='result-update'),
     path('<int:pk>/delete/', views.ResultDeleteView.as_view(), name='result-delete'),
+    path('<int:pk>/answers/', views.AnswerAutosaveView.as_view(), name='answer-autosave'),
     path('export/', views.ResultExportView.as_view(), name='result-export'),
     path('reports/', views.ResultReportView.as_view(), name='result-reports'),
+    path('grade/<int:exam_id>/', views.ExamGradeView.as_view(), name='exam-grade'),
+    path('analysis/<int:exam_id>/', views.ItemAnalysisView.as_view(), name='item-analysis'),
+    path('analysis/<int:exam_id>/recalibrate/', views.DifficultyRecalibrationView.as_view(), name='difficulty-recalibrate'),
 ]
@@ -1,31 +1,42 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from django.db.models import Count, F, Q, Sum
 from django.shortcuts import get_object_or_404
+from utils.queries import RelatedQuerysetMixin
+from utils.sharding import CenterShardMixin, fan_out, request_alias
+from utils.writes import SerializedWriteMixin
+from apps.authentication.permissions import IsEvaluatorOrAdmin
+from apps.exams.models import Exam
+from apps.exams.papers import get_paper
 from .models import Result
-from .serializers import ResultSerializer
+from .serializers import ResultSerializer, AnswerAutosaveSerializer, DifficultyRecalibrationSerializer
+from .grading import grade_exam
+from .analysis import item_analysis, recalibrate_difficulty
+from .autosave import answer_buffer, get_result_state, start_attempt
 
-class ResultListView(generics.ListCreateAPIView):
+class ResultListView(CenterShardMixin, RelatedQuerysetMixin, SerializedWriteMixin, generics.ListCreateAPIView):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
     permission_classes = [IsAuthenticated]
 
-class ResultCreateView(generics.CreateAPIView):
+class ResultCreateView(SerializedWriteMixin, generics.CreateAPIView):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
     permission_classes = [IsAuthenticated]
 
-class ResultDetailView(generics.RetrieveAPIView):
+class ResultDetailView(CenterShardMixin, RelatedQuerysetMixin, generics.RetrieveAPIView):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
     permission_classes = [IsAuthenticated]
 
-class ResultUpdateView(generics.UpdateAPIView):
+class ResultUpdateView(CenterShardMixin, SerializedWriteMixin, generics.UpdateAPIView):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
     permission_classes = [IsAuthenticated]
 
-class ResultDeleteView(generics.DestroyAPIView):
+class ResultDeleteView(CenterShardMixin, SerializedWriteMixin, generics.DestroyAPIView):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
     permission_classes = [IsAuthenticated]
@@ -45,5 +56,118 @@ class ResultReportView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
-        # TODO: Implement report functionality
-        return Response({"message": "Report functionality coming soon"}, status=status.HTTP_200_OK)
+        """Per-exam result summary across every center shard."""
+        def summarise(alias):
+            return list(
+                Result.objects.using(alias)
+                .values('center_id', 'center__name', 'exam_id', 'exam__title')
+                .annotate(
+                    results=Count('id'),
+                    graded=Count('percentage'),
+                    percentage_total=Sum('percentage'),
+                    passed=Count('id', filter=Q(percentage__gte=F('exam__passing_score'))),
+                )
+                .order_by()
+            )
+
+        rows = {}
+        for shard_rows in fan_out(summarise).values():
+            for row in shard_rows:
+                key = (row['center_id'], row['exam_id'])
+                if key not in rows:
+                    rows[key] = row
+                    continue
+                for field in ('results', 'graded', 'percentage_total', 'passed'):
+                    rows[key][field] = (rows[key][field] or 0) + (row[field] or 0)
+
+        report = []
+        for row in sorted(rows.values(), key=lambda row: (row['center__name'], row['exam__title'])):
+            total = row.pop('percentage_total')
+            row['average_percentage'] = round(float(total) / row['graded'], 2) if row['graded'] else None
+            report.append(row)
+        return Response({"count": len(report), "results": report}, status=status.HTTP_200_OK)
+
+
+class ExamGradeView(APIView):
+    """Auto-grade every submitted result of an exam in one pass."""
+    permission_classes = [IsEvaluatorOrAdmin]
+    
+    def post(self, request, exam_id, *args, **kwargs):
+        exam = get_object_or_404(Exam.objects.using(request_alias(request)), pk=exam_id)
+        summary = grade_exam(exam)
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class ItemAnalysisView(APIView):
+    """
+    Item statistics of an exam's objective questions.
+    
+    p-value, point-biserial and upper/lower discrimination per question,
+    option counts for distractor analysis, and KR-20 for the exam, computed
+    from completed and evaluated results.
+    """
+    permission_classes = [IsEvaluatorOrAdmin]
+    
+    def get(self, request, exam_id, *args, **kwargs):
+        exam = get_object_or_404(Exam.objects.using(request_alias(request)), pk=exam_id)
+        return Response(item_analysis(exam), status=status.HTTP_200_OK)
+
+
+class DifficultyRecalibrationView(APIView):
+    """Replace the difficulty of an exam's objective questions with the one their p-values show."""
+    permission_classes = [IsEvaluatorOrAdmin]
+    
+    def post(self, request, exam_id, *args, **kwargs):
+        exam = get_object_or_404(Exam.objects.using(request_alias(request)), pk=exam_id)
+        serializer = DifficultyRecalibrationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        options = serializer.validated_data
+        
+        changes = recalibrate_difficulty(exam, options.get('min_candidates'), commit=not options['dry_run'])
+        return Response({
+            'exam': exam.pk,
+            'changed': len(changes),
+            'changes': [
+                {'question': question_id, 'from': old, 'to': new}
+                for question_id, (old, new) in sorted(changes.items())
+            ],
+            'saved': not options['dry_run'],
+        }, status=status.HTTP_200_OK)
+
+
+class AnswerAutosaveView(APIView):
+    """
+    Autosave answers for an exam attempt.
+    
+    Answers are journalled and buffered in memory; they reach the database
+    in coalesced batches, so the request is acknowledged without a write.
+    Only the account linked to the attempt's candidate (``User.army_no``)
+    and administrators can save answers.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, pk, *args, **kwargs):
+        serializer = AnswerAutosaveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        using = request_alias(request)
+        state = get_result_state(pk, using)
+        if state is None:
+            return Response({"detail": "Result not found"}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        if user.user_type != 'admin' and (not user.army_no or user.army_no != state['army_no']):
+            return Response({"detail": "This attempt belongs to another candidate"}, status=status.HTTP_403_FORBIDDEN)
+        state = start_attempt(pk, using, state)
+        if state['status'] != 'in_progress':
+            return Response({"detail": "This attempt is no longer accepting answers"}, status=status.HTTP_409_CONFLICT)
+        
+        answers = {item['question']: item['response'] for item in serializer.validated_data['answers']}
+        unknown = set(answers) - get_paper(state['exam_id'], using).question_ids
+        if unknown:
+            return Response(
+                {"detail": f"Questions not on this exam paper: {sorted(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        saved_at = answer_buffer.add(pk, answers, using)
+        return Response({"saved": len(answers), "saved_at": saved_at}, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,223 @@
+"""
+Constraint-based question paper generation.
+
+A paper setter describes a paper as a blueprint: sections such as "40 easy
+multiple choice questions", an optional total of marks, and how many of the
+center's most recent exams the paper must not repeat questions from. The
+eligible part of the center's bank is loaded as ``(id, difficulty, type,
+marks)`` into parallel NumPy arrays, so a bank of 100k+ questions costs one
+narrow query and a few vectorised masks.
+
+Each section is filled by random sampling, scarcest section first so that
+overlapping sections do not starve one another. If the sampled marks miss
+the requested total, single swaps between a section's chosen and unused
+questions are applied, each one taking the total strictly closer to the
+target, until it is met or no swap helps.
+"""
+import numpy as np
+from django.db import transaction
+
+from apps.questions.models import Question
+from .models import Exam, ExamQuestion
+from .papers import invalidate_paper
+
+
+DIFFICULTIES = [value for value, _ in Question.DIFFICULTY_LEVELS]
+QUESTION_TYPES = [value for value, _ in Question.QUESTION_TYPES]
+
+# Statuses whose paper may still be replaced
+EDITABLE_STATUSES = ('draft', 'scheduled')
+
+
+class PaperGenerationError(Exception):
+    """The blueprint cannot be satisfied by the question bank."""
+
+
+class QuestionPool:
+    """Eligible questions of a bank as parallel NumPy arrays."""
+
+    def __init__(self, ids, difficulties, question_types, marks):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.difficulties = np.asarray(difficulties, dtype=np.int8)
+        self.question_types = np.asarray(question_types, dtype=np.int8)
+        self.marks = np.asarray(marks, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, center_id, exclude_exam_ids=(), using=None, sections=()):
+        """
+        Load ``center_id``'s bank minus questions of ``exclude_exam_ids``.
+
+        Filters shared by every section are applied in SQL, so a paper of
+        multiple choice questions never reads the rest of the bank.
+        """
+        queryset = Question.objects.db_manager(using).filter(center_id=center_id)
+        for key in ('difficulty', 'question_type', 'marks'):
+            values = {section.get(key) for section in sections}
+            if values and None not in values:
+                queryset = queryset.filter(**{f'{key}__in': values})
+        if exclude_exam_ids:
+            used = ExamQuestion.objects.db_manager(using).filter(exam_id__in=exclude_exam_ids)
+            queryset = queryset.exclude(id__in=used.values('question_id'))
+        difficulty_codes = {value: code for code, value in enumerate(DIFFICULTIES)}
+        type_codes = {value: code for code, value in enumerate(QUESTION_TYPES)}
+        rows = queryset.order_by().values_list('id', 'difficulty', 'question_type', 'marks')
+        ids, difficulties, question_types, marks = [], [], [], []
+        for question_id, difficulty, question_type, mark in rows.iterator(chunk_size=20000):
+            ids.append(question_id)
+            difficulties.append(difficulty_codes.get(difficulty, -1))
+            question_types.append(type_codes.get(question_type, -1))
+            marks.append(mark)
+        return cls(ids, difficulties, question_types, marks)
+
+    def matching(self, difficulty=None, question_type=None, marks=None):
+        """Indexes of the questions matching a section's filters."""
+        mask = np.ones(len(self), dtype=bool)
+        if difficulty:
+            mask &= self.difficulties == DIFFICULTIES.index(difficulty)
+        if question_type:
+            mask &= self.question_types == QUESTION_TYPES.index(question_type)
+        if marks:
+            mask &= self.marks == marks
+        return np.flatnonzero(mask)
+
+
+def recent_exam_ids(exam, count):
+    """The ``count`` exams of ``exam``'s center held most recently before it."""
+    if not count:
+        return []
+    return list(
+        Exam.objects.using(exam._state.db).filter(center_id=exam.center_id, start_date__lte=exam.start_date)
+        .exclude(pk=exam.pk)
+        .order_by('-start_date', '-id')
+        .values_list('id', flat=True)[:count]
+    )
+
+
+def _describe(section):
+    return ' '.join(str(section[key]) for key in ('difficulty', 'question_type', 'marks') if section.get(key)) or 'any'
+
+
+def solve(pool, sections, total_marks=None, rng=None, max_swaps=10000):
+    """
+    Choose questions from ``pool`` for every section.
+
+    ``sections`` are dicts with ``count`` and optional ``difficulty``,
+    ``question_type`` and ``marks`` filters. Returns one array of pool
+    indexes per section. Raises ``PaperGenerationError`` when a section
+    cannot be filled or the total cannot be reached.
+    """
+    rng = rng or np.random.default_rng()
+    candidates = [
+        pool.matching(section.get('difficulty'), section.get('question_type'), section.get('marks'))
+        for section in sections
+    ]
+    used = np.zeros(len(pool), dtype=bool)
+    chosen = [None] * len(sections)
+
+    for index in sorted(range(len(sections)), key=lambda i: len(candidates[i]) - sections[i]['count']):
+        available = candidates[index][~used[candidates[index]]]
+        count = sections[index]['count']
+        if len(available) < count:
+            raise PaperGenerationError(
+                f"Only {len(available)} unused {_describe(sections[index])} questions for a section of {count}"
+            )
+        chosen[index] = rng.choice(available, size=count, replace=False)
+        used[chosen[index]] = True
+
+    if total_marks is None:
+        return chosen
+
+    # Per section: membership mask and how many unused questions carry each mark
+    members = []
+    unused_marks = []
+    width = int(pool.marks.max()) + 1 if len(pool) else 1
+    for index, candidate in enumerate(candidates):
+        member = np.zeros(len(pool), dtype=bool)
+        member[candidate] = True
+        members.append(member)
+        unused_marks.append(np.bincount(pool.marks[candidate[~used[candidate]]], minlength=width))
+
+    deficit = int(total_marks) - sum(int(pool.marks[picked].sum()) for picked in chosen)
+    for _ in range(max_swaps):
+        if deficit == 0:
+            return chosen
+        best = None
+        for index, picked in enumerate(chosen):
+            in_marks = np.flatnonzero(unused_marks[index])
+            if not len(picked) or not len(in_marks):
+                continue
+            out_marks = np.unique(pool.marks[picked])
+            # Change in the total for every (removed, added) marks pair
+            remaining = np.abs(deficit - (in_marks[np.newaxis, :] - out_marks[:, np.newaxis]))
+            row, column = np.unravel_index(np.argmin(remaining), remaining.shape)
+            if remaining[row, column] < abs(deficit) and (best is None or remaining[row, column] < best[0]):
+                best = (remaining[row, column], index, int(out_marks[row]), int(in_marks[column]))
+        if best is None:
+            break
+        _, index, out_mark, in_mark = best
+        position = rng.choice(np.flatnonzero(pool.marks[chosen[index]] == out_mark))
+        removed = chosen[index][position]
+        replacement = rng.choice(np.flatnonzero(members[index] & ~used & (pool.marks == in_mark)))
+        used[removed] = False
+        used[replacement] = True
+        chosen[index][position] = replacement
+        for member, counts in zip(members, unused_marks):
+            counts[out_mark] += member[removed]
+            counts[in_mark] -= member[replacement]
+        deficit -= in_mark - out_mark
+
+    if deficit:
+        raise PaperGenerationError(
+            f"No selection reaches {total_marks} marks; closest found is {int(total_marks) - deficit}"
+        )
+    return chosen
+
+
+def generate_paper(exam, sections, total_marks=None, exclude_recent=0, seed=None, commit=True):
+    """
+    Generate a paper for ``exam`` from its center's bank and store it.
+
+    Replaces the exam's current placements (in section order) and its
+    ``total_marks`` when ``commit`` is true. Returns a summary of the
+    selection.
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % (2 ** 32))
+    rng = np.random.default_rng(seed)
+
+    excluded = recent_exam_ids(exam, exclude_recent)
+    using = exam._state.db
+    pool = QuestionPool.load(exam.center_id, excluded, using, sections)
+    chosen = solve(pool, sections, total_marks, rng)
+
+    question_ids = np.concatenate([pool.ids[picked] for picked in chosen]).tolist() if chosen else []
+    paper_marks = sum(int(pool.marks[picked].sum()) for picked in chosen)
+    if commit:
+        with transaction.atomic(using=using):
+            ExamQuestion.objects.using(using).filter(exam=exam).delete()
+            ExamQuestion.objects.using(using).bulk_create([
+                ExamQuestion(exam=exam, question_id=question_id, order=order)
+                for order, question_id in enumerate(question_ids, start=1)
+            ])
+            if exam.total_marks != paper_marks:
+                exam.total_marks = paper_marks
+                exam.save(update_fields=['total_marks', 'updated_at'])
+            # Bulk writes send no signals
+            transaction.on_commit(lambda: invalidate_paper(exam.pk, using=using), using=using)
+
+    return {
+        'exam': exam.pk,
+        'seed': seed,
+        'pool_size': len(pool),
+        'excluded_exams': excluded,
+        'questions': question_ids,
+        'total_marks': paper_marks,
+        'sections': [
+            dict(section, selected=pool.ids[picked].tolist())
+            for section, picked in zip(sections, chosen)
+        ],
+        'saved': commit,
+    }
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams.models import Exam
+from apps.exams.packages import build_package
+
+
+class Command(BaseCommand):
+    help = "Build the offline package a center needs to run an exam"
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument('--output', help="Package path (default: exam-<id>.pkg.tar)")
+        parser.add_argument(
+            '--category', action='append', dest='categories',
+            help="Only include candidates of this exam category (repeatable)",
+        )
+        parser.add_argument(
+            '--skip-blobs',
+            help="File of SHA-256 hashes the center already holds (output of list_blobs); those photos are not shipped",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.select_related('center', 'created_by').get(pk=options['exam_id'])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam_id']} does not exist")
+
+        skip_blobs = set()
+        if options['skip_blobs']:
+            with open(options['skip_blobs']) as handle:
+                skip_blobs = {line.strip() for line in handle if line.strip()}
+
+        path = options['output'] or f"exam-{exam.pk}.pkg.tar"
+        manifest = build_package(exam, path, categories=options['categories'], skip_blobs=skip_blobs)
+        counts = manifest['counts']
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {path}: {counts['questions']} questions, {counts['candidates']} candidates, "
+            f"{counts['photos']} photos ({counts['blobs']} files shipped)"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams.packages import PackageError, import_package, verify_package
+
+
+class Command(BaseCommand):
+    help = "Verify an offline exam package and stage its exam on this center"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--workers', type=int, help="Parallel hash/extract workers (default: CPU count)")
+        parser.add_argument('--verify-only', action='store_true', help="Check the package without importing it")
+
+    def handle(self, *args, **options):
+        try:
+            if options['verify_only']:
+                manifest = verify_package(options['path'], options['workers'])
+                self.stdout.write(self.style.SUCCESS(f"{options['path']} is intact: {manifest['counts']}"))
+                return
+            summary = import_package(options['path'], options['workers'])
+        except PackageError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Staged {summary['questions']} questions ({summary['paper']} on the paper), "
+            f"{summary['candidates']} candidates and {summary['photos']} photos"
+        ))
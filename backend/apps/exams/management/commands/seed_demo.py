@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from apps.authentication.models import Center
@@ -5,6 +6,7 @@ from apps.exams.models import Exam
 from apps.questions.models import Question
 from django.utils import timezone
 from datetime import timedelta
+from utils.sharding import sharding_enabled
 
 
 class Command(BaseCommand):
@@ -13,6 +15,10 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         User = get_user_model()
 
+        if sharding_enabled():
+            # Shards must exist before users are replicated and exams routed to them
+            call_command('sync_shards', stdout=self.stdout, stderr=self.stderr)
+
         # Upsert canonical list of centers (avoid FK issues by not hard-deleting)
         centers_data = [
             {"code": "CTR001", "name": "Delhi Center", "state": "Delhi", "address": "HQ Complex", "city": "New Delhi"},
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+        ('exams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper', to='exams.exam')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='placements', to='questions.question')),
+            ],
+            options={
+                'verbose_name': 'Exam Question',
+                'verbose_name_plural': 'Exam Questions',
+                'ordering': ['exam', 'order'],
+                'unique_together': {('exam', 'question')},
+            },
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='questions',
+            field=models.ManyToManyField(blank=True, related_name='exams', through='exams.ExamQuestion', to='questions.question'),
+        ),
+    ]
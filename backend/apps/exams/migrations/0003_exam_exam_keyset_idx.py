@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_examquestion_exam_questions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['-start_date', '-id'], name='exam_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_exam_exam_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='shuffle_options',
+            field=models.BooleanField(default=False, help_text='Give each candidate their own option order'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='shuffle_questions',
+            field=models.BooleanField(default=False, help_text='Give each candidate their own question order'),
+        ),
+    ]
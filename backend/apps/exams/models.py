@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
 from apps.authentication.models import User, Center
+from apps.questions.models import Question
+from utils.sharding import CenterManager
 
 class Exam(models.Model):
     EXAM_TYPES = [
@@ -33,8 +35,13 @@ class Exam(models.Model):
     center = models.ForeignKey(Center, on_delete=models.CASCADE, related_name='exams')
     location = models.CharField(max_length=200, blank=True)
     
+    # Question paper
+    questions = models.ManyToManyField(Question, through='ExamQuestion', related_name='exams', blank=True)
+    
     # Configuration
     max_attempts = models.PositiveIntegerField(default=1)
+    shuffle_questions = models.BooleanField(default=False, help_text="Give each candidate their own question order")
+    shuffle_options = models.BooleanField(default=False, help_text="Give each candidate their own option order")
     passing_score = models.PositiveIntegerField(default=60)
     total_marks = models.PositiveIntegerField(default=100)
     
@@ -43,8 +50,13 @@ class Exam(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CenterManager()
+    
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['-start_date', '-id'], name='exam_keyset_idx'),
+        ]
         verbose_name = 'Exam'
         verbose_name_plural = 'Exams'
     
@@ -65,3 +77,21 @@ class Exam(models.Model):
     def is_completed(self):
         now = timezone.now()
         return now > self.end_date or self.status == 'completed'
+
+
+class ExamQuestion(models.Model):
+    """A question placed on an exam paper, in the order it is presented."""
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='paper')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='placements')
+    order = models.PositiveIntegerField(default=0)
+    
+    objects = CenterManager()
+    
+    class Meta:
+        ordering = ['exam', 'order']
+        unique_together = ['exam', 'question']
+        verbose_name = 'Exam Question'
+        verbose_name_plural = 'Exam Questions'
+    
+    def __str__(self):
+        return f"{self.exam.title} - Q{self.order}"
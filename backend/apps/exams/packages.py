@@ -0,0 +1,344 @@
+"""
+Offline exam packages.
+
+Before an exam day HQ builds one file holding everything a center needs to
+run the exam without a network: the exam and its paper, the questions, the
+eligible candidate roster and the candidates' photos. The package is an
+uncompressed tar so members can be read at their offsets in parallel;
+rows are stored as gzip-compressed JSON chunks in Django's serialisation
+format, and photos (already compressed) are stored once per distinct
+content under ``blobs/<sha256>``. ``manifest.json`` lists the SHA-256 and
+size of every member.
+
+The center verifies every member against the manifest before touching the
+database, then upserts the rows with ``bulk_create`` in the center's shard.
+Primary keys and timestamps are kept, so a later sync sees the staged rows as
+unchanged.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core import serializers
+from django.core.files.base import File
+from django.db import transaction
+from django.utils import timezone
+
+from apps.authentication.models import Center
+from apps.candidates.models import Candidate, CandidatePhoto
+from apps.candidates.storage import blob_hash, blob_name
+from apps.questions.models import Question
+from apps.sync.engine import (
+    BundleEncoder, ensure_users, natural_key_relations, referenced_users, resolve_natural_keys,
+)
+from utils.sharding import center_alias
+from .models import Exam, ExamQuestion
+from .papers import invalidate_paper
+
+
+PACKAGE_VERSION = 1
+
+MANIFEST = 'manifest.json'
+
+CHUNK_SIZE = 1000
+
+READ_SIZE = 1024 * 1024
+
+CENTER_FIELDS = ('name', 'address', 'city', 'state', 'contact_person', 'contact_email', 'contact_phone', 'capacity')
+
+
+class PackageError(Exception):
+    """A package that is unreadable, tampered with or does not fit this node."""
+
+
+def _sha256(fileobj, size=None):
+    digest = hashlib.sha256()
+    remaining = size
+    while remaining is None or remaining > 0:
+        chunk = fileobj.read(READ_SIZE if remaining is None else min(READ_SIZE, remaining))
+        if not chunk:
+            break
+        digest.update(chunk)
+        if remaining is not None:
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class PackageWriter:
+    """Append members to a package tar while recording their hashes."""
+
+    def __init__(self, tar):
+        self.tar = tar
+        self.files = {}
+
+    def add_bytes(self, name, data, sha256=None):
+        self.add_file(name, io.BytesIO(data), len(data), sha256 or hashlib.sha256(data).hexdigest())
+
+    def add_file(self, name, fileobj, size, sha256):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        self.tar.addfile(info, fileobj)
+        self.files[name] = {'sha256': sha256, 'size': size}
+
+    def add_rows(self, name, objects):
+        rows = serializers.serialize('python', objects, use_natural_foreign_keys=True)
+        self.add_bytes(name, gzip.compress(json.dumps(rows, cls=BundleEncoder).encode('utf-8')))
+
+
+def build_package(exam, path, categories=None, skip_blobs=()):
+    """
+    Write the offline package for ``exam`` to ``path`` and return its manifest.
+
+    The roster is every eligible candidate of the exam's center, optionally
+    narrowed to ``categories`` (``Candidate.exam_category``). Rows are
+    streamed in chunks, so memory use does not grow with the roster. Photos
+    whose SHA-256 is in ``skip_blobs`` (see the ``list_blobs`` command) are
+    listed but not shipped, because the center already holds them.
+    """
+    alias = center_alias(exam.center_id)
+    paper = list(ExamQuestion.objects.using(alias).filter(exam=exam).order_by('order'))
+    questions = list(
+        Question.objects.using(alias)
+        .filter(pk__in=[placement.question_id for placement in paper])
+        .select_related(*natural_key_relations(Question))
+    )
+    roster = (
+        Candidate.objects.using(alias)
+        .filter(center_id=exam.center_id, is_eligible=True)
+        .select_related(*natural_key_relations(Candidate))
+        .order_by('pk')
+    )
+    if categories:
+        roster = roster.filter(exam_category__in=categories)
+
+    users = {user['username']: user for user in referenced_users([exam] + questions)}
+    counts = {'questions': len(questions), 'candidates': 0, 'photos': 0, 'blobs': 0}
+    photos, blobs = [], set()
+    partial = f'{path}.part'
+    with tarfile.open(partial, 'w', format=tarfile.PAX_FORMAT) as tar:
+        writer = PackageWriter(tar)
+        writer.add_rows('data/exam.json.gz', [exam] + paper)
+        writer.add_rows('data/questions.json.gz', questions)
+
+        for number, chunk in enumerate(_chunks(roster.iterator(chunk_size=CHUNK_SIZE), CHUNK_SIZE), 1):
+            writer.add_rows(f'data/candidates-{number:04d}.json.gz', chunk)
+            users.update((user['username'], user) for user in referenced_users(chunk))
+            counts['candidates'] += len(chunk)
+
+            for photo in CandidatePhoto.objects.using(alias).filter(candidate__in=[c.pk for c in chunk]):
+                if not photo.photo or not photo.photo.storage.exists(photo.photo.name):
+                    continue
+                sha256 = blob_hash(photo.photo.name)
+                if sha256 is None or (sha256 not in blobs and sha256 not in skip_blobs):
+                    with photo.photo.open('rb') as source:
+                        sha256 = sha256 or _sha256(source)
+                        if sha256 not in blobs and sha256 not in skip_blobs:
+                            source.seek(0)
+                            writer.add_file(f'blobs/{sha256}', source, photo.photo.size, sha256)
+                            blobs.add(sha256)
+                photos.append({
+                    'candidate': photo.candidate_id,
+                    'name': photo.photo.name,
+                    'sha256': sha256,
+                    'uploaded_at': photo.uploaded_at,
+                })
+
+        writer.add_bytes('data/photos.json.gz', gzip.compress(json.dumps(photos, cls=BundleEncoder).encode('utf-8')))
+        writer.add_bytes('data/users.json.gz', gzip.compress(json.dumps(list(users.values())).encode('utf-8')))
+        counts['photos'] = len(photos)
+        counts['blobs'] = len(blobs)
+
+        manifest = {
+            'version': PACKAGE_VERSION,
+            'created_at': timezone.now().isoformat(),
+            'exam': {'id': exam.pk, 'title': exam.title},
+            'center': dict({'code': exam.center.code}, **{field: getattr(exam.center, field) for field in CENTER_FIELDS}),
+            'counts': counts,
+            'files': writer.files,
+        }
+        data = json.dumps(manifest, indent=2, cls=BundleEncoder).encode('utf-8')
+        info = tarfile.TarInfo(MANIFEST)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+    os.replace(partial, path)
+    return manifest
+
+
+def read_manifest(tar):
+    try:
+        manifest = json.load(tar.extractfile(MANIFEST))
+    except (KeyError, ValueError) as exc:
+        raise PackageError(f"Missing or unreadable manifest: {exc}") from exc
+    if manifest.get('version') != PACKAGE_VERSION:
+        raise PackageError(f"Unsupported package version {manifest.get('version')!r}")
+    return manifest
+
+
+def verify_package(path, workers=None):
+    """
+    Check every member of the package against its manifest.
+
+    Members are hashed concurrently, each worker reading its own file handle
+    at the member's offset. Returns the manifest, or raises ``PackageError``
+    naming every missing, unexpected or corrupt member.
+    """
+    try:
+        tar = tarfile.open(path, 'r:')
+    except (OSError, tarfile.TarError) as exc:
+        raise PackageError(f"Cannot open package: {exc}") from exc
+    with tar:
+        manifest = read_manifest(tar)
+        members = {member.name: member for member in tar.getmembers() if member.isfile()}
+
+    expected = manifest['files']
+    problems = [f"missing {name}" for name in expected if name not in members]
+    problems += [f"unexpected {name}" for name in members if name not in expected and name != MANIFEST]
+
+    def check(name):
+        member = members[name]
+        if member.size != expected[name]['size']:
+            return f"{name} has {member.size} bytes, expected {expected[name]['size']}"
+        with open(path, 'rb') as handle:
+            handle.seek(member.offset_data)
+            if _sha256(handle, member.size) != expected[name]['sha256']:
+                return f"{name} does not match its hash"
+        return None
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        problems += [problem for problem in executor.map(check, [name for name in expected if name in members]) if problem]
+    if problems:
+        raise PackageError("Package failed verification: " + '; '.join(problems[:20]))
+    return manifest
+
+
+@contextmanager
+def _keep_timestamps(*models):
+    """Let ``bulk_create`` store the packaged ``created_at``/``updated_at``."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _load_rows(tar, name, alias):
+    rows = resolve_natural_keys(json.loads(gzip.decompress(tar.extractfile(name).read())), alias)
+    return [deserialized.object for deserialized in serializers.deserialize('python', rows, using=alias)]
+
+
+def _upsert(model, objects, alias, unique_fields=('id',), batch_size=CHUNK_SIZE):
+    if not objects:
+        return 0
+    update_fields = [field.name for field in model._meta.concrete_fields if not field.primary_key and field.name not in unique_fields]
+    model._base_manager.using(alias).bulk_create(
+        objects,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=list(unique_fields),
+        update_fields=update_fields,
+    )
+    return len(objects)
+
+
+def import_package(path, workers=None):
+    """
+    Verify the package at ``path`` and stage its exam on this node.
+
+    Safe to run again with the same or a newer package: rows are upserted by
+    primary key and the exam's paper is replaced. Returns per-model counts.
+    """
+    manifest = verify_package(path, workers)
+    center_data = dict(manifest['center'])
+    center, _ = Center.objects.update_or_create(code=center_data.pop('code'), defaults=center_data)
+    alias = center_alias(center.pk)
+
+    with tarfile.open(path, 'r:') as tar:
+        ensure_users(json.loads(gzip.decompress(tar.extractfile('data/users.json.gz').read())))
+        photos = json.loads(gzip.decompress(tar.extractfile('data/photos.json.gz').read()))
+        blobs = {member.name: member for member in tar.getmembers() if member.name.startswith('blobs/')}
+
+        storage = CandidatePhoto._meta.get_field('photo').storage
+        for photo in photos:
+            photo['local_name'] = blob_name(photo['sha256'], os.path.splitext(photo['name'])[1])
+        missing = [
+            photo['local_name'] for photo in photos
+            if f"blobs/{photo['sha256']}" not in blobs and not storage.exists(photo['local_name'])
+        ]
+        if missing:
+            raise PackageError(f"Package omits {len(missing)} photos this node does not hold, e.g. {missing[0]}")
+
+        current = dict(
+            CandidatePhoto.objects.using(alias)
+            .filter(candidate_id__in=[photo['candidate'] for photo in photos])
+            .values_list('candidate_id', 'photo')
+        )
+        changed = [photo for photo in photos if current.get(photo['candidate']) != photo['local_name']]
+
+        def extract(photo):
+            member = blobs.get(f"blobs/{photo['sha256']}")
+            if member is None:
+                # Held here already; restart its grace period until the row commits
+                os.utime(storage.path(photo['local_name']))
+                return
+            with open(path, 'rb') as handle:
+                handle.seek(member.offset_data)
+                storage.save(photo['local_name'], File(io.BytesIO(handle.read(member.size))))
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            list(executor.map(extract, changed))
+
+        summary = {}
+        with _keep_timestamps(Exam, Question, Candidate, CandidatePhoto), transaction.atomic(using=alias):
+            exam_rows = _load_rows(tar, 'data/exam.json.gz', alias)
+            exam = next(obj for obj in exam_rows if isinstance(obj, Exam))
+            if exam.center_id != center.pk:
+                raise PackageError(f"Exam {exam.pk} does not belong to center {center.code}")
+            summary['questions'] = _upsert(Question, _load_rows(tar, 'data/questions.json.gz', alias), alias)
+            _upsert(Exam, [exam], alias)
+
+            paper = [obj for obj in exam_rows if isinstance(obj, ExamQuestion)]
+            ExamQuestion.objects.using(alias).filter(exam_id=exam.pk).exclude(pk__in=[p.pk for p in paper]).delete()
+            summary['paper'] = _upsert(ExamQuestion, paper, alias)
+
+            summary['candidates'] = 0
+            for name in sorted(name for name in manifest['files'] if name.startswith('data/candidates-')):
+                summary['candidates'] += _upsert(Candidate, _load_rows(tar, name, alias), alias)
+
+            summary['photos'] = _upsert(CandidatePhoto, [
+                CandidatePhoto(candidate_id=photo['candidate'], photo=photo['local_name'], uploaded_at=photo['uploaded_at'])
+                for photo in photos
+            ], alias, unique_fields=('candidate',))
+
+    # Photo rows bulk-created above send no signals; each holds one reference
+    for photo in changed:
+        storage.retain(photo['local_name'])
+        if current.get(photo['candidate']):
+            storage.delete(current[photo['candidate']])
+
+    invalidate_paper(exam.pk, using=alias)
+    return summary
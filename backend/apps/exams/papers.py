@@ -0,0 +1,100 @@
+"""
+Compiled exam-paper snapshots.
+
+A paper is serialised once, without answers or explanations, rendered to
+JSON bytes and kept in the cache together with a strong ETag derived from its
+content. Every candidate starting the exam is then served from the cache
+until the exam or one of its questions changes, at which point the snapshot
+is dropped by the signal handlers in ``signals.py``. Snapshots are keyed by
+database alias as well, as exam ids repeat across center shards.
+
+Shuffled exams keep the serialised paper in the snapshot as well, so each
+candidate's copy is derived from it without touching the database (see
+``shuffling.py``).
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework.renderers import JSONRenderer
+
+from .models import Exam
+from .serializers import ExamPaperSerializer
+from .shuffling import shuffle_paper
+
+
+CACHE_KEY = 'exam-paper:{using}:{exam_id}'
+
+# Serialises concurrent builds of the same paper within a process
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+class PaperSnapshot:
+    """An immutable rendered exam paper."""
+
+    def __init__(self, exam_id, status, question_ids, content, etag, paper=None):
+        self.exam_id = exam_id
+        self.status = status
+        self.question_ids = frozenset(question_ids)
+        self.content = content
+        self.etag = etag
+        # Serialised paper, kept only when candidates get shuffled copies
+        self.paper = paper
+    
+    @property
+    def shuffled(self):
+        return self.paper is not None
+    
+    def for_candidate(self, candidate_id):
+        """Return ``(content, etag)`` of ``candidate_id``'s copy of the paper."""
+        if not self.shuffled:
+            return self.content, self.etag
+        content = JSONRenderer().render(shuffle_paper(self.paper, candidate_id))
+        return content, '"%s-%d"' % (self.etag.strip('"'), candidate_id)
+
+
+def _lock_for(key):
+    with _build_locks_guard:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def build_paper(exam_id, using=None):
+    """Load the exam and its questions and render the snapshot."""
+    exam = Exam.objects.db_manager(using).prefetch_related('paper__question').get(pk=exam_id)
+    data = ExamPaperSerializer(exam).data
+    content = JSONRenderer().render(data)
+    etag = '"%s"' % hashlib.sha256(content).hexdigest()
+    question_ids = [placement.question_id for placement in exam.paper.all()]
+    paper = data if exam.shuffle_questions or exam.shuffle_options else None
+    return PaperSnapshot(exam.pk, exam.status, question_ids, content, etag, paper)
+
+
+def get_paper(exam_id, using=None):
+    """
+    Return the cached snapshot for ``exam_id`` in ``using``, building it on a miss.
+
+    ``using`` defaults to the router's database for exams. Raises
+    ``Exam.DoesNotExist`` for unknown exams.
+    """
+    using = using or router.db_for_read(Exam)
+    key = CACHE_KEY.format(using=using, exam_id=exam_id)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    with _lock_for(key):
+        # Another request may have built the paper while we were waiting
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = build_paper(exam_id, using)
+            cache.set(key, snapshot, settings.EXAM_PAPER_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_paper(*exam_ids, using=None):
+    """Drop cached snapshots so the next request rebuilds them."""
+    using = using or router.db_for_write(Exam)
+    cache.delete_many([CACHE_KEY.format(using=using, exam_id=exam_id) for exam_id in exam_ids])
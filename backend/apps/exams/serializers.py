@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from utils.fieldsets import SparseFieldsetMixin
+from apps.questions.models import Question
 from .models import Exam
 from apps.authentication.serializers import CenterSerializer, UserSerializer
 
-class ExamSerializer(serializers.ModelSerializer):
+class ExamSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     center = CenterSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
     
@@ -21,3 +23,47 @@ class ExamSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Duration must be positive")
         
         return data
+
+
+class PaperQuestionSerializer(serializers.Serializer):
+    """Question as shown to a candidate: no answer, explanation or audit fields."""
+    id = serializers.IntegerField(source='question.id')
+    order = serializers.IntegerField()
+    question_text = serializers.CharField(source='question.question_text')
+    question_type = serializers.CharField(source='question.question_type')
+    marks = serializers.IntegerField(source='question.marks')
+    options = serializers.SerializerMethodField()
+    
+    def get_options(self, obj):
+        return [{'key': key, 'text': text} for key, text in obj.question.get_options()]
+
+
+class ExamPaperSerializer(serializers.ModelSerializer):
+    """Read-only exam paper handed out when a candidate starts the exam."""
+    questions = PaperQuestionSerializer(source='paper', many=True, read_only=True)
+    
+    class Meta:
+        model = Exam
+        fields = [
+            'id', 'title', 'description', 'exam_type', 'status', 'start_date',
+            'end_date', 'duration_minutes', 'total_marks', 'passing_score',
+            'shuffle_questions', 'shuffle_options', 'updated_at', 'questions'
+        ]
+        read_only_fields = fields
+
+
+class PaperSectionSerializer(serializers.Serializer):
+    """A block of a generated paper, e.g. 40 easy multiple choice questions."""
+    count = serializers.IntegerField(min_value=1, max_value=1000)
+    difficulty = serializers.ChoiceField(choices=Question.DIFFICULTY_LEVELS, required=False)
+    question_type = serializers.ChoiceField(choices=Question.QUESTION_TYPES, required=False)
+    marks = serializers.IntegerField(min_value=1, required=False)
+
+
+class PaperBlueprintSerializer(serializers.Serializer):
+    """What a generated paper must look like."""
+    sections = PaperSectionSerializer(many=True, allow_empty=False)
+    total_marks = serializers.IntegerField(min_value=1, required=False)
+    exclude_recent_exams = serializers.IntegerField(min_value=0, max_value=50, default=0)
+    seed = serializers.IntegerField(min_value=0, max_value=2 ** 32 - 1, required=False)
+    dry_run = serializers.BooleanField(default=False)
@@ -0,0 +1,95 @@
+"""
+Deterministic per-candidate shuffling of exam papers.
+
+Exams with ``shuffle_questions`` or ``shuffle_options`` show every candidate
+their own question order and multiple choice option order, so neighbours in
+an exam hall see different papers. Nothing is stored per candidate. Each
+question and each option slot gets a 64-bit key hashed from
+``(exam_id, candidate_id, question_id, slot)``, and sorting by key gives the
+order. The keys are plain integer arithmetic in NumPy, so they are identical
+on every node and NumPy version. One candidate's paper is shuffled at serve
+time, and grading recomputes the option orders of every candidate at once
+to map displayed letters back to the stored answer key.
+
+Center-scoped primary keys are kept by sync (see ``apps.sync.engine``), so
+HQ derives the same orders as the center that held the exam.
+"""
+import numpy as np
+
+from utils.hashing import GOLDEN, mix
+
+
+OPTION_LETTERS = ('A', 'B', 'C', 'D')
+OPTION_SLOTS = len(OPTION_LETTERS)
+
+_ABSENT = np.uint64(np.iinfo(np.uint64).max)
+
+
+def shuffle_keys(exam_id, candidate_ids, question_ids, slots=0):
+    """
+    Keys of shape ``(candidates, questions)``, or ``(..., slots)`` for options.
+
+    Arithmetic wraps modulo 2**64 by design.
+    """
+    with np.errstate(over='ignore'):
+        candidates = np.asarray(candidate_ids, dtype=np.uint64).reshape(-1, 1)
+        questions = np.asarray(question_ids, dtype=np.uint64).reshape(1, -1)
+        keys = mix(np.full(candidates.shape, exam_id, dtype=np.uint64) * GOLDEN + candidates)
+        keys = mix(keys ^ (questions * GOLDEN))
+        if slots:
+            keys = mix(keys[..., np.newaxis] + np.arange(1, slots + 1, dtype=np.uint64) * GOLDEN)
+    return keys
+
+
+def question_order(exam_id, candidate_id, question_ids):
+    """Positions of ``question_ids`` in the order ``candidate_id`` sees them."""
+    return np.argsort(shuffle_keys(exam_id, [candidate_id], question_ids)[0], kind='stable')
+
+
+def option_orders(exam_id, candidate_ids, question_ids, present):
+    """
+    Original option slot shown at each position, per candidate and question.
+
+    ``present`` is a ``(questions, OPTION_SLOTS)`` mask of the options a
+    question has. Returns ``(candidates, questions, OPTION_SLOTS)`` slots;
+    the first ``present.sum(axis=1)`` positions hold the present options and
+    absent ones sort last.
+    """
+    keys = shuffle_keys(exam_id, candidate_ids, question_ids, OPTION_SLOTS)
+    keys[:, ~np.asarray(present, dtype=bool)] = _ABSENT
+    return np.argsort(keys, axis=-1, kind='stable').astype(np.int8)
+
+
+def shuffle_paper(paper, candidate_id):
+    """
+    Return ``candidate_id``'s copy of a serialised exam paper.
+
+    Questions are reordered and renumbered when ``shuffle_questions`` is set.
+    Multiple choice options are reordered and relabelled A, B, ... when
+    ``shuffle_options`` is set; the candidate answers with the displayed
+    letter and grading maps it back.
+    """
+    exam_id = paper['id']
+    questions = list(paper['questions'])
+    if paper.get('shuffle_questions') and questions:
+        order = question_order(exam_id, candidate_id, [question['id'] for question in questions])
+        questions = [dict(questions[index], order=position) for position, index in enumerate(order, start=1)]
+
+    if paper.get('shuffle_options'):
+        columns = [
+            index for index, question in enumerate(questions)
+            if question['question_type'] == 'multiple_choice'
+        ]
+        if columns:
+            present = np.zeros((len(columns), OPTION_SLOTS), dtype=bool)
+            for row, index in enumerate(columns):
+                for option in questions[index]['options']:
+                    present[row, OPTION_LETTERS.index(option['key'])] = True
+            orders = option_orders(exam_id, [candidate_id], [questions[index]['id'] for index in columns], present)[0]
+            for row, index in enumerate(columns):
+                texts = {option['key']: option['text'] for option in questions[index]['options']}
+                originals = [OPTION_LETTERS[slot] for slot in orders[row][:len(texts)]]
+                questions[index] = dict(questions[index], options=[
+                    {'key': letter, 'text': texts[original]} for letter, original in zip(OPTION_LETTERS, originals)
+                ])
+    return dict(paper, questions=questions)
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.questions.models import Question
+from .models import Exam, ExamQuestion
+from .papers import invalidate_paper
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def exam_changed(sender, instance, using, **kwargs):
+    invalidate_paper(instance.pk, using=using)
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def exam_question_changed(sender, instance, using, **kwargs):
+    invalidate_paper(instance.exam_id, using=using)
+
+
+@receiver(m2m_changed, sender=Exam.questions.through)
+def exam_questions_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    # Clearing needs the pre-signal, while the placements still exist
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # ``instance`` is a Question; every exam it was placed on is affected
+        exam_ids = pk_set or ExamQuestion.objects.using(using).filter(question=instance).values_list('exam_id', flat=True)
+        invalidate_paper(*exam_ids, using=using)
+    else:
+        invalidate_paper(instance.pk, using=using)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, using, **kwargs):
+    exam_ids = list(ExamQuestion.objects.using(using).filter(question=instance).values_list('exam_id', flat=True))
+    if exam_ids:
+        invalidate_paper(*exam_ids, using=using)
@@ -1,3 +1,212 @@
+import json
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.exam_results.grading import grade_exam
+from apps.exam_results.models import Answer, Result
+from utils.testing import QueryCountTestMixin, make_candidate, make_center, make_exam, make_question, make_result, make_user
+from .generator import DIFFICULTIES, QUESTION_TYPES, PaperGenerationError, QuestionPool, generate_paper, solve
+from .models import ExamQuestion
+
+
+class ExamListQueryTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin', make_center()))
+        self.created = 0
+
+    def add_exams(self, count):
+        # Each exam has its own creator and center, so N+1 lookups would show
+        for _ in range(count):
+            self.created += 1
+            center = make_center(f'E{self.created:03d}')
+            make_exam(center, make_user(f'setter{self.created}', center), title=f'Exam {self.created}')
+
+    def test_list_query_count_is_constant(self):
+        self.assertConstantQueries('/api/exams/', self.add_exams)
+
+
+class ShuffledPaperTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        center = make_center()
+        setter = make_user('setter', center)
+        self.questions = [
+            make_question(
+                center, setter, question_text=f'Question {number}?', option_a=f'{number}-a', option_b=f'{number}-b',
+                option_c=f'{number}-c', option_d=f'{number}-d', correct_answer='ABCDAB'[number], marks=number + 1,
+            )
+            for number in range(6)
+        ]
+        self.exam = make_exam(
+            center, setter, questions=self.questions, total_marks=21, shuffle_questions=True, shuffle_options=True
+        )
+        self.candidate = make_candidate(center, 'JC00001')
+        self.other = make_candidate(center, 'JC00002')
+        self.result = make_result(self.candidate, self.exam, status='in_progress')
+        self.url = f'/api/exams/{self.exam.pk}/conduct/'
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('jc00001', user_type='candidate', army_no='JC00001'))
+
+    def fetch(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)
+
+    def test_shuffled_answers_are_graded_against_the_key(self):
+        paper = self.fetch()
+        shown = [question['id'] for question in paper['questions']]
+        self.assertCountEqual(shown, [question.pk for question in self.questions])
+        self.assertNotEqual(shown, [question.pk for question in self.questions])
+
+        by_id = {question.pk: question for question in self.questions}
+        relabelled = 0
+        for question in paper['questions']:
+            original = by_id[question['id']]
+            right = dict(original.get_options())[original.correct_answer]
+            letter = next(option['key'] for option in question['options'] if option['text'] == right)
+            relabelled += letter != original.correct_answer
+            # The last question shown is answered wrong
+            if question is paper['questions'][-1]:
+                letter = next(option['key'] for option in question['options'] if option['text'] != right)
+                missed = original.marks
+            Answer.objects.create(result=self.result, question=original, response=letter)
+        self.assertTrue(relabelled)
+
+        self.result.status = 'completed'
+        self.result.save()
+        summary = grade_exam(self.exam)
+        self.assertEqual(summary['graded'], 1)
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.marks_obtained, 21 - missed)
+        self.assertEqual(self.result.status, 'evaluated')
+
+    def test_candidate_cannot_choose_another_copy(self):
+        own = self.fetch()
+        self.assertEqual(self.fetch(f'{self.url}?candidate={self.other.pk}'), own)
+
+    def test_staff_can_preview_any_copy(self):
+        own = self.fetch()
+        self.client.force_authenticate(make_user('evaluator', user_type='evaluator'))
+        self.assertEqual(self.fetch(f'{self.url}?candidate={self.candidate.pk}'), own)
+        self.assertEqual([question['id'] for question in self.fetch()['questions']], [q.pk for q in self.questions])
+
+    def test_account_without_a_candidate_is_refused(self):
+        self.client.force_authenticate(make_user('visitor', user_type='candidate'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+def pool_of(*questions):
+    """A ``QuestionPool`` of ``(difficulty, question_type, marks)`` tuples, ids from 1."""
+    return QuestionPool(
+        range(1, len(questions) + 1),
+        [DIFFICULTIES.index(difficulty) for difficulty, _, _ in questions],
+        [QUESTION_TYPES.index(question_type) for _, question_type, _ in questions],
+        [marks for _, _, marks in questions],
+    )
+
+
+class PaperSolverTests(TestCase):
+    def test_sections_get_their_count_of_matching_questions(self):
+        pool = pool_of(
+            *[('easy', 'multiple_choice', 1)] * 5, *[('hard', 'multiple_choice', 3)] * 2,
+            *[('easy', 'true_false', 1)] * 3,
+        )
+        sections = [
+            {'count': 2, 'question_type': 'multiple_choice'},
+            {'count': 5, 'difficulty': 'easy', 'question_type': 'multiple_choice'},
+            {'count': 2, 'question_type': 'true_false', 'marks': 1},
+        ]
+        # The broad section only fits if the exhausted easy section is filled first
+        for seed in range(10):
+            chosen = solve(pool, sections, rng=np.random.default_rng(seed))
+            self.assertEqual([len(picked) for picked in chosen], [2, 5, 2])
+            self.assertEqual(len(np.unique(np.concatenate(chosen))), 9)
+            for section, picked in zip(sections, chosen):
+                self.assertCountEqual(
+                    np.intersect1d(picked, pool.matching(section.get('difficulty'), section['question_type'],
+                                                         section.get('marks'))), picked
+                )
+            self.assertTrue((pool.difficulties[chosen[0]] == DIFFICULTIES.index('hard')).all())
+
+    def test_total_marks_is_reached_through_swaps(self):
+        pool = pool_of(*[('easy', 'multiple_choice', 1)] * 4, *[('hard', 'multiple_choice', 3)] * 2)
+        sections = [{'count': 3}]
+        totals = set()
+        for seed in range(10):
+            first = solve(pool, sections, rng=np.random.default_rng(seed))
+            totals.add(int(pool.marks[first[0]].sum()))
+            chosen = solve(pool, sections, total_marks=7, rng=np.random.default_rng(seed))
+            self.assertEqual(len(chosen[0]), 3)
+            self.assertEqual(int(pool.marks[chosen[0]].sum()), 7)
+        # Sampling alone misses the total for some seeds
+        self.assertNotEqual(totals, {7})
+
+    def test_unreachable_total_is_reported(self):
+        pool = pool_of(*[('easy', 'multiple_choice', 1)] * 4, *[('hard', 'multiple_choice', 3)] * 2)
+        with self.assertRaisesMessage(PaperGenerationError, 'closest found is 7'):
+            solve(pool, [{'count': 3}], total_marks=10, rng=np.random.default_rng(0))
+
+    def test_section_larger_than_the_bank_is_reported(self):
+        pool = pool_of(*[('easy', 'multiple_choice', 1)] * 4, ('hard', 'multiple_choice', 3))
+        with self.assertRaisesMessage(PaperGenerationError, 'Only 1 unused hard questions for a section of 2'):
+            solve(pool, [{'count': 2, 'difficulty': 'hard'}])
+        with self.assertRaises(PaperGenerationError):
+            solve(pool, [{'count': 3}, {'count': 3}])
+
+
+class PaperGenerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.center = make_center()
+        setter = make_user('setter', self.center)
+        self.questions = [
+            make_question(self.center, setter, question_text=f'Question {number}?', marks=number % 2 + 1)
+            for number in range(4)
+        ]
+        make_question(self.center, setter, question_text='Hard one?', difficulty='hard')
+        make_question(make_center('CTR002'), setter, question_text='Elsewhere?')
+        now = timezone.now()
+        make_exam(self.center, setter, questions=self.questions[2:3], start_date=now - timedelta(days=30))
+        make_exam(self.center, setter, questions=self.questions[:2], start_date=now - timedelta(days=1))
+        self.exam = make_exam(
+            self.center, setter, questions=self.questions[3:], status='draft',
+            start_date=now + timedelta(days=1), end_date=now + timedelta(days=1, hours=1),
+        )
+
+    def paper(self):
+        return list(ExamQuestion.objects.filter(exam=self.exam).order_by('order').values_list('question_id', flat=True))
+
+    def test_paper_replaces_the_placements_and_total(self):
+        sections = [{'count': 3, 'difficulty': 'medium'}, {'count': 1, 'difficulty': 'hard'}]
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = generate_paper(self.exam, sections, total_marks=6, seed=1)
+        self.assertEqual(summary['pool_size'], 5)
+        self.assertEqual(summary['excluded_exams'], [])
+        self.assertEqual(self.paper(), summary['questions'])
+        # Only both 2-mark questions make up the total
+        self.assertLessEqual({self.questions[1].pk, self.questions[3].pk}, set(summary['sections'][0]['selected']))
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.total_marks, 6)
+
+    def test_recent_exams_are_not_repeated(self):
+        summary = generate_paper(self.exam, [{'count': 2}], exclude_recent=1, seed=1, commit=False)
+        self.assertEqual(len(summary['excluded_exams']), 1)
+        self.assertEqual(summary['pool_size'], 3)
+        self.assertNotIn(self.questions[0].pk, summary['questions'])
+        self.assertNotIn(self.questions[1].pk, summary['questions'])
+        # Not saved
+        self.assertEqual(self.paper(), [self.questions[3].pk])
+
+        summary = generate_paper(self.exam, [{'count': 1, 'difficulty': 'medium'}], exclude_recent=2, commit=False)
+        self.assertEqual((summary['pool_size'], summary['questions']), (1, [self.questions[3].pk]))
 
-# Create your tests here.
+    def test_infeasible_blueprint_leaves_the_paper_alone(self):
+        with self.assertRaises(PaperGenerationError):
+            generate_paper(self.exam, [{'count': 2, 'difficulty': 'medium'}], exclude_recent=2)
+        self.assertEqual(self.paper(), [self.questions[3].pk])
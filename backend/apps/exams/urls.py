@@ -10,5 +10,6 @@ urlpatterns = [
     path('<int:pk>/update/', views.ExamUpdateView.as_view(), name='exam-update'),
     path('<int:pk>/delete/', views.ExamDeleteView.as_view(), name='exam-delete'),
     path('<int:pk>/conduct/', views.ExamConductView.as_view(), name='exam-conduct'),
+    path('<int:pk>/generate-paper/', views.ExamPaperGenerateView.as_view(), name='exam-generate-paper'),
     path('export/', views.ExamExportView.as_view(), name='exam-export'),
 ]
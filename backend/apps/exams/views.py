@@ -1,11 +1,20 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
+from utils.queries import RelatedQuerysetMixin
+from utils.sharding import CenterShardMixin, request_alias
+from django.utils.cache import patch_cache_control
+from apps.authentication.permissions import IsEvaluatorOrAdmin
+from apps.candidates.models import Candidate
 from .models import Exam
-from .serializers import ExamSerializer
+from .serializers import ExamSerializer, PaperBlueprintSerializer
+from .papers import get_paper
+from .generator import EDITABLE_STATUSES, PaperGenerationError, generate_paper
 
-class ExamListView(generics.ListCreateAPIView):
+class ExamListView(CenterShardMixin, RelatedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Exam.objects.all()
     serializer_class = ExamSerializer
     permission_classes = [IsAuthenticated]
@@ -15,17 +24,17 @@ class ExamCreateView(generics.CreateAPIView):
     serializer_class = ExamSerializer
     permission_classes = [IsAuthenticated]
 
-class ExamDetailView(generics.RetrieveAPIView):
+class ExamDetailView(CenterShardMixin, RelatedQuerysetMixin, generics.RetrieveAPIView):
     queryset = Exam.objects.all()
     serializer_class = ExamSerializer
     permission_classes = [IsAuthenticated]
 
-class ExamUpdateView(generics.UpdateAPIView):
+class ExamUpdateView(CenterShardMixin, generics.UpdateAPIView):
     queryset = Exam.objects.all()
     serializer_class = ExamSerializer
     permission_classes = [IsAuthenticated]
 
-class ExamDeleteView(generics.DestroyAPIView):
+class ExamDeleteView(CenterShardMixin, generics.DestroyAPIView):
     queryset = Exam.objects.all()
     serializer_class = ExamSerializer
     permission_classes = [IsAuthenticated]
@@ -35,9 +44,83 @@ class ExamConductView(generics.RetrieveAPIView):
     serializer_class = ExamSerializer
     permission_classes = [IsAuthenticated]
     
+    # Papers that candidates may open; staff can preview any paper
+    OPEN_STATUSES = ('scheduled', 'ongoing')
+    
     def get(self, request, *args, **kwargs):
-        # TODO: Implement exam conduct functionality
-        return Response({"message": "Exam conduct functionality coming soon"}, status=status.HTTP_200_OK)
+        try:
+            paper = get_paper(kwargs['pk'], request_alias(request))
+        except Exam.DoesNotExist:
+            raise Http404
+        
+        if paper.status not in self.OPEN_STATUSES and request.user.user_type not in ('admin', 'evaluator'):
+            return Response({"detail": "This exam is not open"}, status=status.HTTP_403_FORBIDDEN)
+        
+        content, etag = paper.content, paper.etag
+        if paper.shuffled:
+            if request.user.user_type in ('admin', 'evaluator'):
+                # Staff preview the original paper, or any candidate's copy
+                candidate = request.query_params.get('candidate')
+                if candidate is not None and (not candidate.isdigit() or int(candidate) < 1):
+                    return Response({"detail": "Invalid candidate id"}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                # Candidates only ever get the copy of the candidate linked to their account
+                candidate = None
+                if request.user.army_no:
+                    candidate = (
+                        Candidate.objects.using(request_alias(request)).filter(army_no=request.user.army_no)
+                        .values_list('pk', flat=True).first()
+                    )
+                if candidate is None:
+                    return Response(
+                        {"detail": "No candidate is linked to this account"},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
+            if candidate is not None:
+                content, etag = paper.for_candidate(int(candidate))
+        
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+class ExamPaperGenerateView(APIView):
+    """
+    Generate an exam's paper from its center's question bank.
+    
+    The blueprint lists sections (count with optional difficulty, question
+    type and marks), an optional total of marks and how many recent exams
+    not to repeat questions from. ``dry_run`` returns the selection without
+    storing it.
+    """
+    permission_classes = [IsEvaluatorOrAdmin]
+    
+    def post(self, request, pk, *args, **kwargs):
+        exam = get_object_or_404(Exam.objects.using(request_alias(request)), pk=pk)
+        serializer = PaperBlueprintSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        blueprint = serializer.validated_data
+        
+        if not blueprint['dry_run'] and exam.status not in EDITABLE_STATUSES:
+            return Response(
+                {"detail": f"The paper of a {exam.status} exam cannot be replaced"},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            summary = generate_paper(
+                exam,
+                [dict(section) for section in blueprint['sections']],
+                total_marks=blueprint.get('total_marks'),
+                exclude_recent=blueprint['exclude_recent_exams'],
+                seed=blueprint.get('seed'),
+                commit=not blueprint['dry_run'],
+            )
+        except PaperGenerationError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_200_OK)
 
 class ExamExportView(generics.ListAPIView):
     queryset = Exam.objects.all()
@@ -0,0 +1,279 @@
+"""
+Near-duplicate detection for the question bank.
+
+Banks grow by several setters adding questions over the years, and the same
+question keeps coming back reworded or with its options reordered. Each
+question is reduced to a normalised string (case folded, punctuation
+dropped, options sorted) and then to a MinHash signature over its character
+5-grams: ``NUM_PERM`` minimums of independent hashes. Two signatures agree
+in a position with probability equal to the Jaccard similarity of the
+questions' 5-gram sets, so the share of equal positions estimates it.
+
+Comparing every pair of a 100k bank is out of the question, so signatures
+are split into ``BANDS`` bands of ``ROWS`` values (locality-sensitive
+hashing) and each band is hashed into a bucket. Only questions sharing a
+bucket in some band become candidate pairs, and only those are compared.
+With 16 bands of 4, pairs at 0.7 similarity share a bucket 99% of the time
+and pairs below 0.3 rarely do. Buckets are cheap to derive from the stored
+signatures, so a report sorts them in memory instead of storing 16 rows
+per question.
+
+Fingerprints are computed on save (see ``signals.py``) and by importers
+through ``index_questions``. Writes that send no signals, such as sync and
+exam packages, are caught up by ``refresh_index``, which re-indexes every
+question whose ``updated_at`` differs from its fingerprint's.
+"""
+import hashlib
+import re
+
+import numpy as np
+from django.db.models import F
+
+from utils.hashing import GOLDEN, MIX_1, mix
+from .models import Question, QuestionFingerprint
+
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+# Questions hashed per NumPy pass and written per database round trip
+INDEX_BATCH = 2000
+
+# Buckets larger than this only pair their members with the first one
+MAX_BUCKET_PAIRS = 64
+
+# Candidate pairs compared per NumPy pass
+COMPARE_BATCH = 200000
+
+FINGERPRINT_FIELDS = ('id', 'center_id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'updated_at')
+
+NON_WORD = re.compile(r'\W+', re.UNICODE)
+
+with np.errstate(over='ignore'):
+    # Multiply-shift hash family: odd multipliers and offsets per permutation
+    _PERM_A = mix(np.arange(1, NUM_PERM + 1, dtype=np.uint64) * GOLDEN) | np.uint64(1)
+    _PERM_B = mix(_PERM_A ^ GOLDEN)
+    _BAND_SEEDS = mix(np.arange(1, BANDS + 1, dtype=np.uint64) * MIX_1)
+
+
+def normalize_question(question_text, options=()):
+    """Case folded words of the question followed by its options, sorted."""
+    def words(text):
+        return ' '.join(NON_WORD.sub(' ', (text or '').casefold()).split())
+    parts = [words(question_text)] + sorted(filter(None, (words(option) for option in options)))
+    return ' '.join(part for part in parts if part)
+
+
+def question_content(question):
+    """Normalised content of a ``Question``."""
+    return normalize_question(
+        question.question_text, (question.option_a, question.option_b, question.option_c, question.option_d)
+    )
+
+
+def content_hash(normalized):
+    """SHA-256 of normalised content; equal for exact duplicates."""
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _signature_batch(texts):
+    encoded = [text.encode('utf-8').ljust(SHINGLE_SIZE) for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    counts = lengths - SHINGLE_SIZE + 1
+    segments = np.cumsum(counts) - counts
+    # Byte offset of every shingle: its document's start plus its index in it
+    positions = np.arange(counts.sum()) + np.repeat(np.cumsum(lengths) - lengths - segments, counts)
+    with np.errstate(over='ignore'):
+        shingles = np.zeros(len(positions), dtype=np.uint64)
+        for offset in range(SHINGLE_SIZE):
+            shingles |= data[positions + offset] << np.uint64(8 * offset)
+        shingles = mix(shingles)
+        signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+        for perm in range(NUM_PERM):
+            hashed = ((shingles * _PERM_A[perm] + _PERM_B[perm]) >> np.uint64(32)).astype(np.uint32)
+            signatures[:, perm] = np.minimum.reduceat(hashed, segments)
+    return signatures
+
+
+def minhash_signatures(texts):
+    """``(len(texts), NUM_PERM)`` uint32 MinHash signatures of normalised texts."""
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), INDEX_BATCH):
+        signatures[start:start + INDEX_BATCH] = _signature_batch(texts[start:start + INDEX_BATCH])
+    return signatures
+
+
+def band_buckets(signatures):
+    """``(len(signatures), BANDS)`` 64-bit bucket keys, one per band."""
+    rows = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        keys = np.broadcast_to(_BAND_SEEDS, (len(signatures), BANDS)).copy()
+        for row in range(ROWS):
+            keys = mix(keys ^ (rows[:, :, row] * GOLDEN))
+    return keys
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of matching rows of two signature arrays."""
+    return (np.asarray(first) == np.asarray(second)).mean(axis=-1)
+
+
+def index_questions(questions, using=None):
+    """
+    Compute and store the fingerprints of ``questions``.
+
+    Replaces whatever was stored for them. Returns how many were indexed.
+    """
+    questions = list(questions)
+    if not questions:
+        return 0
+    using = using or questions[0]._state.db
+    for start in range(0, len(questions), INDEX_BATCH):
+        batch = questions[start:start + INDEX_BATCH]
+        contents = [question_content(question) for question in batch]
+        signatures = minhash_signatures(contents)
+        QuestionFingerprint.objects.using(using).bulk_create(
+            [
+                QuestionFingerprint(
+                    question_id=question.pk,
+                    center_id=question.center_id,
+                    content_hash=content_hash(content),
+                    signature=signature.tobytes(),
+                    source_updated_at=question.updated_at,
+                )
+                for question, content, signature in zip(batch, contents, signatures)
+            ],
+            update_conflicts=True,
+            unique_fields=['question'],
+            update_fields=['center', 'content_hash', 'signature', 'source_updated_at'],
+        )
+    return len(questions)
+
+
+def refresh_index(center_id=None, using=None, rebuild=False):
+    """
+    Index questions whose fingerprint is missing or older than the question.
+
+    ``rebuild`` re-indexes every question. Returns how many were indexed.
+    """
+    queryset = Question.objects.db_manager(using).all()
+    if center_id is not None:
+        queryset = queryset.filter(center_id=center_id)
+    if not rebuild:
+        queryset = queryset.exclude(fingerprint__source_updated_at=F('updated_at'))
+    indexed = 0
+    batch = []
+    for question in queryset.order_by().only(*FINGERPRINT_FIELDS).iterator(chunk_size=INDEX_BATCH):
+        batch.append(question)
+        if len(batch) == INDEX_BATCH:
+            indexed += index_questions(batch, queryset.db)
+            batch = []
+    return indexed + index_questions(batch, queryset.db)
+
+
+def load_signatures(center_id, using=None):
+    """Stored signatures of ``center_id``'s questions as ``(ids, signatures)``."""
+    rows = (
+        QuestionFingerprint.objects.db_manager(using).filter(center_id=center_id)
+        .order_by('question_id').values_list('question_id', 'signature')
+    )
+    ids, blobs = [], []
+    for question_id, signature in rows.iterator(chunk_size=INDEX_BATCH * 5):
+        ids.append(question_id)
+        blobs.append(bytes(signature))
+    signatures = np.frombuffer(b''.join(blobs), dtype=np.uint32).reshape(len(ids), NUM_PERM)
+    return np.asarray(ids, dtype=np.int64), signatures
+
+
+def candidate_pairs(buckets):
+    """
+    Unique row pairs sharing a bucket in at least one band.
+
+    Returns an ``(n, 2)`` array of row indexes with ``first < second``.
+    """
+    count = len(buckets)
+    positions = np.arange(count)
+    found = []
+    for band in range(BANDS):
+        order = np.argsort(buckets[:, band], kind='stable')
+        keys = buckets[order, band]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sizes = np.diff(np.r_[starts, count])
+        if sizes.max() < 2:
+            continue
+        group_starts = np.repeat(starts, sizes)
+        group_ends = np.repeat(starts + sizes, sizes)
+        small = np.repeat(sizes <= MAX_BUCKET_PAIRS, sizes)
+        # Every member of a small bucket with each later member
+        for offset in range(1, min(int(sizes.max()), MAX_BUCKET_PAIRS)):
+            first = positions[small & (positions + offset < group_ends)]
+            found.append(np.stack([order[first], order[first + offset]], axis=1))
+        # Members of a large bucket with its first member only
+        member = positions[~small & (positions != group_starts)]
+        found.append(np.stack([order[group_starts[member]], order[member]], axis=1))
+    if not found:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(found), axis=1)
+    keys = np.unique(pairs[:, 0] * count + pairs[:, 1])
+    return np.stack([keys // count, keys % count], axis=1)
+
+
+def connected_components(count, pairs):
+    """Label every row with the lowest row it is linked to through ``pairs``."""
+    labels = np.arange(count)
+    while True:
+        previous = labels.copy()
+        lowest = np.minimum(labels[pairs[:, 0]], labels[pairs[:, 1]])
+        np.minimum.at(labels, pairs[:, 0], lowest)
+        np.minimum.at(labels, pairs[:, 1], lowest)
+        # Pointer jumping: follow labels to their own labels
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def duplicate_clusters(center_id, threshold=0.7, using=None, refresh=True):
+    """
+    Groups of ``center_id``'s questions that are near-duplicates of each other.
+
+    Candidate pairs sharing an LSH bucket are kept when their estimated
+    similarity reaches ``threshold`` and linked transitively. Each cluster
+    has its oldest question as ``representative`` and lists every member's
+    similarity to it, largest clusters first.
+    """
+    if refresh:
+        refresh_index(center_id, using)
+    ids, signatures = load_signatures(center_id, using)
+    pairs = candidate_pairs(band_buckets(signatures))
+    matched = [
+        chunk[similarity(signatures[chunk[:, 0]], signatures[chunk[:, 1]]) >= threshold]
+        for chunk in np.array_split(pairs, max(1, -(-len(pairs) // COMPARE_BATCH)))
+    ]
+    matched = np.concatenate(matched) if matched else pairs
+    if not len(matched):
+        return []
+
+    labels = connected_components(len(ids), matched)
+    rows = np.flatnonzero(labels != np.arange(len(ids)))
+    roots, sizes = np.unique(labels[rows], return_counts=True)
+    members = np.concatenate([roots, rows])
+    members = members[np.lexsort((members, labels[members]))]
+    scores = similarity(signatures[members], signatures[labels[members]])
+    bounds = np.searchsorted(labels[members], roots)
+
+    clusters = [
+        {
+            'representative': int(ids[root]),
+            'size': int(size) + 1,
+            'questions': [
+                {'id': int(ids[row]), 'similarity': round(float(score), 3)}
+                for row, score in zip(members[start:start + size + 1], scores[start:start + size + 1])
+            ],
+        }
+        for root, size, start in zip(roots, sizes, bounds)
+    ]
+    clusters.sort(key=lambda cluster: (-cluster['size'], cluster['representative']))
+    return clusters
@@ -0,0 +1,341 @@
+"""
+Streaming bulk importer for question banks.
+
+Question files are read row by row from CSV, XLSX or JSON (an array of
+objects or one object per line) and processed in chunks of
+``QUESTION_IMPORT_BATCH_SIZE``. Each chunk is validated column-wise with
+NumPy rather than one model instance at a time, exact duplicates are
+dropped by normalised content hash, and the remaining questions are written
+with one ``bulk_create`` and fingerprinted for near-duplicate reports.
+
+The content hashes of the center's bank are loaded once per import from
+``QuestionFingerprint`` (see ``duplicates.py``), so duplicate detection
+costs a set lookup per row instead of a query.
+
+Uploads through the API are queued on ``import_worker``, a background thread
+that runs imports one at a time, so the request returns as soon as the file
+is stored. ``import_questions --pending`` runs imports left pending by a
+process that stopped before reaching them.
+"""
+import io
+import json
+import logging
+import os
+import queue
+import threading
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, IntegrityError, transaction
+from django.utils import timezone
+
+from apps.candidates.importers import iter_csv_rows, iter_xlsx_rows, normalize_cell, normalize_header
+from apps.exam_results.grading import TRUE_FALSE_ALIASES
+from utils.sharding import center_alias
+from .duplicates import content_hash, index_questions, normalize_question, refresh_index
+from .models import Question, QuestionFingerprint, QuestionImport
+
+
+logger = logging.getLogger(__name__)
+
+OPTION_FIELDS = ('option_a', 'option_b', 'option_c', 'option_d')
+OPTION_LETTERS = np.array(['A', 'B', 'C', 'D'])
+QUESTION_TYPES = [value for value, _ in Question.QUESTION_TYPES]
+DIFFICULTIES = [value for value, _ in Question.DIFFICULTY_LEVELS]
+TEXT_FIELDS = ('question_text', 'question_type', 'difficulty', 'marks') + OPTION_FIELDS + ('correct_answer', 'explanation')
+
+# Cap the stored error log so a completely malformed file cannot bloat the row
+MAX_ERROR_LINES = 1000
+
+JSON_READ_SIZE = 1 << 16
+
+
+def iter_json_rows(fileobj):
+    """
+    Yield the objects of a JSON array, or of JSON Lines, without loading the file.
+
+    Objects are decoded one at a time from a sliding text buffer.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig')
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        # Skip array brackets, separators and whitespace between objects
+        while position < len(buffer) and buffer[position] in '[],\r\n\t ':
+            position += 1
+        try:
+            if position == len(buffer):
+                raise ValueError
+            value, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                if buffer[position:].strip():
+                    raise ValueError(f"Invalid JSON near: {buffer[position:position + 40]!r}")
+                return
+            chunk = text.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        position = end
+        if not isinstance(value, dict):
+            raise ValueError("Each question must be a JSON object")
+        yield {normalize_header(key): item for key, item in value.items()}
+
+
+def iter_rows(fileobj, filename):
+    """Pick a row reader based on the file extension."""
+    ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    readers = {'csv': iter_csv_rows, 'xlsx': iter_xlsx_rows, 'json': iter_json_rows}
+    if ext not in readers or ext not in settings.IMPORT_FORMATS:
+        raise ValueError(f"Unsupported file type '.{ext}'. Upload one of: {', '.join(settings.IMPORT_FORMATS)}.")
+    return readers[ext](fileobj)
+
+
+def parse_marks(value):
+    try:
+        marks = float(value)
+    except (TypeError, ValueError):
+        return -1
+    return int(marks) if marks.is_integer() else -1
+
+
+class QuestionColumns:
+    """A chunk of rows as NumPy string columns, with defaults applied."""
+
+    def __init__(self, rows):
+        values = {
+            field: [str(normalize_cell(row.get(field))) for row in rows]
+            for field in TEXT_FIELDS
+        }
+        self.question_text = np.array(values['question_text'], dtype=object)
+        # Accept choice labels too, e.g. 'True/False' or 'Multiple Choice'
+        question_type = np.char.lower(np.array(values['question_type'], dtype=str))
+        question_type = np.char.replace(np.char.replace(question_type, ' ', '_'), '/', '_')
+        self.question_type = np.where(question_type == '', 'multiple_choice', question_type)
+        difficulty = np.char.lower(np.array(values['difficulty'], dtype=str))
+        self.difficulty = np.where(difficulty == '', 'medium', difficulty)
+        self.marks = np.array([parse_marks(value) if value else 1 for value in values['marks']], dtype=np.int64)
+        self.options = np.array([values[field] for field in OPTION_FIELDS], dtype=str).T
+        self.correct_answer = np.char.strip(np.array(values['correct_answer'], dtype=str))
+        self.explanation = values['explanation']
+
+    def __len__(self):
+        return len(self.marks)
+
+
+def validate(columns):
+    """
+    Check a chunk column-wise and canonicalise its answers.
+
+    Multiple choice answers given as option text become the option letter
+    and true/false aliases become TRUE/FALSE, as grading expects. Returns
+    ``(valid, errors)``: a row mask and ``{row index: [messages]}``.
+    """
+    count = len(columns)
+    present = np.char.str_len(columns.options) > 0
+    multiple_choice = columns.question_type == 'multiple_choice'
+    true_false = columns.question_type == 'true_false'
+    answers = np.char.upper(columns.correct_answer)
+
+    # A multiple choice answer is a present option's letter or its text
+    letter_match = (answers[:, np.newaxis] == OPTION_LETTERS) & present
+    text_match = (np.char.upper(np.char.strip(columns.options)) == answers[:, np.newaxis]) & present
+    by_text = ~letter_match.any(axis=1) & text_match.any(axis=1)
+    answers = np.where(multiple_choice & by_text, OPTION_LETTERS[text_match.argmax(axis=1)], answers)
+    for alias, canonical in TRUE_FALSE_ALIASES.items():
+        answers = np.where(true_false & (answers == alias), canonical, answers)
+    # Other answers are model answers for evaluators and keep their case
+    columns.correct_answer = np.where(multiple_choice | true_false, answers, columns.correct_answer)
+
+    checks = [
+        (np.array([not text.strip() for text in columns.question_text], dtype=bool), "question_text is required"),
+        (~np.isin(columns.question_type, QUESTION_TYPES), f"question_type must be one of {', '.join(QUESTION_TYPES)}"),
+        (~np.isin(columns.difficulty, DIFFICULTIES), f"difficulty must be one of {', '.join(DIFFICULTIES)}"),
+        (columns.marks <= 0, "marks must be a positive whole number"),
+        ((np.char.str_len(columns.options) > 500).any(axis=1), "options are limited to 500 characters"),
+        (np.char.str_len(columns.correct_answer) > 500, "correct_answer is limited to 500 characters"),
+        (multiple_choice & (present.sum(axis=1) < 2), "multiple choice questions need at least 2 options"),
+        (multiple_choice & ~(letter_match | text_match).any(axis=1), "correct_answer must name one of the options"),
+        (true_false & ~np.isin(answers, ['TRUE', 'FALSE']), "correct_answer must be TRUE or FALSE"),
+    ]
+    valid = np.ones(count, dtype=bool)
+    errors = {}
+    for failed, message in checks:
+        valid &= ~failed
+        for index in np.flatnonzero(failed):
+            errors.setdefault(int(index), []).append(message)
+    return valid, errors
+
+
+class QuestionImporter:
+    """
+    Import questions from a ``QuestionImport`` file into its center's bank.
+
+    Each chunk is validated, deduplicated and inserted in its own short
+    transaction, and the counters on the import record are updated after
+    every chunk so clients can poll progress. ``progress``, if given, is
+    called with the importer after each chunk as well.
+    """
+
+    def __init__(self, question_import, batch_size=None, progress=None):
+        self.question_import = question_import
+        self.batch_size = batch_size or settings.QUESTION_IMPORT_BATCH_SIZE
+        self.progress = progress
+        self.using = center_alias(question_import.center_id)
+        self.total = 0
+        self.successful = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = []
+        self.hashes = None
+
+    def load_hashes(self):
+        """Content hashes of every question already in the center's bank."""
+        center_id = self.question_import.center_id
+        refresh_index(center_id, self.using)
+        return set(
+            QuestionFingerprint.objects.using(self.using).filter(center_id=center_id)
+            .values_list('content_hash', flat=True).iterator(chunk_size=20000)
+        )
+
+    def run(self):
+        """Process the whole file and return the updated import record."""
+        question_import = self.question_import
+        question_import.status = 'processing'
+        question_import.save(update_fields=['status'])
+
+        try:
+            self.hashes = self.load_hashes()
+            with question_import.file.open('rb') as fileobj:
+                rows = enumerate(iter_rows(fileobj, question_import.file.name), start=2)
+                while True:
+                    chunk = list(islice(rows, self.batch_size))
+                    if not chunk:
+                        break
+                    self.process_chunk(chunk)
+                    self.save_progress()
+        except Exception as exc:
+            self.log_error(f"Import aborted: {exc}")
+            question_import.status = 'failed'
+        else:
+            question_import.status = 'completed'
+
+        question_import.total_records = self.total
+        question_import.successful_records = self.successful
+        question_import.duplicate_records = self.duplicates
+        question_import.failed_records = self.failed
+        question_import.error_log = '\n'.join(self.errors)
+        question_import.completed_at = timezone.now()
+        question_import.save()
+        return question_import
+
+    def process_chunk(self, chunk):
+        """Validate a chunk of ``(row_number, row)`` pairs and insert the new questions."""
+        self.total += len(chunk)
+        row_numbers = [row_number for row_number, _ in chunk]
+        columns = QuestionColumns([row for _, row in chunk])
+        valid, errors = validate(columns)
+        for index, messages in errors.items():
+            self.log_error(f"Row {row_numbers[index]}: {'; '.join(messages)}")
+        self.failed += len(errors)
+
+        questions, digests = [], []
+        for index in np.flatnonzero(valid):
+            options = columns.options[index].tolist()
+            digest = content_hash(normalize_question(columns.question_text[index], options))
+            if digest in self.hashes:
+                self.duplicates += 1
+                continue
+            self.hashes.add(digest)
+            digests.append(digest)
+            questions.append(Question(
+                question_text=columns.question_text[index].strip(),
+                question_type=str(columns.question_type[index]),
+                difficulty=str(columns.difficulty[index]),
+                marks=int(columns.marks[index]),
+                option_a=options[0],
+                option_b=options[1],
+                option_c=options[2],
+                option_d=options[3],
+                correct_answer=str(columns.correct_answer[index]),
+                explanation=columns.explanation[index],
+                center_id=self.question_import.center_id,
+                created_by_id=self.question_import.uploaded_by_id,
+            ))
+
+        if not questions:
+            return
+        try:
+            with transaction.atomic(using=self.using):
+                created = Question.objects.using(self.using).bulk_create(questions, batch_size=self.batch_size)
+                # Bulk inserts send no signals; backends without RETURNING are
+                # caught up by the next refresh_index()
+                index_questions([question for question in created if question.pk], self.using)
+        except IntegrityError as exc:
+            self.log_error(f"Rows {row_numbers[0]}-{row_numbers[-1]}: batch rejected by the database ({exc})")
+            self.failed += len(questions)
+            self.hashes.difference_update(digests)
+        else:
+            self.successful += len(questions)
+
+    def save_progress(self):
+        """Publish running counters so clients can poll the import record."""
+        QuestionImport.objects.using(self.question_import._state.db).filter(pk=self.question_import.pk).update(
+            total_records=self.total,
+            successful_records=self.successful,
+            duplicate_records=self.duplicates,
+            failed_records=self.failed,
+        )
+        if self.progress:
+            self.progress(self)
+
+    def log_error(self, message):
+        if len(self.errors) < MAX_ERROR_LINES:
+            self.errors.append(message)
+        elif len(self.errors) == MAX_ERROR_LINES:
+            self.errors.append('Further errors omitted.')
+
+
+def run_pending_import(pk, using, **kwargs):
+    """
+    Run import ``pk`` if it is still pending; returns ``None`` otherwise.
+
+    The import is claimed with a conditional update first, so a queued
+    import and ``import_questions --pending`` never run the same file twice.
+    """
+    claimed = QuestionImport.objects.using(using).filter(pk=pk, status='pending').update(status='processing')
+    if not claimed:
+        return None
+    return QuestionImporter(QuestionImport.objects.using(using).get(pk=pk), **kwargs).run()
+
+
+class ImportWorker:
+    """Background thread running queued question imports in arrival order."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, question_import):
+        """Queue ``question_import``; call once its row is committed."""
+        self.queue.put((question_import.pk, question_import._state.db))
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='question-import', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            pk, using = self.queue.get()
+            try:
+                run_pending_import(pk, using)
+            except Exception:
+                logger.exception("Question import %s failed", pk)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+import_worker = ImportWorker()
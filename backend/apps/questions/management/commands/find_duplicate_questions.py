@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.questions.duplicates import duplicate_clusters, refresh_index
+from apps.questions.models import Question
+from utils.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = "Report clusters of near-duplicate questions in each center's bank"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--center', type=int, action='append', help="Center id (repeatable; default: every center)")
+        parser.add_argument(
+            '--threshold', type=float, default=settings.QUESTION_DUPLICATE_THRESHOLD,
+            help="Estimated similarity at which questions are near-duplicates (0 to 1)",
+        )
+        parser.add_argument('--limit', type=int, default=20, help="Largest clusters listed per center")
+        parser.add_argument('--rebuild', action='store_true', help="Recompute every fingerprint first")
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError("--threshold must be between 0 and 1")
+        for alias in shard_aliases():
+            indexed = refresh_index(using=alias, rebuild=options['rebuild'])
+            if indexed:
+                self.stdout.write(f"Indexed {indexed} questions in {alias}")
+            centers = options['center'] or (
+                Question.objects.using(alias).order_by('center_id').values_list('center_id', flat=True).distinct()
+            )
+            for center_id in centers:
+                clusters = duplicate_clusters(center_id, options['threshold'], using=alias, refresh=False)
+                if not clusters:
+                    continue
+                duplicates = sum(cluster['size'] - 1 for cluster in clusters)
+                self.stdout.write(self.style.WARNING(
+                    f"Center {center_id}: {len(clusters)} clusters, {duplicates} near-duplicate questions"
+                ))
+                for cluster in clusters[:options['limit']]:
+                    others = ', '.join(
+                        f"{question['id']} ({question['similarity']:.2f})"
+                        for question in cluster['questions'] if question['id'] != cluster['representative']
+                    )
+                    self.stdout.write(f"  {cluster['representative']}: {others}")
+        self.stdout.write(self.style.SUCCESS("Duplicate scan complete"))
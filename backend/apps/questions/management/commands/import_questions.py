@@ -0,0 +1,75 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.models import Center
+from apps.questions.importers import QuestionImporter, run_pending_import
+from apps.questions.models import QuestionImport
+from utils.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = "Import a question bank file (CSV, XLSX or JSON) into a center's bank"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Question file")
+        parser.add_argument('--center', type=int, help="Center id")
+        parser.add_argument('--user', help="Username recorded as the questions' author")
+        parser.add_argument('--batch-size', type=int, help="Rows per chunk (default: QUESTION_IMPORT_BATCH_SIZE)")
+        parser.add_argument(
+            '--pending', action='store_true',
+            help="Run uploaded imports that are still pending instead of importing a file",
+        )
+
+    def progress(self, importer):
+        self.stdout.write(
+            f"{importer.total} rows: {importer.successful} imported, "
+            f"{importer.duplicates} duplicates, {importer.failed} failed"
+        )
+
+    def report(self, question_import):
+        for line in question_import.error_log.splitlines()[:20]:
+            self.stderr.write(line)
+        if question_import.status != 'completed':
+            raise CommandError(f"Import {question_import.pk} failed")
+        self.stdout.write(self.style.SUCCESS(
+            f"Import {question_import.pk}: {question_import.successful_records} questions imported, "
+            f"{question_import.duplicate_records} duplicates skipped, {question_import.failed_records} rows rejected"
+        ))
+
+    def handle_pending(self, options):
+        failed = []
+        for alias in shard_aliases():
+            pending = QuestionImport.objects.using(alias).filter(status='pending').order_by('created_at')
+            for pk in pending.values_list('pk', flat=True):
+                question_import = run_pending_import(pk, alias, batch_size=options['batch_size'], progress=self.progress)
+                if question_import is None:
+                    continue
+                try:
+                    self.report(question_import)
+                except CommandError as exc:
+                    self.stderr.write(str(exc))
+                    failed.append(pk)
+        if failed:
+            raise CommandError(f"{len(failed)} imports failed")
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            return self.handle_pending(options)
+        if not (options['path'] and options['center'] and options['user']):
+            raise CommandError("path, --center and --user are required unless --pending is given")
+        if not os.path.isfile(options['path']):
+            raise CommandError(f"No such file: {options['path']}")
+        try:
+            center = Center.objects.get(pk=options['center'])
+            user = get_user_model().objects.get(username=options['user'])
+        except (Center.DoesNotExist, get_user_model().DoesNotExist) as exc:
+            raise CommandError(str(exc))
+
+        with open(options['path'], 'rb') as handle:
+            question_import = QuestionImport(center=center, uploaded_by=user)
+            question_import.file.save(os.path.basename(options['path']), File(handle))
+
+        self.report(QuestionImporter(question_import, options['batch_size'], self.progress).run())
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_composite_indexes'),
+        ('questions', '0002_question_question_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionFingerprint',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='questions.question')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('signature', models.BinaryField()),
+                ('source_updated_at', models.DateTimeField()),
+                ('center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='authentication.center')),
+            ],
+            options={
+                'verbose_name': 'Question Fingerprint',
+                'verbose_name_plural': 'Question Fingerprints',
+            },
+        ),
+    ]
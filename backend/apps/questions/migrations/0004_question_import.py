@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:26
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('questions', '0003_question_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='questions/imports/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['json', 'xlsx', 'csv'])])),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_records', models.PositiveIntegerField(default=0)),
+                ('successful_records', models.PositiveIntegerField(default=0)),
+                ('duplicate_records', models.PositiveIntegerField(default=0)),
+                ('failed_records', models.PositiveIntegerField(default=0)),
+                ('error_log', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_imports', to='authentication.center')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Question Import',
+                'verbose_name_plural': 'Question Imports',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
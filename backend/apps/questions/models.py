@@ -1,6 +1,9 @@
+from django.conf import settings
+from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils import timezone
 from apps.authentication.models import User, Center
+from utils.sharding import CenterManager
 
 class Question(models.Model):
     QUESTION_TYPES = [
@@ -42,8 +45,13 @@ class Question(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CenterManager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='question_keyset_idx'),
+        ]
         verbose_name = 'Question'
         verbose_name_plural = 'Questions'
     
@@ -62,3 +70,54 @@ class Question(models.Model):
         if self.option_d:
             options.append(('D', self.option_d))
         return options
+
+
+class QuestionFingerprint(models.Model):
+    """MinHash signature of a question's normalised text and options (see ``duplicates.py``)."""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    center = models.ForeignKey(Center, on_delete=models.CASCADE, related_name='+')
+    content_hash = models.CharField(max_length=64, db_index=True)
+    signature = models.BinaryField()
+    # ``Question.updated_at`` when the signature was computed
+    source_updated_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Question Fingerprint'
+        verbose_name_plural = 'Question Fingerprints'
+
+
+class QuestionImport(models.Model):
+    """A question bank file imported in bulk, with running progress counters."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    file = models.FileField(
+        upload_to='questions/imports/',
+        validators=[FileExtensionValidator(allowed_extensions=settings.IMPORT_FORMATS)],
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    total_records = models.PositiveIntegerField(default=0)
+    successful_records = models.PositiveIntegerField(default=0)
+    duplicate_records = models.PositiveIntegerField(default=0)
+    failed_records = models.PositiveIntegerField(default=0)
+    error_log = models.TextField(blank=True)
+    
+    center = models.ForeignKey(Center, on_delete=models.CASCADE, related_name='question_imports')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='question_imports')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = CenterManager()
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Question Import'
+        verbose_name_plural = 'Question Imports'
+    
+    def __str__(self):
+        return f"Question Import {self.id} - {self.status}"
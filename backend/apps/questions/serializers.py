@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from .models import Question
+from utils.fieldsets import SparseFieldsetMixin
+from .models import Question, QuestionImport
 from apps.authentication.serializers import CenterSerializer, UserSerializer
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     center = CenterSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
     
@@ -23,3 +24,13 @@ class QuestionSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Multiple choice questions must have at least 2 options")
         
         return data
+
+
+class QuestionImportSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = QuestionImport
+        fields = '__all__'
+        read_only_fields = (
+            'status', 'total_records', 'successful_records', 'duplicate_records', 'failed_records',
+            'error_log', 'center', 'uploaded_by', 'created_at', 'completed_at'
+        )
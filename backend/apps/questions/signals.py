@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .duplicates import FINGERPRINT_FIELDS, index_questions
+from .models import Question
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, using, **kwargs):
+    # Re-read on commit: the question may have changed again or been deleted
+    # since (fingerprints are deleted with their question)
+    transaction.on_commit(
+        lambda: index_questions(Question.objects.using(using).filter(pk=instance.pk).only(*FINGERPRINT_FIELDS), using),
+        using=using,
+    )
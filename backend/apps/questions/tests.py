@@ -1,3 +1,125 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from utils.testing import QueryCountTestMixin, make_center, make_question, make_user
+from .duplicates import duplicate_clusters, refresh_index
+from .importers import QuestionImporter
+from .models import Question, QuestionFingerprint, QuestionImport
+
+
+class QuestionListQueryTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin', make_center()))
+        self.created = 0
+
+    def add_questions(self, count):
+        for _ in range(count):
+            self.created += 1
+            center = make_center(f'Q{self.created:03d}')
+            make_question(center, make_user(f'setter{self.created}', center), question_text=f'Question {self.created}?')
+
+    def test_list_query_count_is_constant(self):
+        self.assertConstantQueries('/api/questions/', self.add_questions)
+
+
+ANTHEM = {
+    'question_text': 'Who wrote the national anthem of India?', 'option_a': 'Rabindranath Tagore',
+    'option_b': 'Bankim Chandra Chatterjee', 'option_c': 'Sarojini Naidu', 'option_d': 'Subramania Bharati',
+    'correct_answer': 'A',
+}
+
+
+class QuestionDuplicateTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.center = make_center()
+        self.setter = make_user('setter', self.center)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.original = make_question(self.center, self.setter, question_text='Which city is the capital of India?')
+            # Reworded, options reordered
+            self.reworded = make_question(
+                self.center, self.setter, question_text='Which city is the capital city of India?',
+                option_a='Chennai', option_b='Kolkata', option_c='Delhi', option_d='Mumbai', correct_answer='C',
+            )
+            self.distinct = make_question(self.center, self.setter, **ANTHEM)
+            make_question(make_center('CTR002'), self.setter, question_text='Which city is the capital of India?')
+
+    def clusters(self, threshold=0.7):
+        return duplicate_clusters(self.center.pk, threshold, refresh=False)
+
+    def test_reworded_question_is_clustered_with_the_original(self):
+        clusters = self.clusters()
+        self.assertEqual(len(clusters), 1)
+        cluster = clusters[0]
+        self.assertEqual((cluster['representative'], cluster['size']), (self.original.pk, 2))
+        questions = {question['id']: question['similarity'] for question in cluster['questions']}
+        self.assertEqual(set(questions), {self.original.pk, self.reworded.pk})
+        self.assertEqual(questions[self.original.pk], 1.0)
+        self.assertTrue(0.7 <= questions[self.reworded.pk] < 1, questions)
+
+    def test_threshold_is_applied(self):
+        score = self.clusters()[0]['questions'][1]['similarity']
+        self.assertEqual(len(self.clusters(score)), 1)
+        self.assertEqual(self.clusters(score + 0.01), [])
+
+        client = APIClient()
+        client.force_authenticate(make_user('admin', self.center))
+        response = client.get(f'/api/questions/duplicates/?threshold={score + 0.01}')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.data['count'], response.data['clusters']), (0, []))
+        response = client.get('/api/questions/duplicates/')
+        self.assertEqual((response.data['count'], response.data['duplicates']), (1, 1))
+        self.assertEqual(client.get('/api/questions/duplicates/?threshold=0').status_code, 400)
+
+    def test_saved_edits_update_the_fingerprint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for field, value in ANTHEM.items():
+                setattr(self.reworded, field, value)
+            self.reworded.save()
+        fingerprint = QuestionFingerprint.objects.get(question=self.reworded)
+        self.assertEqual(fingerprint.source_updated_at, Question.objects.get(pk=self.reworded.pk).updated_at)
+        clusters = self.clusters()
+        members = [question['id'] for question in clusters[0]['questions']]
+        self.assertEqual(members, [self.reworded.pk, self.distinct.pk])
+        # Nothing left for the catch-up pass
+        self.assertEqual(refresh_index(self.center.pk), 0)
+
+    def test_bulk_writes_are_caught_up(self):
+        # As sync applies rows: no signals, updated_at carried over
+        Question.objects.filter(pk=self.distinct.pk).update(
+            question_text='Which city is the capital of India?', option_a='Mumbai', option_b='Delhi',
+            option_c='Kolkata', option_d='Chennai', updated_at=timezone.now(),
+        )
+        self.assertEqual(self.clusters()[0]['size'], 2)
+        self.assertEqual(duplicate_clusters(self.center.pk, 0.7)[0]['size'], 3)
+        self.assertEqual(refresh_index(self.center.pk), 0)
+
+    def test_imported_questions_are_fingerprinted(self):
+        rows = [
+            # Exact duplicate of the original once normalised
+            {'question_text': 'Which city is the CAPITAL of India', 'option_a': 'Chennai', 'option_b': 'Delhi',
+             'option_c': 'Kolkata', 'option_d': 'Mumbai', 'correct_answer': 'B'},
+            {**ANTHEM, 'question_text': 'Who wrote the national anthem of India, Jana Gana Mana?'},
+        ]
+        question_import = QuestionImport(center=self.center, uploaded_by=self.setter)
+        question_import.file.save('bank.json', ContentFile(json.dumps(rows).encode('utf-8')))
+        question_import = QuestionImporter(question_import).run()
+        self.assertEqual((question_import.successful_records, question_import.duplicate_records), (1, 1))
+
+        imported = Question.objects.get(question_text__contains='Jana Gana Mana')
+        self.assertTrue(QuestionFingerprint.objects.filter(question=imported).exists())
+        clusters = self.clusters()
+        self.assertEqual([cluster['representative'] for cluster in clusters], [self.original.pk, self.distinct.pk])
+        self.assertEqual([question['id'] for question in clusters[1]['questions']], [self.distinct.pk, imported.pk])
@@ -9,7 +9,9 @@ urlpatterns = [
     path('<int:pk>/', views.QuestionDetailView.as_view(), name='question-detail'),
     path('<int:pk>/update/', views.QuestionUpdateView.as_view(), name='question-update'),
     path('<int:pk>/delete/', views.QuestionDeleteView.as_view(), name='question-delete'),
+    path('duplicates/', views.QuestionDuplicatesView.as_view(), name='question-duplicates'),
     path('bank/', views.QuestionBankView.as_view(), name='question-bank'),
     path('import/', views.QuestionImportView.as_view(), name='question-import'),
+    path('import/<int:pk>/', views.QuestionImportDetailView.as_view(), name='question-import-detail'),
     path('export/', views.QuestionExportView.as_view(), name='question-export'),
 ]
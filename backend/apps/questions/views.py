@@ -1,11 +1,19 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from .models import Question
-from .serializers import QuestionSerializer
+from apps.authentication.models import Center
+from apps.authentication.permissions import IsEvaluatorOrAdmin
+from utils.queries import RelatedQuerysetMixin
+from utils.sharding import center_alias, CenterShardMixin
+from .duplicates import duplicate_clusters
+from .importers import import_worker
+from .models import Question, QuestionImport
+from .serializers import QuestionSerializer, QuestionImportSerializer
 
-class QuestionListView(generics.ListCreateAPIView):
+class QuestionListView(CenterShardMixin, RelatedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
@@ -15,32 +23,101 @@ class QuestionCreateView(generics.CreateAPIView):
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
 
-class QuestionDetailView(generics.RetrieveAPIView):
+class QuestionDetailView(CenterShardMixin, RelatedQuerysetMixin, generics.RetrieveAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
 
-class QuestionUpdateView(generics.UpdateAPIView):
+class QuestionUpdateView(CenterShardMixin, generics.UpdateAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
 
-class QuestionDeleteView(generics.DestroyAPIView):
+class QuestionDeleteView(CenterShardMixin, generics.DestroyAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
 
-class QuestionBankView(generics.ListAPIView):
+class QuestionBankView(CenterShardMixin, RelatedQuerysetMixin, generics.ListAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
 
+class QuestionDuplicatesView(generics.GenericAPIView):
+    """
+    Clusters of near-duplicate questions in a center's bank.
+    
+    Narrow with ``?center=`` (default: the user's center), ``?threshold=``
+    (estimated similarity, 0 to 1) and ``?limit=`` (largest clusters
+    shown, default 100); ``count`` is the number of clusters found.
+    Only stored fingerprints are read: saves and imports index questions as
+    they are written, and ``find_duplicate_questions`` catches up the rest.
+    """
+    permission_classes = [IsEvaluatorOrAdmin]
+    
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            center_id = int(params.get('center') or request.user.center_id or settings.CENTER_ID)
+            threshold = float(params.get('threshold', settings.QUESTION_DUPLICATE_THRESHOLD))
+            limit = max(int(params.get('limit', 100)), 1)
+        except ValueError:
+            return Response({"detail": "center, threshold and limit must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < threshold <= 1:
+            return Response({"detail": "threshold must be between 0 and 1"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        using = center_alias(center_id)
+        clusters = duplicate_clusters(center_id, threshold, using=using, refresh=False)
+        shown = clusters[:limit]
+        texts = dict(
+            Question.objects.using(using)
+            .filter(id__in=[question['id'] for cluster in shown for question in cluster['questions']])
+            .values_list('id', 'question_text')
+        )
+        for cluster in shown:
+            for question in cluster['questions']:
+                question['question_text'] = texts.get(question['id'], '')
+        return Response({
+            'center': center_id,
+            'threshold': threshold,
+            'count': len(clusters),
+            'duplicates': sum(cluster['size'] - 1 for cluster in clusters),
+            'clusters': shown,
+        })
+
 class QuestionImportView(generics.CreateAPIView):
+    """
+    Import a question bank file (CSV, XLSX or JSON) into a center's bank.
+    
+    The file is stored and queued, and the import record is returned with
+    202 Accepted; poll ``import/<id>/`` for its status and counters. Rows are
+    validated and inserted in chunks; questions already in the bank (same
+    normalised text and options) are skipped and counted as duplicates.
+    Only admins may import into a center other than their own.
+    """
+    queryset = QuestionImport.objects.all()
+    serializer_class = QuestionImportSerializer
     permission_classes = [IsAuthenticated]
     
     def post(self, request, *args, **kwargs):
-        # TODO: Implement import functionality
-        return Response({"message": "Import functionality coming soon"}, status=status.HTTP_200_OK)
+        center_id = request.data.get('center_id') or request.user.center_id
+        if not center_id:
+            return Response({"detail": "center_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if request.user.user_type != 'admin' and str(center_id) != str(request.user.center_id):
+            return Response({"detail": "You can only import questions into your own center"}, status=status.HTTP_403_FORBIDDEN)
+        center = get_object_or_404(Center, pk=center_id)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        question_import = serializer.save(uploaded_by=request.user, center=center)
+        
+        transaction.on_commit(lambda: import_worker.submit(question_import), using=question_import._state.db)
+        return Response(self.get_serializer(question_import).data, status=status.HTTP_202_ACCEPTED)
+
+class QuestionImportDetailView(CenterShardMixin, RelatedQuerysetMixin, generics.RetrieveAPIView):
+    queryset = QuestionImport.objects.all()
+    serializer_class = QuestionImportSerializer
+    permission_classes = [IsAuthenticated]
 
 class QuestionExportView(generics.ListAPIView):
     queryset = Question.objects.all()
@@ -0,0 +1,27 @@
+from django.contrib import admin
+
+from .models import AppliedBundle, ChangeJournal, SyncWatermark
+
+
+@admin.register(SyncWatermark)
+class SyncWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['peer', 'direction', 'seq', 'synced_at']
+    list_filter = ['direction']
+
+
+@admin.register(ChangeJournal)
+class ChangeJournalAdmin(admin.ModelAdmin):
+    list_display = ['seq', 'model', 'object_pk', 'operation', 'center_id', 'changed_at']
+    list_filter = ['model', 'operation']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AppliedBundle)
+class AppliedBundleAdmin(admin.ModelAdmin):
+    list_display = ['bundle_id', 'center_code', 'applied_at']
+    readonly_fields = ['bundle_id', 'center_code', 'summary', 'applied_at']
@@ -0,0 +1,32 @@
+from django.apps import AppConfig
+
+
+class SyncConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.sync'
+    verbose_name = 'Sync'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate, pre_migrate
+        pre_migrate.connect(remove_journal_triggers, sender=self)
+        post_migrate.connect(install_journal_triggers, sender=self)
+
+
+def remove_journal_triggers(sender, using, **kwargs):
+    """
+    Drop the SQLite triggers while migrations run.
+
+    SQLite alters a table by rebuilding and renaming it, which fails while a
+    trigger on another table (e.g. exam questions) reads the table by name.
+    """
+    from django.db import connections
+    from .journal import remove_triggers
+    if connections[using].vendor == 'sqlite':
+        remove_triggers(connections[using])
+
+
+def install_journal_triggers(sender, using, **kwargs):
+    """Re-create the triggers, covering tables ``--run-syncdb`` created later."""
+    from django.db import connections
+    from .journal import install_triggers
+    install_triggers(connections[using])
@@ -0,0 +1,100 @@
+"""
+HTTP client a center node uses to sync with HQ.
+
+Before a bundle's rows go either way, the blobs they name are transferred:
+a push asks HQ which it lacks and uploads only those, a pull downloads only
+those this node lacks.
+"""
+import json
+import logging
+import os
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from apps.candidates.storage import candidate_file_storage
+from .engine import (
+    apply_bundle, build_bundle, decode_bundle, encode_bundle, load_watermark, missing_blobs, save_watermark,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncError(Exception):
+    """HQ rejected a request or could not be reached."""
+
+
+class SyncClient:
+    """Push local changes to HQ and pull HQ's changes for one center."""
+
+    def __init__(self, base_url=None, token=None, timeout=None):
+        self.base_url = (base_url or settings.SYNC_HQ_URL).rstrip('/') + '/'
+        self.token = token if token is not None else settings.SYNC_TOKEN
+        self.timeout = timeout or settings.SYNC_TIMEOUT
+
+    def _post(self, path, body, content_type):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=body,
+            method='POST',
+            headers={'Content-Type': content_type, 'X-Sync-Token': self.token},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            raise SyncError(f"{path} failed with HTTP {exc.code}: {exc.read()[:500]!r}") from exc
+        except urllib.error.URLError as exc:
+            raise SyncError(f"Cannot reach {self.base_url}: {exc.reason}") from exc
+
+    def send_blobs(self, names):
+        """Upload the blobs in ``names`` HQ does not hold; returns how many were sent."""
+        if not names:
+            return 0
+        _, body = self._post('blobs/', json.dumps({'names': names}).encode('utf-8'), 'application/json')
+        missing = json.loads(body)['missing']
+        for name in missing:
+            with candidate_file_storage.open(name, 'rb') as content:
+                self._post(f'blobs/{os.path.basename(name)}/upload/', content.read(), 'application/octet-stream')
+        return len(missing)
+
+    def fetch_blobs(self, names):
+        """Download the blobs in ``names`` this node does not hold; returns how many were fetched."""
+        missing = missing_blobs(names)
+        for name in missing:
+            _, body = self._post(f'blobs/{os.path.basename(name)}/download/', b'', 'application/octet-stream')
+            if candidate_file_storage.save(name, ContentFile(body)) != name:
+                raise SyncError(f"Blob {name} arrived corrupted")
+        return len(missing)
+
+    def push(self, center):
+        """Send every local change since the last push; returns the bundle count."""
+        bundles = 0
+        while True:
+            bundle, seq = build_bundle(center, load_watermark(self.base_url, 'push'))
+            if bundle is None:
+                return bundles
+            sent = self.send_blobs(bundle['blobs'])
+            _, body = self._post('push/', encode_bundle(bundle), 'application/gzip')
+            # Only advance once HQ has acknowledged the bundle
+            save_watermark(self.base_url, 'push', seq)
+            bundles += 1
+            logger.info('Pushed bundle %s with %d new blobs: %s', bundle['bundle_id'], sent, json.loads(body))
+
+    def pull(self, center):
+        """Apply every HQ change since the last pull; returns the bundle count."""
+        bundles = 0
+        while True:
+            request = {'center': center.code, 'seq': load_watermark(self.base_url, 'pull')}
+            status, body = self._post('pull/', json.dumps(request).encode('utf-8'), 'application/json')
+            if status == 204 or not body:
+                return bundles
+            bundle = decode_bundle(body)
+            fetched = self.fetch_blobs(bundle['blobs'])
+            summary = apply_bundle(bundle)
+            save_watermark(self.base_url, 'pull', bundle['seq'])
+            bundles += 1
+            logger.info('Pulled bundle %s with %d new blobs: %s', bundle['bundle_id'], fetched, summary)
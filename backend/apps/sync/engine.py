@@ -0,0 +1,403 @@
+"""
+Incremental sync between center nodes and HQ.
+
+Only rows changed since the last exchange are shipped. Changes are read from
+the change journal (see ``journal.py``) after a single per-peer sequence
+number, so finding them is one range scan however many tables changed, and
+deletions arrive as journal entries rather than a separate tombstone table.
+A bundle is a gzip-compressed JSON document holding a batch of rows of one
+center in Django's serialisation format, with users and centers referenced by
+natural key because primary keys of global rows differ between nodes.
+
+Applying a bundle is idempotent. Rows are upserted by primary key, a row is
+never overwritten by an older version (last writer wins on ``updated_at``),
+and bundle ids already applied are acknowledged without work. Center-scoped
+primary keys are preserved, so HQ keeps each center's rows in its own shard
+(see ``utils.sharding``) and new rows of a center are created at that center;
+a row whose primary key is taken by a different row (different
+``created_at``) is reported as a conflict instead of overwriting it.
+
+Candidate photos and documents travel as rows naming content-addressed blobs
+(see ``apps.candidates.storage``). A bundle lists the blobs its rows name and
+the client transfers only those the receiving node does not hold yet, before
+the rows are applied. These rows have no update time of their own, so the
+latest bundle wins, and one whose candidate differs from the stored row's is
+a conflict.
+"""
+import gzip
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.authentication.models import Center
+from apps.candidates.signals import FILE_FIELDS
+from apps.candidates.storage import blob_hash, candidate_file_storage
+from utils.sharding import center_alias
+from .journal import changes_since, committed_seq, journaling_paused
+from .models import AppliedBundle, ChangeJournal, SyncWatermark
+
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 3
+
+# Dependency order: rows are applied after the rows they reference
+SYNCED_MODELS = [
+    'candidates.Candidate',
+    'candidates.CandidatePhoto',
+    'candidates.CandidateDocument',
+    'questions.Question',
+    'exams.Exam',
+    'exam_results.Result',
+    'evaluation.Evaluation',
+]
+
+USER_FIELDS = ('username', 'first_name', 'last_name', 'email', 'user_type')
+
+
+class BundleError(Exception):
+    """A bundle that cannot be applied on this node."""
+
+
+class BundleEncoder(DjangoJSONEncoder):
+    """Keep microseconds, which ``DjangoJSONEncoder`` drops but watermarks need."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_bundle(bundle):
+    return gzip.compress(json.dumps(bundle, cls=BundleEncoder).encode('utf-8'))
+
+
+def decode_bundle(data):
+    try:
+        bundle = json.loads(gzip.decompress(data))
+    except (OSError, ValueError) as exc:
+        raise BundleError(f"Unreadable bundle: {exc}") from exc
+    if bundle.get('version') != BUNDLE_VERSION:
+        raise BundleError(f"Unsupported bundle version {bundle.get('version')!r}")
+    return bundle
+
+
+def center_lookup(model):
+    """Lookup of a synced row's center; photos and documents have their candidate's."""
+    if any(field.name == 'center' for field in model._meta.concrete_fields):
+        return 'center_id'
+    return 'candidate__center_id'
+
+
+def file_field(model):
+    """Name of the stored file field of ``model``, or ``None``."""
+    return FILE_FIELDS.get(model)
+
+
+def missing_blobs(names):
+    """The blob names in ``names`` this node does not hold."""
+    return [name for name in names if not candidate_file_storage.exists(name)]
+
+
+def load_watermark(peer, direction):
+    """Last journal seq exchanged with ``peer`` in ``direction``."""
+    mark = SyncWatermark.objects.filter(peer=peer, direction=direction).first()
+    return mark.seq if mark else 0
+
+
+def save_watermark(peer, direction, seq):
+    SyncWatermark.objects.update_or_create(peer=peer, direction=direction, defaults={'seq': seq})
+
+
+def natural_key_relations(model):
+    """Foreign keys serialised by natural key, to ``select_related`` up front."""
+    return [
+        field.name for field in model._meta.concrete_fields
+        if field.is_relation and hasattr(field.related_model, 'natural_key')
+    ]
+
+
+def resolve_natural_keys(rows, using):
+    """
+    Replace natural foreign keys in serialised ``rows`` with primary keys.
+
+    Each distinct key is looked up once, instead of once per row as
+    ``serializers.deserialize`` would.
+    """
+    resolved = {}
+    for row in rows:
+        model = apps.get_model(row['model'])
+        for name, value in row['fields'].items():
+            if not isinstance(value, list):
+                continue
+            field = model._meta.get_field(name)
+            if not field.many_to_one and not field.one_to_one:
+                continue
+            key = (field.related_model, tuple(value))
+            if key not in resolved:
+                manager = field.related_model._default_manager.db_manager(using)
+                resolved[key] = manager.get_by_natural_key(*value).pk
+            row['fields'][name] = resolved[key]
+    return rows
+
+
+def referenced_users(objects):
+    """Identity of every user ``objects`` point at, for ``ensure_users``."""
+    User = get_user_model()
+    user_ids = set()
+    for obj in objects:
+        for field in obj._meta.concrete_fields:
+            if field.is_relation and field.related_model is User:
+                user_id = getattr(obj, field.attname)
+                if user_id:
+                    user_ids.add(user_id)
+    return list(User.objects.filter(pk__in=user_ids).values(*USER_FIELDS))
+
+
+def _include_parents(pks, alias, after):
+    """
+    Add referenced rows the peer cannot have received yet.
+
+    Compaction moves a row's only journal entry to its latest change, which
+    can lie beyond this batch even though a child in the batch references it.
+    """
+    for label in reversed(SYNCED_MODELS):
+        if not pks[label]:
+            continue
+        model = apps.get_model(label)
+        parents = [
+            field for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model._meta.label in SYNCED_MODELS
+        ]
+        if not parents:
+            continue
+        values = model._base_manager.using(alias).filter(pk__in=pks[label]).values_list(
+            *[field.attname for field in parents]
+        )
+        referenced = defaultdict(set)
+        for row in values:
+            for field, value in zip(parents, row):
+                if value is not None:
+                    referenced[field.related_model._meta.label].add(value)
+        for parent, parent_pks in referenced.items():
+            pending = ChangeJournal.objects.using(alias).filter(
+                model=parent, object_pk__in=parent_pks - pks[parent], seq__gt=after
+            ).values_list('object_pk', flat=True)
+            pks[parent].update(pending)
+
+
+def build_bundle(center, since, batch_size=None):
+    """
+    Collect rows of ``center`` changed after journal seq ``since``.
+
+    Returns ``(bundle, seq)`` where ``seq`` is the watermark to store once the
+    bundle is delivered; ``bundle`` is ``None`` when there is nothing left to
+    send. A bundle covers at most ``batch_size`` journal entries plus the
+    rows they reference that have not been sent yet.
+    """
+    batch_size = batch_size or settings.SYNC_BATCH_SIZE
+    alias = center_alias(center.pk)
+    entries = list(
+        changes_since(since, using=alias, models=SYNCED_MODELS, center_id=center.pk, until=committed_seq(alias))
+        [:batch_size]
+    )
+    if not entries:
+        return None, since
+    seq = entries[-1].seq
+
+    latest = {(entry.model, entry.object_pk): entry for entry in entries}
+    pks = defaultdict(set)
+    deletions = []
+    for (label, object_pk), entry in latest.items():
+        if entry.operation == 'D':
+            deletions.append({'model': label, 'pk': object_pk, 'deleted_at': entry.changed_at})
+        else:
+            pks[label].add(object_pk)
+    _include_parents(pks, alias, seq)
+
+    rows, shipped, blobs = {}, [], set()
+    for label in SYNCED_MODELS:
+        if not pks[label]:
+            continue
+        model = apps.get_model(label)
+        objects = list(
+            model._base_manager.using(alias)
+            .filter(pk__in=pks[label], **{center_lookup(model): center.pk})
+            .select_related(*natural_key_relations(model))
+            .order_by('pk')
+        )
+        field = file_field(model)
+        if field:
+            legacy = [obj for obj in objects if blob_hash(getattr(obj, field).name) is None]
+            if legacy:
+                logger.warning(
+                    'Not syncing %d %s stored before dedup; run deduplicate_candidate_files',
+                    len(legacy), model._meta.verbose_name_plural,
+                )
+                objects = [obj for obj in objects if obj not in legacy]
+            blobs.update(getattr(obj, field).name for obj in objects)
+        if not objects:
+            # Deleted after the journaled change; the delete entry follows
+            continue
+        shipped.extend(objects)
+        rows[label] = serializers.serialize('python', objects, use_natural_foreign_keys=True)
+
+    bundle = {
+        'version': BUNDLE_VERSION,
+        'bundle_id': str(uuid.uuid4()),
+        'center': center.code,
+        'created_at': timezone.now(),
+        'users': referenced_users(shipped),
+        'rows': rows,
+        'tombstones': deletions,
+        'blobs': sorted(blobs),
+        'seq': seq,
+    }
+    return bundle, seq
+
+
+def ensure_users(users):
+    """Create inactive placeholders for users this node has never seen."""
+    User = get_user_model()
+    known = set(User.objects.filter(username__in=[user['username'] for user in users]).values_list('username', flat=True))
+    for user in users:
+        if user['username'] in known:
+            continue
+        placeholder = User(is_active=False, **{field: user.get(field) or '' for field in USER_FIELDS})
+        placeholder.set_unusable_password()
+        placeholder.save()
+
+
+def apply_bundle(bundle):
+    """
+    Apply a decoded bundle and return a summary of what changed.
+
+    Safe to call repeatedly with the same bundle.
+    """
+    bundle_id = uuid.UUID(bundle['bundle_id'])
+    applied = AppliedBundle.objects.filter(bundle_id=bundle_id).first()
+    if applied is not None:
+        return dict(applied.summary, duplicate=True)
+
+    try:
+        center = Center.objects.get(code=bundle['center'])
+    except Center.DoesNotExist:
+        raise BundleError(f"Unknown center {bundle['center']!r}")
+    alias = center_alias(center.pk)
+    if center.pk != settings.CENTER_ID and alias == center_alias(settings.CENTER_ID):
+        # Its primary keys would collide with the local center's rows
+        raise BundleError(f"Center {center.code} has no shard on this node")
+    ensure_users(bundle.get('users', []))
+
+    summary = {'center': center.code, 'saved': 0, 'unchanged': 0, 'deleted': 0, 'conflicts': []}
+    # Rows from the peer are not journaled, or the next exchange would echo them back
+    with journaling_paused(alias):
+        for label in SYNCED_MODELS:
+            objects = bundle['rows'].get(label)
+            if not objects:
+                continue
+            model = apps.get_model(label)
+            if file_field(model):
+                _apply_file_rows(model, objects, alias, center, summary)
+                continue
+            stored = {
+                pk: (created_at, updated_at)
+                for pk, created_at, updated_at in model._base_manager.using(alias)
+                .filter(pk__in=[obj['pk'] for obj in objects])
+                .values_list('pk', 'created_at', 'updated_at')
+            }
+            objects = resolve_natural_keys(objects, alias)
+            for deserialized in serializers.deserialize('python', objects, using=alias):
+                obj = deserialized.object
+                if obj.center_id != center.pk:
+                    raise BundleError(f"{label}#{obj.pk} belongs to another center")
+                if obj.pk in stored:
+                    created_at, updated_at = stored[obj.pk]
+                    if created_at != obj.created_at:
+                        # Same primary key, different row: created on both nodes
+                        summary['conflicts'].append(f'{label}#{obj.pk}')
+                        continue
+                    if updated_at >= obj.updated_at:
+                        summary['unchanged'] += 1
+                        continue
+                deserialized.save(using=alias)
+                summary['saved'] += 1
+
+        for tombstone in bundle.get('tombstones', []):
+            model = apps.get_model(tombstone['model'])
+            deleted_at = parse_datetime(tombstone['deleted_at'])
+            rows = model._base_manager.using(alias).filter(pk=tombstone['pk'], **{center_lookup(model): center.pk})
+            if not file_field(model):
+                # A row edited after the delete elsewhere survives it
+                rows = rows.filter(updated_at__lte=deleted_at)
+            deleted, _ = rows.delete()
+            summary['deleted'] += deleted
+
+    if summary['conflicts']:
+        logger.warning('Bundle %s skipped conflicting rows: %s', bundle_id, ', '.join(summary['conflicts']))
+    AppliedBundle.objects.create(bundle_id=bundle_id, center_code=center.code, summary=summary)
+    return summary
+
+
+def _apply_file_rows(model, objects, alias, center, summary):
+    """
+    Upsert photo or document rows, moving blob references along.
+
+    The blobs they name must have been transferred already.
+    """
+    field = file_field(model)
+    storage = model._meta.get_field(field).storage
+    stored = {
+        pk: (candidate_id, name)
+        for pk, candidate_id, name in model._base_manager.using(alias)
+        .filter(pk__in=[obj['pk'] for obj in objects])
+        .values_list('pk', 'candidate_id', field)
+    }
+    objects = resolve_natural_keys(objects, alias)
+    candidate_ids = [obj['fields']['candidate'] for obj in objects]
+    candidates = dict(
+        apps.get_model('candidates.Candidate')._base_manager.using(alias)
+        .filter(pk__in=candidate_ids).values_list('pk', 'center_id')
+    )
+    # A candidate has one photo, which may have been added on both nodes
+    holders = {}
+    if model._meta.get_field('candidate').one_to_one:
+        holders = dict(
+            model._base_manager.using(alias).filter(candidate_id__in=candidate_ids).values_list('candidate_id', 'pk')
+        )
+    for deserialized in serializers.deserialize('python', objects, using=alias):
+        obj = deserialized.object
+        if candidates.get(obj.candidate_id) != center.pk:
+            raise BundleError(f"{model._meta.label}#{obj.pk} belongs to another center")
+        name = getattr(obj, field).name
+        if missing_blobs([name]):
+            raise BundleError(f"{model._meta.label}#{obj.pk} names {name}, which this node does not hold")
+        candidate_id, previous = stored.get(obj.pk, (obj.candidate_id, None))
+        if candidate_id != obj.candidate_id or holders.get(obj.candidate_id, obj.pk) != obj.pk:
+            summary['conflicts'].append(f'{model._meta.label}#{obj.pk}')
+            continue
+        deserialized.save(using=alias)
+        summary['saved'] += 1
+        if previous != name:
+            # Raw saves take no references (see ``apps.candidates.signals``)
+            transaction.on_commit(lambda name=name: storage.retain(name), using=alias)
+            if previous:
+                transaction.on_commit(lambda previous=previous: storage.delete(previous), using=alias)
+
+
+def purge_applied_bundles():
+    """Forget applied bundle ids older than the journal retention window."""
+    cutoff = timezone.now() - timedelta(days=settings.CHANGE_JOURNAL_RETENTION_DAYS)
+    deleted, _ = AppliedBundle.objects.filter(applied_at__lt=cutoff).delete()
+    return deleted
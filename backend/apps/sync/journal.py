@@ -0,0 +1,254 @@
+"""
+Change-data-capture journal.
+
+Database triggers append a ``ChangeJournal`` entry for every insert, update
+and delete on the exam-system tables, including bulk writes and raw SQL that
+never send Django signals. Sync, cache invalidation and search indexing read
+"everything after seq N" with one range scan over the primary key instead of
+scanning each table's ``updated_at``.
+
+The journal is kept small in two ways. ``compact()`` drops entries superseded
+by a newer entry for the same row, because consumers always read a row's
+current state. ``purge()`` drops delete entries older than
+``CHANGE_JOURNAL_RETENTION_DAYS``, so a consumer must catch up within that
+window to see a deletion. Every live row keeps its latest entry, which lets a
+new consumer start from seq 0.
+
+Sequence numbers are handed out when a row is written, not when its
+transaction commits. On PostgreSQL a reader can therefore see seq 11 while
+seq 10 is still uncommitted, and a watermark stored at 11 would skip 10 for
+good. Consumers read up to ``committed_seq()``, below which no entry can
+still appear. SQLite has a single writer, so its entries commit in order.
+
+Changes applied from a peer are written inside ``journaling_paused()``.
+Journaling them would send them straight back on the next exchange.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import ChangeJournal
+
+
+# Journaled models and where their center comes from: a column of the row,
+# or (foreign key column, parent table) for rows that inherit a center
+JOURNALED_MODELS = {
+    'candidates.Candidate': 'center_id',
+    'candidates.CandidatePhoto': ('candidate_id', 'candidates'),
+    'candidates.CandidateDocument': ('candidate_id', 'candidates'),
+    'questions.Question': 'center_id',
+    'exams.Exam': 'center_id',
+    'exams.ExamQuestion': ('exam_id', 'exams_exam'),
+    'exam_results.Result': 'center_id',
+    'evaluation.Evaluation': 'center_id',
+}
+
+OPERATIONS = {'INSERT': 'I', 'UPDATE': 'U', 'DELETE': 'D'}
+
+# SQLite: triggers skip journaling while this table has a row. Only the
+# transaction that inserted the row sees it, and deletes it before commit.
+PAUSE_TABLE = 'change_journal_pause'
+
+POSTGRESQL_FUNCTION = """
+CREATE OR REPLACE FUNCTION change_journal_record() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+    center bigint;
+BEGIN
+    IF current_setting('change_journal.paused', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+    IF TG_NARGS > 2 THEN
+        EXECUTE format('SELECT center_id FROM %I WHERE id = $1', TG_ARGV[2])
+            INTO center USING (row_data->>TG_ARGV[1])::bigint;
+    ELSE
+        center := (row_data->>TG_ARGV[1])::bigint;
+    END IF;
+    INSERT INTO change_journal (model, object_pk, operation, center_id, changed_at)
+    VALUES (TG_ARGV[0], (row_data->>'id')::bigint, left(TG_OP, 1), center, clock_timestamp());
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _trigger_name(table, operation):
+    return f'change_journal_{table}_{operation.lower()}'
+
+
+def _center_sql(source, row):
+    if isinstance(source, tuple):
+        column, parent = source
+        return f'(SELECT center_id FROM {parent} WHERE id = {row}.{column})'
+    return f'{row}.{source}'
+
+
+def _has_updated_at(label):
+    return any(field.name == 'updated_at' for field in apps.get_model(label)._meta.concrete_fields)
+
+
+def _journaled_tables(connection):
+    existing = set(connection.introspection.table_names())
+    for label, source in JOURNALED_MODELS.items():
+        table = apps.get_model(label)._meta.db_table
+        if table in existing:
+            yield label, table, source
+
+
+def install_triggers(connection):
+    """Create the journal triggers on every journaled table of ``connection``."""
+    if ChangeJournal._meta.db_table not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRESQL_FUNCTION)
+        else:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {PAUSE_TABLE} (paused integer)')
+        for label, table, source in _journaled_tables(connection):
+            if connection.vendor == 'postgresql':
+                args = [label] + (list(source) if isinstance(source, tuple) else [source])
+                cursor.execute(f'DROP TRIGGER IF EXISTS change_journal ON {table}')
+                cursor.execute(
+                    f'CREATE TRIGGER change_journal AFTER INSERT OR UPDATE OR DELETE ON {table} '
+                    f'FOR EACH ROW EXECUTE FUNCTION change_journal_record('
+                    + ', '.join(f"'{arg}'" for arg in args) + ')'
+                )
+                continue
+            for operation, code in OPERATIONS.items():
+                row = 'OLD' if operation == 'DELETE' else 'NEW'
+                changed_at = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+                if operation == 'DELETE' and _has_updated_at(label):
+                    # SQLite's clock has millisecond precision; a delete must
+                    # not look older than the row's last update
+                    changed_at = f'max({changed_at}, OLD.updated_at)'
+                cursor.execute(f'DROP TRIGGER IF EXISTS {_trigger_name(table, operation)}')
+                cursor.execute(
+                    f'CREATE TRIGGER {_trigger_name(table, operation)} AFTER {operation} ON {table} '
+                    f'WHEN NOT EXISTS (SELECT 1 FROM {PAUSE_TABLE}) '
+                    f'BEGIN '
+                    f'INSERT INTO change_journal (model, object_pk, operation, center_id, changed_at) '
+                    f"VALUES ('{label}', {row}.id, '{code}', {_center_sql(source, row)}, {changed_at}); "
+                    f'END'
+                )
+
+
+def remove_triggers(connection):
+    with connection.cursor() as cursor:
+        for label, table, source in _journaled_tables(connection):
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'DROP TRIGGER IF EXISTS change_journal ON {table}')
+                continue
+            for operation in OPERATIONS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {_trigger_name(table, operation)}')
+        if connection.vendor == 'postgresql':
+            cursor.execute('DROP FUNCTION IF EXISTS change_journal_record()')
+
+
+def seed_journal(connection, labels=None):
+    """Journal every existing row (of ``labels``) once so consumers starting at seq 0 see it."""
+    with connection.cursor() as cursor:
+        for label, table, source in _journaled_tables(connection):
+            if labels is not None and label not in labels:
+                continue
+            cursor.execute(
+                f'INSERT INTO change_journal (model, object_pk, operation, center_id, changed_at) '
+                f"SELECT '{label}', {table}.id, 'I', {_center_sql(source, table)}, "
+                f"{'updated_at' if _has_updated_at(label) else 'CURRENT_TIMESTAMP'} FROM {table} ORDER BY {table}.id"
+            )
+
+
+@contextmanager
+def journaling_paused(using=DEFAULT_DB_ALIAS):
+    """
+    Run the block in a transaction on ``using`` whose writes are not journaled.
+
+    Only this transaction is affected: PostgreSQL gets a transaction-local
+    setting, SQLite a row in ``PAUSE_TABLE`` that is deleted before commit.
+    Both are undone when the block ends, so writes made after it in an
+    enclosing transaction are journaled again.
+    """
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT coalesce(current_setting('change_journal.paused', true), ''), "
+                    "set_config('change_journal.paused', 'on', true)"
+                )
+                previous = cursor.fetchone()[0]
+            else:
+                cursor.execute(f'INSERT INTO {PAUSE_TABLE} (paused) VALUES (1)')
+        yield
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT set_config('change_journal.paused', %s, true)", [previous])
+            else:
+                cursor.execute(f'DELETE FROM {PAUSE_TABLE}')
+
+
+def committed_seq(using=DEFAULT_DB_ALIAS):
+    """
+    Highest seq up to which every journal entry is committed.
+
+    On PostgreSQL a SHARE lock on the journal waits for the transactions
+    still writing to it; entries they created have lower seqs than any
+    created afterwards. The lock is released as soon as the seq is read.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return latest_seq(using)
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {ChangeJournal._meta.db_table} IN SHARE MODE')
+        return latest_seq(using)
+
+
+def changes_since(seq, using=DEFAULT_DB_ALIAS, models=None, center_id=None, until=None):
+    """Journal entries after ``seq`` (up to ``until``) in sequence order."""
+    queryset = ChangeJournal.objects.using(using).filter(seq__gt=seq or 0)
+    if until is not None:
+        queryset = queryset.filter(seq__lte=until)
+    if models is not None:
+        queryset = queryset.filter(model__in=models)
+    if center_id is not None:
+        queryset = queryset.filter(center_id=center_id)
+    return queryset.order_by('seq')
+
+
+def latest_seq(using=DEFAULT_DB_ALIAS):
+    return ChangeJournal.objects.using(using).aggregate(seq=Max('seq'))['seq'] or 0
+
+
+def compact(using=DEFAULT_DB_ALIAS):
+    """Delete entries superseded by a newer entry for the same row."""
+    newer = ChangeJournal.objects.using(using).filter(
+        model=OuterRef('model'), object_pk=OuterRef('object_pk'), seq__gt=OuterRef('seq')
+    )
+    deleted, _ = ChangeJournal.objects.using(using).filter(Exists(newer)).delete()
+    return deleted
+
+
+def purge(using=DEFAULT_DB_ALIAS):
+    """Delete deletion entries older than the retention window."""
+    cutoff = timezone.now() - timedelta(days=settings.CHANGE_JOURNAL_RETENTION_DAYS)
+    deleted, _ = ChangeJournal.objects.using(using).filter(operation='D', changed_at__lt=cutoff).delete()
+    return deleted
+
+
+def maintain(aliases=None):
+    """Compact and purge the journal of every database; returns entries removed."""
+    removed = 0
+    for alias in aliases or connections:
+        if ChangeJournal._meta.db_table in connections[alias].introspection.table_names():
+            removed += compact(alias) + purge(alias)
+    return removed
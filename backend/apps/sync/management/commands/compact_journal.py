@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.sync import journal
+
+
+class Command(BaseCommand):
+    help = "Drop superseded and expired change journal entries on every database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and compact every N seconds (default: run once)",
+        )
+        parser.add_argument('--database', help="Only compact this database alias")
+
+    def handle(self, *args, **options):
+        aliases = [options['database']] if options['database'] else None
+        while True:
+            removed = journal.maintain(aliases)
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed} journal entries"))
+            if not options['interval']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
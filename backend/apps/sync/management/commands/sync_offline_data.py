@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.authentication.models import Center
+from apps.sync.client import SyncClient, SyncError
+from apps.sync.engine import purge_applied_bundles
+from apps.sync.journal import maintain
+
+
+class Command(BaseCommand):
+    help = "Exchange changed rows of this center with HQ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Sync once instead of every SYNC_INTERVAL seconds")
+        parser.add_argument('--push-only', action='store_true', help="Only send local changes")
+        parser.add_argument('--pull-only', action='store_true', help="Only fetch changes from HQ")
+
+    def handle(self, *args, **options):
+        if not settings.SYNC_HQ_URL:
+            raise CommandError("SYNC_HQ_URL is not set")
+        try:
+            center = Center.objects.get(pk=settings.CENTER_ID)
+        except Center.DoesNotExist:
+            raise CommandError(f"CENTER_ID {settings.CENTER_ID} does not exist")
+
+        client = SyncClient()
+        while True:
+            try:
+                pushed = 0 if options['pull_only'] else client.push(center)
+                pulled = 0 if options['push_only'] else client.pull(center)
+                purge_applied_bundles()
+                removed = maintain()
+                self.stdout.write(self.style.SUCCESS(
+                    f"Pushed {pushed} and pulled {pulled} bundles; compacted {removed} journal entries"
+                ))
+            except SyncError as exc:
+                if options['once']:
+                    raise CommandError(str(exc))
+                self.stderr.write(f"Sync failed, retrying in {settings.SYNC_INTERVAL}s: {exc}")
+            if options['once']:
+                return
+            close_old_connections()
+            time.sleep(settings.SYNC_INTERVAL)
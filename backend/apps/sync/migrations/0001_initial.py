@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppliedBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bundle_id', models.UUIDField(unique=True)),
+                ('center_code', models.CharField(max_length=10)),
+                ('summary', models.JSONField(default=dict)),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Applied Bundle',
+                'verbose_name_plural': 'Applied Bundles',
+                'ordering': ['-applied_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_pk', models.BigIntegerField()),
+                ('center_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'ordering': ['deleted_at', 'id'],
+                'indexes': [models.Index(fields=['center_id', 'deleted_at', 'id'], name='tombstone_center_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('peer', models.CharField(max_length=255)),
+                ('direction', models.CharField(choices=[('push', 'Push'), ('pull', 'Pull')], max_length=4)),
+                ('model', models.CharField(max_length=100)),
+                ('updated_at', models.DateTimeField()),
+                ('object_pk', models.BigIntegerField()),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sync Watermark',
+                'verbose_name_plural': 'Sync Watermarks',
+                'unique_together': {('peer', 'direction', 'model')},
+            },
+        ),
+    ]
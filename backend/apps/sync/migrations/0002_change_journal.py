@@ -0,0 +1,91 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:43
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def reset_watermarks(apps, schema_editor):
+    # Per-model timestamps cannot be translated to journal seqs; peers
+    # resend from seq 0 and last-writer-wins skips rows they already have
+    SyncWatermark = apps.get_model('sync', 'SyncWatermark')
+    SyncWatermark.objects.using(schema_editor.connection.alias).all().delete()
+
+
+def install_journal(apps, schema_editor):
+    from apps.sync import journal
+    journal.seed_journal(schema_editor.connection)
+    journal.install_triggers(schema_editor.connection)
+
+
+def remove_journal(apps, schema_editor):
+    from apps.sync import journal
+    journal.remove_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('questions', '0002_question_question_keyset_idx'),
+        ('exams', '0003_exam_exam_keyset_idx'),
+        ('exam_results', '0005_composite_indexes'),
+        ('evaluation', '0004_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_watermarks, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='syncwatermark',
+            unique_together=set(),
+        ),
+        migrations.CreateModel(
+            name='ChangeJournal',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=100)),
+                ('object_pk', models.BigIntegerField()),
+                ('operation', models.CharField(choices=[('I', 'Insert'), ('U', 'Update'), ('D', 'Delete')], max_length=1)),
+                ('center_id', models.BigIntegerField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Change Journal Entry',
+                'verbose_name_plural': 'Change Journal',
+                'db_table': 'change_journal',
+                'ordering': ['seq'],
+            },
+        ),
+        migrations.DeleteModel(
+            name='Tombstone',
+        ),
+        migrations.AddField(
+            model_name='syncwatermark',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='changejournal',
+            index=models.Index(fields=['model', 'object_pk', 'seq'], name='change_journal_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changejournal',
+            index=models.Index(fields=['center_id', 'seq'], name='change_journal_center_idx'),
+        ),
+        migrations.RemoveField(
+            model_name='syncwatermark',
+            name='model',
+        ),
+        migrations.RemoveField(
+            model_name='syncwatermark',
+            name='object_pk',
+        ),
+        migrations.RemoveField(
+            model_name='syncwatermark',
+            name='updated_at',
+        ),
+        migrations.AlterUniqueTogether(
+            name='syncwatermark',
+            unique_together={('peer', 'direction')},
+        ),
+        migrations.RunPython(install_journal, remove_journal),
+    ]
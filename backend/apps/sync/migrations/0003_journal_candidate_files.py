@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:05
+
+from django.db import migrations
+
+
+FILE_MODELS = ['candidates.CandidatePhoto', 'candidates.CandidateDocument']
+
+
+def journal_candidate_files(apps, schema_editor):
+    from apps.sync import journal
+    journal.seed_journal(schema_editor.connection, labels=FILE_MODELS)
+    journal.install_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_change_journal'),
+        ('candidates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(journal_candidate_files, migrations.RunPython.noop),
+    ]
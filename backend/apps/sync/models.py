@@ -0,0 +1,79 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SyncWatermark(models.Model):
+    """
+    Last change-journal sequence number exchanged with a peer.
+
+    Push watermarks count in this node's journal, pull watermarks in the
+    peer's.
+    """
+    DIRECTIONS = [
+        ('push', 'Push'),
+        ('pull', 'Pull'),
+    ]
+    
+    peer = models.CharField(max_length=255)
+    direction = models.CharField(max_length=4, choices=DIRECTIONS)
+    seq = models.BigIntegerField(default=0)
+    synced_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['peer', 'direction']
+        verbose_name = 'Sync Watermark'
+        verbose_name_plural = 'Sync Watermarks'
+    
+    def __str__(self):
+        return f"{self.direction} @ {self.peer}: {self.seq}"
+
+
+class ChangeJournal(models.Model):
+    """
+    Append-only log of row changes, one entry per insert, update or delete.
+
+    Entries are written by database triggers (see ``journal.py``), so bulk
+    writes that send no signals are captured too. ``seq`` only grows, and
+    consumers read "everything after seq N" with a primary key range scan.
+    """
+    OPERATIONS = [
+        ('I', 'Insert'),
+        ('U', 'Update'),
+        ('D', 'Delete'),
+    ]
+    
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=100)
+    object_pk = models.BigIntegerField()
+    operation = models.CharField(max_length=1, choices=OPERATIONS)
+    center_id = models.BigIntegerField(null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'change_journal'
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['model', 'object_pk', 'seq'], name='change_journal_object_idx'),
+            models.Index(fields=['center_id', 'seq'], name='change_journal_center_idx'),
+        ]
+        verbose_name = 'Change Journal Entry'
+        verbose_name_plural = 'Change Journal'
+    
+    def __str__(self):
+        return f"#{self.seq} {self.operation} {self.model}#{self.object_pk}"
+
+
+class AppliedBundle(models.Model):
+    """Bundles already applied, so a retried delivery is acknowledged without work."""
+    bundle_id = models.UUIDField(unique=True)
+    center_code = models.CharField(max_length=10)
+    summary = models.JSONField(default=dict)
+    applied_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-applied_at']
+        verbose_name = 'Applied Bundle'
+        verbose_name_plural = 'Applied Bundles'
+    
+    def __str__(self):
+        return f"{self.bundle_id} from {self.center_code}"
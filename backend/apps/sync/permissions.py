@@ -0,0 +1,14 @@
+import hmac
+
+from django.conf import settings
+from rest_framework import permissions
+
+
+class HasSyncToken(permissions.BasePermission):
+    """
+    Allow nodes presenting the shared ``SYNC_TOKEN`` in ``X-Sync-Token``.
+    """
+    
+    def has_permission(self, request, view):
+        token = request.headers.get('X-Sync-Token', '')
+        return bool(settings.SYNC_TOKEN) and hmac.compare_digest(token, settings.SYNC_TOKEN)
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from apps.candidates.storage import BLOB_NAME
+
+
+class SyncPullSerializer(serializers.Serializer):
+    """Request body of a pull: the center and the last HQ journal seq it applied."""
+    center = serializers.CharField(max_length=10)
+    seq = serializers.IntegerField(min_value=0, default=0)
+
+
+class SyncBlobsSerializer(serializers.Serializer):
+    """Request body of a blob check: the blob names a bundle is about to reference."""
+    names = serializers.ListField(child=serializers.RegexField(BLOB_NAME), max_length=10000)
@@ -0,0 +1,202 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Max
+from django.test import LiveServerTestCase, TestCase, override_settings
+
+from apps.authentication.models import Center, User
+from apps.candidates.models import Candidate, CandidateDocument
+from apps.candidates.storage import candidate_file_storage
+from apps.exam_results.models import Result
+from apps.exams.models import Exam, ExamQuestion
+from apps.questions.models import Question
+from utils.sharding import replicate
+from utils.testing import make_candidate, make_center, make_exam, make_question, make_result, make_user
+from .client import SyncClient
+from .engine import SYNCED_MODELS, load_watermark
+from .journal import changes_since, committed_seq, journaling_paused, latest_seq
+from .models import AppliedBundle, ChangeJournal
+
+
+TOKEN = 'sync-test-token'
+
+# HQ keeps center 2's rows in a shard of its own; the center node keeps
+# them in its only database. Both nodes share ``default`` for users and
+# centers, which sync references by natural key anyway.
+HQ = {'CENTER_ID': 1, 'CENTER_SHARDS': [2]}
+NODE = {'CENTER_ID': 2, 'CENTER_SHARDS': []}
+HQ_ALIAS = 'center_2'
+
+
+class ChangeJournalTests(TestCase):
+    """The journal triggers, which differ between SQLite and PostgreSQL."""
+
+    def setUp(self):
+        self.center = make_center()
+        self.setter = make_user('setter', self.center)
+
+    def entries(self, since):
+        return [(entry.model, entry.object_pk, entry.operation, entry.center_id) for entry in changes_since(since)]
+
+    def test_writes_are_journaled_in_order(self):
+        start = latest_seq()
+        question = make_question(self.center, self.setter)
+        Question.objects.filter(pk=question.pk).update(marks=2)
+        exam = make_exam(self.center, self.setter, questions=[question])
+        paper = ExamQuestion.objects.get(exam=exam)
+        question_pk = question.pk
+        question.delete()
+        self.assertEqual(self.entries(start), [
+            ('questions.Question', question_pk, 'I', self.center.pk),
+            ('questions.Question', question_pk, 'U', self.center.pk),
+            ('exams.Exam', exam.pk, 'I', self.center.pk),
+            # Paper rows take their center from the exam
+            ('exams.ExamQuestion', paper.pk, 'I', self.center.pk),
+            ('exams.ExamQuestion', paper.pk, 'D', self.center.pk),
+            ('questions.Question', question_pk, 'D', self.center.pk),
+        ])
+        self.assertEqual(committed_seq(), latest_seq())
+
+    def test_paused_writes_are_not_journaled(self):
+        start = latest_seq()
+        with journaling_paused():
+            make_question(self.center, self.setter)
+        question = make_question(self.center, self.setter, question_text='Journaled?')
+        self.assertEqual(self.entries(start), [('questions.Question', question.pk, 'I', self.center.pk)])
+
+
+@override_settings(SYNC_TOKEN=TOKEN, **NODE)
+class SyncRoundTripTests(LiveServerTestCase):
+    """
+    Push and pull through the real client and HQ views over HTTP.
+
+    The live server stands in for HQ. Every request the client sends is
+    handled under HQ's settings, so HQ reads and writes its shard while the
+    center node reads and writes ``default``.
+    """
+
+    def setUp(self):
+        self.shard_dir = tempfile.mkdtemp()
+        # Each node stores candidate files in its own media directory
+        node_media, hq_media = (tempfile.mkdtemp(dir=self.shard_dir) for _ in range(2))
+        media = override_settings(MEDIA_ROOT=node_media)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.hq = {**HQ, 'MEDIA_ROOT': hq_media}
+        # A SQLite file whatever the default backend, like a center shard
+        shard = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(Path(self.shard_dir) / f'{HQ_ALIAS}.sqlite3')}
+        connections.settings[HQ_ALIAS] = connections.configure_settings({'default': {}, HQ_ALIAS: shard})[HQ_ALIAS]
+        call_command('migrate', database=HQ_ALIAS, run_syncdb=True, verbosity=0, interactive=False)
+
+        self.hq_center = make_center('HQ001', pk=1)
+        self.center = make_center('CTR002', pk=2)
+        self.setter = make_user('setter', self.center)
+        with self.settings(**self.hq):
+            replicate(Center.objects.all())
+            replicate(User.objects.all())
+
+        self.client_url = f'{self.live_server_url}/api/sync/'
+        self.sync = SyncClient(base_url=self.client_url, token=TOKEN)
+        post = self.sync._post
+
+        def post_to_hq(*args, **kwargs):
+            with self.settings(**self.hq):
+                return post(*args, **kwargs)
+
+        patcher = mock.patch.object(self.sync, '_post', side_effect=post_to_hq)
+        self.posts = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        connections[HQ_ALIAS].close()
+        del connections[HQ_ALIAS]
+        del connections.settings[HQ_ALIAS]
+        shutil.rmtree(self.shard_dir, ignore_errors=True)
+
+    def node_seq(self):
+        return ChangeJournal.objects.filter(center_id=self.center.pk, model__in=SYNCED_MODELS).aggregate(
+            seq=Max('seq')
+        )['seq']
+
+    def test_push_then_pull(self):
+        question = make_question(self.center, self.setter)
+        exam = make_exam(self.center, self.setter, questions=[question])
+        result = make_result(make_candidate(self.center, 'JC00001'), exam, marks_obtained=1)
+
+        self.assertEqual(self.sync.push(self.center), 1)
+
+        # HQ holds the center's rows in its shard, under the same keys
+        self.assertEqual(Question.objects.using(HQ_ALIAS).get(pk=question.pk).question_text, question.question_text)
+        self.assertEqual(Exam.objects.using(HQ_ALIAS).get(pk=exam.pk).created_by.username, 'setter')
+        self.assertEqual(Candidate.objects.using(HQ_ALIAS).get(pk=result.candidate_id).army_no, 'JC00001')
+        self.assertEqual(Result.objects.using(HQ_ALIAS).get(pk=result.pk).marks_obtained, 1)
+        self.assertEqual(AppliedBundle.objects.get().summary['saved'], 4)
+        self.assertEqual(load_watermark(self.client_url, 'push'), self.node_seq())
+        # Applied rows are not journaled at HQ, so nothing is pulled back
+        self.assertFalse(ChangeJournal.objects.using(HQ_ALIAS).exists())
+        self.assertEqual(self.sync.push(self.center), 0)
+
+        with self.settings(**self.hq):
+            Result.objects.using(HQ_ALIAS).filter(pk=result.pk).delete()
+            added = make_question(self.center, self.setter, question_text='Set at HQ?')
+            hq_seq = ChangeJournal.objects.using(HQ_ALIAS).aggregate(seq=Max('seq'))['seq']
+        self.assertEqual(added._state.db, HQ_ALIAS)
+        self.assertFalse(Question.objects.filter(question_text='Set at HQ?').exists())
+
+        self.assertEqual(self.sync.pull(self.center), 1)
+
+        self.assertEqual(Question.objects.get(pk=added.pk).question_text, 'Set at HQ?')
+        self.assertFalse(Result.objects.filter(pk=result.pk).exists())
+        self.assertEqual(load_watermark(self.client_url, 'pull'), hq_seq)
+        self.assertEqual(self.sync.pull(self.center), 0)
+
+    def blob_requests(self, action):
+        paths = [call.args[0] for call in self.posts.call_args_list]
+        return [path.split('/')[1] for path in paths if path.endswith(f'/{action}/')]
+
+    def test_files_travel_without_blobs_the_peer_holds(self):
+        candidate = make_candidate(self.center, 'JC00001')
+        held, new = b'%PDF-1.4 service certificate', b'%PDF-1.4 pan card'
+        with self.settings(**self.hq):
+            held_name = candidate_file_storage.save('held.pdf', ContentFile(held))
+        CandidateDocument.objects.create(
+            candidate=candidate, document_type='service_certificate', document=SimpleUploadedFile('cert.pdf', held)
+        )
+        document = CandidateDocument.objects.create(
+            candidate=candidate, document_type='pan', document=SimpleUploadedFile('pan.pdf', new)
+        )
+
+        self.assertEqual(self.sync.push(self.center), 1)
+
+        # Only the file HQ lacked was uploaded
+        self.assertEqual(self.blob_requests('upload'), [os.path.basename(document.document.name)])
+        self.assertEqual(
+            sorted(CandidateDocument.objects.using(HQ_ALIAS).values_list('document', flat=True)),
+            sorted([held_name, document.document.name]),
+        )
+        with self.settings(**self.hq):
+            self.assertTrue(candidate_file_storage.exists(document.document.name))
+
+        with self.settings(**self.hq):
+            hq_candidate = Candidate.objects.using(HQ_ALIAS).get(pk=candidate.pk)
+            medical = CandidateDocument.objects.using(HQ_ALIAS).create(
+                candidate=hq_candidate, document_type='medical_certificate',
+                document=SimpleUploadedFile('medical.pdf', b'%PDF-1.4 medical'),
+            )
+            CandidateDocument.objects.using(HQ_ALIAS).create(
+                candidate=hq_candidate, document_type='other', document=SimpleUploadedFile('copy.pdf', new),
+            )
+
+        self.assertEqual(self.sync.pull(self.center), 1)
+
+        # Only the file this node lacked was downloaded
+        self.assertEqual(self.blob_requests('download'), [os.path.basename(medical.document.name)])
+        self.assertEqual(CandidateDocument.objects.filter(candidate=candidate).count(), 4)
+        self.assertEqual(candidate_file_storage.open(medical.document.name).read(), b'%PDF-1.4 medical')
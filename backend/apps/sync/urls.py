@@ -0,0 +1,12 @@
+from django.urls import path
+from . import views
+
+app_name = 'sync'
+
+urlpatterns = [
+    path('push/', views.SyncPushView.as_view(), name='sync-push'),
+    path('pull/', views.SyncPullView.as_view(), name='sync-pull'),
+    path('blobs/', views.SyncBlobsView.as_view(), name='sync-blobs'),
+    path('blobs/<str:filename>/upload/', views.SyncBlobUploadView.as_view(), name='sync-blob-upload'),
+    path('blobs/<str:filename>/download/', views.SyncBlobDownloadView.as_view(), name='sync-blob-download'),
+]
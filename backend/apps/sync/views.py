@@ -0,0 +1,107 @@
+import os
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
+from django.http import FileResponse, Http404, HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.authentication.models import Center
+from apps.candidates.storage import BLOB_NAME, blob_name, candidate_file_storage
+from .engine import BundleError, apply_bundle, build_bundle, decode_bundle, encode_bundle, missing_blobs
+from .permissions import HasSyncToken
+from .serializers import SyncBlobsSerializer, SyncPullSerializer
+
+
+class SyncPushView(APIView):
+    """
+    Apply a gzip-compressed bundle of changes pushed by a center node.
+    """
+    authentication_classes = []
+    permission_classes = [HasSyncToken]
+    
+    def post(self, request, *args, **kwargs):
+        try:
+            bundle = decode_bundle(request.body)
+            summary = apply_bundle(bundle)
+        except BundleError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError as exc:
+            # Usually a referenced row the node has not sent yet; it retries
+            return Response({"detail": f"Bundle rejected: {exc}"}, status=status.HTTP_409_CONFLICT)
+        return Response({"bundle_id": bundle['bundle_id'], "applied": summary}, status=status.HTTP_200_OK)
+
+
+class SyncPullView(APIView):
+    """
+    Return the next bundle of changes for a center, or 204 when it is up to date.
+    """
+    authentication_classes = []
+    permission_classes = [HasSyncToken]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = SyncPullSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        center = Center.objects.filter(code=serializer.validated_data['center']).first()
+        if center is None:
+            return Response({"detail": "Unknown center"}, status=status.HTTP_404_NOT_FOUND)
+
+        bundle, _ = build_bundle(center, serializer.validated_data['seq'])
+        if bundle is None:
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+        return HttpResponse(encode_bundle(bundle), content_type='application/gzip')
+
+
+def requested_blob(filename):
+    """Blob name for a ``<sha256><ext>`` URL segment."""
+    sha256, ext = os.path.splitext(filename)
+    name = blob_name(sha256, ext)
+    if not BLOB_NAME.match(name):
+        raise Http404
+    return name
+
+
+class SyncBlobsView(APIView):
+    """
+    Report which of the named blobs this node lacks, so a peer sends only those.
+    """
+    authentication_classes = []
+    permission_classes = [HasSyncToken]
+
+    def post(self, request, *args, **kwargs):
+        serializer = SyncBlobsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({"missing": missing_blobs(serializer.validated_data['names'])})
+
+
+class SyncBlobUploadView(APIView):
+    """
+    Store a blob sent by a peer ahead of the bundle whose rows name it.
+
+    The rows take the references once applied; a blob they never reference
+    is pruned.
+    """
+    authentication_classes = []
+    permission_classes = [HasSyncToken]
+
+    def post(self, request, filename, *args, **kwargs):
+        name = requested_blob(filename)
+        if candidate_file_storage.save(name, ContentFile(request.body)) != name:
+            return Response({"detail": "Content does not match the blob name"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"name": name}, status=status.HTTP_201_CREATED)
+
+
+class SyncBlobDownloadView(APIView):
+    """
+    Return a blob named by a pulled bundle.
+    """
+    authentication_classes = []
+    permission_classes = [HasSyncToken]
+
+    def post(self, request, filename, *args, **kwargs):
+        name = requested_blob(filename)
+        try:
+            return FileResponse(candidate_file_storage.open(name, 'rb'), content_type='application/octet-stream')
+        except FileNotFoundError:
+            raise Http404
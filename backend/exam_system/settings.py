@@ -2,10 +2,11 @@
 Django settings for exam_system project.
 """
 
+import copy
 import os
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,6 +46,7 @@ LOCAL_APPS = [
     'apps.questions',
     'apps.exam_results',
     'apps.evaluation',
+    'apps.sync',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -84,10 +86,86 @@ WSGI_APPLICATION = 'exam_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# SQLite serves a single center; HQ deployments that aggregate many centers
+# set DB_ENGINE=postgresql. Connections come from an in-process pool of
+# DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE per worker (utils/backends/postgresql).
+# With DB_PGBOUNCER=True they go through a transaction-pooling pgbouncer
+# instead, which cannot hold server-side cursors across transactions, and are
+# kept open for DB_CONN_MAX_AGE seconds.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+DB_POOL = config('DB_POOL', default=not DB_PGBOUNCER, cast=bool)
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'utils.backends.postgresql',
+            'NAME': config('DB_NAME', default='exam_system'),
+            'USER': config('DB_USERNAME', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Pooled connections go back to the pool at the end of each request
+            'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=600, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+                'application_name': 'exam_system',
+            },
+            'TEST': {
+                'NAME': config('DB_TEST_NAME', default='test_exam_system'),
+            },
+        }
+    }
+    if DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=20, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=30, cast=int),  # seconds to wait for a connection
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+# SQLite production mode: WAL journalling and tuned pragmas on every
+# connection, persistent connections and a single-writer queue for the
+# write paths of hot endpoints (see utils/backends/sqlite3 and utils/writes.py).
+SQLITE_PRODUCTION_MODE = config('SQLITE_PRODUCTION_MODE', default=False, cast=bool)
+SQLITE_WRITE_QUEUE = config('SQLITE_WRITE_QUEUE', default=SQLITE_PRODUCTION_MODE, cast=bool)
+
+if SQLITE_PRODUCTION_MODE and DB_ENGINE == 'sqlite':
+    DATABASES['default'].update({
+        'ENGINE': 'utils.backends.sqlite3',
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=30000, cast=int),
+                'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+                'cache_size': config('SQLITE_CACHE_SIZE', default=-65536, cast=int),
+                'temp_store': 'MEMORY',
+            },
+        },
+    })
+
+# Cache
+# Local memory by default so offline centers need no extra services;
+# point CACHE_BACKEND/CACHE_LOCATION at Redis when several workers share data.
+# Without DEBUG, a process-local backend is reported at startup
+# (authentication.W001): each request then re-reads the user's revocation
+# stamp from the database.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='exam-system'),
     }
 }
 
@@ -139,7 +217,7 @@ AUTH_USER_MODEL = 'authentication.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -149,7 +227,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'utils.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': [
@@ -162,6 +240,12 @@ REST_FRAMEWORK = {
     }
 }
 
+# Seconds an opt-in (?count=true) list total is cached
+PAGINATION_COUNT_CACHE_TIMEOUT = config('PAGINATION_COUNT_CACHE_TIMEOUT', default=60, cast=int)
+
+# Default number of hits returned by candidate search
+CANDIDATE_SEARCH_LIMIT = config('CANDIDATE_SEARCH_LIMIT', default=20, cast=int)
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -190,6 +274,12 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Per-process cache of authenticated users; entries are revalidated against a
+# version held in the shared cache, so use a shared CACHE_BACKEND when running
+# several worker processes.
+AUTH_PRINCIPAL_CACHE_SIZE = config('AUTH_PRINCIPAL_CACHE_SIZE', default=10000, cast=int)
+AUTH_PRINCIPAL_CACHE_TTL = config('AUTH_PRINCIPAL_CACHE_TTL', default=300, cast=int)  # seconds
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
@@ -253,6 +343,12 @@ AXES_FAILURE_LIMIT = 5
 AXES_COOLOFF_TIME = 1  # hours
 AXES_LOCKOUT_TEMPLATE = 'authentication/lockout.html'
 
+# Buffered login-attempt recording and in-memory brute-force counters
+LOGIN_ATTEMPT_BATCH_SIZE = config('LOGIN_ATTEMPT_BATCH_SIZE', default=200, cast=int)
+LOGIN_ATTEMPT_FLUSH_INTERVAL_MS = config('LOGIN_ATTEMPT_FLUSH_INTERVAL_MS', default=500, cast=int)
+LOGIN_FAILURE_WINDOW = config('LOGIN_FAILURE_WINDOW', default=AXES_COOLOFF_TIME * 3600, cast=int)  # seconds
+LOGIN_FAILURE_LIMIT = config('LOGIN_FAILURE_LIMIT', default=AXES_FAILURE_LIMIT, cast=int)
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -319,11 +415,56 @@ OFFLINE_MODE = config('OFFLINE_MODE', default=True, cast=bool)
 CENTER_ID = config('CENTER_ID', default=1, cast=int)
 CENTER_NAME = config('CENTER_NAME', default='Default Center')
 SYNC_INTERVAL = config('SYNC_INTERVAL', default=3600, cast=int)  # seconds
+SYNC_HQ_URL = config('SYNC_HQ_URL', default='')  # e.g. https://hq.example/api/sync/
+SYNC_TOKEN = config('SYNC_TOKEN', default='')
+SYNC_BATCH_SIZE = config('SYNC_BATCH_SIZE', default=500, cast=int)
+SYNC_TIMEOUT = config('SYNC_TIMEOUT', default=60, cast=int)
+# Deletions stay in the change journal this long; peers must sync within it
+CHANGE_JOURNAL_RETENTION_DAYS = config('CHANGE_JOURNAL_RETENTION_DAYS', default=30, cast=int)
+
+# Per-center shards: comma separated center ids, each stored in its own
+# database (see utils/sharding.py). Empty keeps every center in "default".
+CENTER_SHARDS = config('CENTER_SHARDS', default='', cast=Csv(int))
+SHARD_DIR = config('SHARD_DIR', default=str(BASE_DIR / 'shards'))
+SHARD_FAN_OUT_WORKERS = config('SHARD_FAN_OUT_WORKERS', default=8, cast=int)
+
+for _center_id in CENTER_SHARDS:
+    _shard = copy.deepcopy(DATABASES['default'])
+    if DB_ENGINE == 'postgresql':
+        _shard['NAME'] = f"{_shard['NAME']}_center_{_center_id}"
+        _shard['TEST'] = {'NAME': f"{_shard['TEST']['NAME']}_center_{_center_id}"}
+    else:
+        _shard['NAME'] = os.path.join(SHARD_DIR, f'center_{_center_id}.sqlite3')
+    DATABASES[f'center_{_center_id}'] = _shard
+
+DATABASE_ROUTERS = ['utils.sharding.CenterRouter']
+
+# Seconds a compiled exam paper stays cached (it is also dropped on any change)
+EXAM_PAPER_CACHE_TIMEOUT = config('EXAM_PAPER_CACHE_TIMEOUT', default=6 * 3600, cast=int)
+
+# Estimated similarity at which questions are reported as near-duplicates
+QUESTION_DUPLICATE_THRESHOLD = config('QUESTION_DUPLICATE_THRESHOLD', default=0.7, cast=float)
+
+# Item analysis: cache lifetime (it is also recomputed whenever results or
+# questions change) and the p-values that bound the difficulty levels
+ITEM_ANALYSIS_CACHE_TIMEOUT = config('ITEM_ANALYSIS_CACHE_TIMEOUT', default=6 * 3600, cast=int)
+ITEM_ANALYSIS_EASY_P_VALUE = config('ITEM_ANALYSIS_EASY_P_VALUE', default=0.7, cast=float)
+ITEM_ANALYSIS_HARD_P_VALUE = config('ITEM_ANALYSIS_HARD_P_VALUE', default=0.3, cast=float)
+ITEM_ANALYSIS_MIN_CANDIDATES = config('ITEM_ANALYSIS_MIN_CANDIDATES', default=30, cast=int)
+
+# Answer autosave write-behind buffer
+AUTOSAVE_JOURNAL_DIR = config('AUTOSAVE_JOURNAL_DIR', default=str(BASE_DIR / 'journal'))
+AUTOSAVE_FLUSH_INTERVAL = config('AUTOSAVE_FLUSH_INTERVAL', default=5, cast=float)  # seconds
+AUTOSAVE_FSYNC = config('AUTOSAVE_FSYNC', default=True, cast=bool)
+AUTOSAVE_STATE_CACHE_TIMEOUT = config('AUTOSAVE_STATE_CACHE_TIMEOUT', default=300, cast=int)
 
 # Data Export/Import Settings
 EXPORT_FORMATS = ['json', 'xlsx', 'csv']
 IMPORT_FORMATS = ['json', 'xlsx', 'csv']
-MAX_EXPORT_SIZE = 10000  # Maximum records to export at once
+MAX_EXPORT_SIZE = config('MAX_EXPORT_SIZE', default=0, cast=int)  # 0 = no limit; exports are streamed
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)  # Rows fetched per database round trip
+CANDIDATE_IMPORT_BATCH_SIZE = config('CANDIDATE_IMPORT_BATCH_SIZE', default=2000, cast=int)
+QUESTION_IMPORT_BATCH_SIZE = config('QUESTION_IMPORT_BATCH_SIZE', default=5000, cast=int)
 
 # Jazzmin UI customizations (minimal)
 JAZZMIN_SETTINGS = {
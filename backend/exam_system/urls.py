@@ -21,6 +21,7 @@ urlpatterns = [
     path('api/questions/', include('apps.questions.urls')),
     path('api/results/', include('apps.exam_results.urls')),
     path('api/evaluation/', include('apps.evaluation.urls')),
+    path('api/sync/', include('apps.sync.urls')),
 ]
 
 # Serve media files in development
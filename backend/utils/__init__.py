@@ -0,0 +1 @@
+# Common utilities shared by the exam system apps
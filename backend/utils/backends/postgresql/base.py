@@ -0,0 +1,92 @@
+"""
+PostgreSQL backend with an in-process connection pool.
+
+Django 4.2 opens a connection per thread and either closes it at the end of
+the request or keeps it for ``CONN_MAX_AGE`` seconds, so every worker thread
+holds its own server connection. With ``OPTIONS['pool']`` set, connections
+are borrowed from a ``psycopg_pool.ConnectionPool`` instead and returned to
+it when Django closes them (use ``CONN_MAX_AGE=0``), so many threads and
+requests share ``max_size`` server connections.
+
+Pools are created lazily, one per process and database, so forked workers
+never share a parent's pool. The test database's pool is closed before the
+database is dropped.
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base, creation
+from psycopg_pool import ConnectionPool
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_pools(dbname=None):
+    """Close this process's pools, or only those connected to ``dbname``."""
+    with _pools_lock:
+        keys = [key for key in _pools if dbname is None or key[1] == dbname]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would block DROP DATABASE
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool_options(self):
+        return self.settings_dict['OPTIONS'].get('pool')
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Not a psycopg.connect() argument
+        params.pop('pool', None)
+        return params
+
+    def get_pool(self, conn_params):
+        key = (
+            os.getpid(), conn_params.get('dbname'), conn_params.get('user'),
+            conn_params.get('host'), conn_params.get('port'),
+        )
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = self.pool_options if isinstance(self.pool_options, dict) else {}
+                pool = _pools[key] = ConnectionPool(
+                    kwargs=conn_params,
+                    min_size=options.get('min_size', 1),
+                    max_size=options.get('max_size', 10),
+                    timeout=options.get('timeout', 30),
+                    check=ConnectionPool.check_connection,
+                    name=f'{self.alias}-{os.getpid()}',
+                    open=True,
+                )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_options:
+            return super().get_new_connection(conn_params)
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.getconn()
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = base.IsolationLevel(isolation_level or base.IsolationLevel.READ_COMMITTED)
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None or not self.pool_options:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Rolled back if needed; a broken connection is discarded
+            self.pool.putconn(self.connection)
@@ -0,0 +1,85 @@
+"""
+Sparse fieldsets for API responses.
+
+List screens rarely need every column of a model; a candidate alone has over
+forty. Clients name the fields they want with ``?fields=`` or the ones they
+do not with ``?omit=``, both comma separated. Dotted names reach into nested
+serializers, e.g. ``?fields=id,marks_obtained,candidate.army_no`` on results.
+
+``SparseFieldsetMixin`` drops the other fields from the serializer, and
+``RelatedQuerysetMixin`` (see ``queries.py``) narrows the view's SQL to the
+columns the remaining fields read. Fieldsets only apply when reading; writes
+always validate and return the full representation.
+"""
+from rest_framework import serializers
+
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_fieldset(value):
+    """Turn ``'id,candidate.army_no'`` into ``{'id': {}, 'candidate': {'army_no': {}}}``."""
+    tree = {}
+    for path in (value or '').split(','):
+        names = [name.strip() for name in path.split('.') if name.strip()]
+        node = tree
+        for name in names:
+            node = node.setdefault(name, {})
+    return tree
+
+
+def requested_fieldset(request):
+    """Raw ``(fields, omit)`` query parameters of ``request``, or empty strings."""
+    if request is None:
+        return '', ''
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    return params.get(FIELDS_PARAM, ''), params.get(OMIT_PARAM, '')
+
+
+def nested_serializer(field):
+    """The serializer rendering ``field``'s value, or ``None`` for plain fields."""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def prune_fields(fields, include=None, exclude=None):
+    """
+    Remove fields from a serializer's ``fields`` in place.
+
+    ``include`` and ``exclude`` are trees from ``parse_fieldset``. A name with
+    no children keeps (or drops) the whole field; children prune the nested
+    serializer. Unknown names are ignored.
+    """
+    for name in list(fields):
+        if include and name not in include:
+            del fields[name]
+            continue
+        sub_include = include.get(name) if include else None
+        sub_exclude = exclude.get(name) if exclude else None
+        if exclude and name in exclude and not sub_exclude:
+            del fields[name]
+            continue
+        nested = nested_serializer(fields[name])
+        if nested is not None and (sub_include or sub_exclude):
+            prune_fields(nested.fields, sub_include, sub_exclude)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin honouring ``?fields=`` and ``?omit=`` when reading.
+
+    Only the top-level serializer of a response looks at the request; nested
+    serializers are pruned through dotted names.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if hasattr(self, 'initial_data'):
+            return
+        fields, omit = requested_fieldset(self._context.get('request'))
+        if fields or omit:
+            prune_fields(self.fields, parse_fieldset(fields), parse_fieldset(omit))
@@ -0,0 +1,25 @@
+"""
+Stable 64-bit integer hashing for NumPy arrays.
+
+SplitMix64 finalisation is plain integer arithmetic, so the same input gives
+the same hash on every node, platform and NumPy version. Anything derived
+from these hashes and stored or compared across nodes (MinHash signatures,
+per-candidate shuffle orders) depends on the constants never changing.
+Arithmetic wraps modulo 2**64 by design; callers run it under
+``np.errstate(over='ignore')``.
+"""
+import numpy as np
+
+
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def mix(values):
+    """SplitMix64 finaliser of a ``uint64`` array."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * MIX_1
+    values = values ^ (values >> np.uint64(27))
+    values = values * MIX_2
+    return values ^ (values >> np.uint64(31))
@@ -0,0 +1,241 @@
+"""
+Project-wide keyset pagination.
+
+Page-number pagination runs ``COUNT(*)`` and an ``OFFSET`` scan on every
+request, which gets slower the deeper a client pages into large tables such
+as login attempts, results and candidates. ``KeysetPagination`` seeks from
+the last row of the previous page along the model's ordering instead, so
+every page costs the same indexed range scan.
+
+The cursor holds the whole sort key of that row, primary key included, and
+the next page starts strictly after it, e.g. ``timestamp < x OR (timestamp
+= x AND id < y)``. Rows sharing a timestamp, such as a batch of imports,
+never fall back to an ``OFFSET``. NULLs sort last ascending and first
+descending on every backend, so nullable orderings page correctly too.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+from .sharding import fan_out, FanOutQuery
+
+
+COUNT_CACHE_KEY = 'pagination-count:{digest}'
+
+
+def estimate_count(queryset):
+    """
+    Return a cheap row count for ``queryset``.
+
+    Unfiltered PostgreSQL tables use the planner's estimate; everything else
+    falls back to an exact count that is cached for a short while. Lists
+    spanning every shard add up the estimate of each.
+    """
+    if isinstance(queryset, FanOutQuery):
+        return sum(fan_out(lambda alias: estimate_count(queryset.queryset.using(alias))).values())
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+    key = COUNT_CACHE_KEY.format(digest=digest)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def order_expression(name, descending):
+    """``name`` in ``KeysetPagination`` order, with NULLs placed the same everywhere."""
+    if descending:
+        return F(name).desc(nulls_first=True)
+    return F(name).asc(nulls_last=True)
+
+
+def seek_filter(keys, values):
+    """
+    Rows strictly after ``values`` in the order of ``keys``.
+
+    ``keys`` is a list of ``(name, descending)`` pairs ending in a unique
+    field and ``values`` the sort key of the last row seen. Builds
+    ``k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...`` with NULL-aware comparisons.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(keys, values):
+        if value is None:
+            # NULLs come after every value descending and before none ascending
+            after = Q(**{f'{name}__isnull': False}) if descending else None
+            same = Q(**{f'{name}__isnull': True})
+        else:
+            after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+            if not descending:
+                after |= Q(**{f'{name}__isnull': True})
+            same = Q(**{name: value})
+        if after is not None:
+            condition |= equal & after
+        equal &= same
+    return condition
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the view's or model's ordering.
+
+    The primary key is appended as a tie-breaker so every row has a unique
+    sort key, and pages seek past the full key of the last row seen. Pass
+    ``?count=true`` to include an estimated total.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', ()):
+            if hasattr(backend, 'get_ordering'):
+                # Honour ?ordering= through the view's OrderingFilter
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = (
+            ordering
+            or getattr(view, 'ordering', None)
+            or queryset.model._meta.ordering
+            or ('-pk',)
+        )
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+
+        tie_breaker = '-pk' if ordering[0].startswith('-') else 'pk'
+        if not {'pk', '-pk', 'id', '-id'} & set(ordering):
+            ordering += (tie_breaker,)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = estimate_count(queryset)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            # Sort keys are unique, so cursors never need an offset
+            self.cursor = self.cursor._replace(offset=0)
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        keys = [(field.lstrip('-'), field.startswith('-') != reverse) for field in self.ordering]
+        queryset = queryset.order_by(*(order_expression(name, descending) for name, descending in keys))
+        if current_position is not None:
+            try:
+                values = json.loads(current_position)
+                if not isinstance(values, list) or len(values) != len(keys):
+                    raise ValueError(current_position)
+                queryset = queryset.filter(seek_filter(keys, values))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One extra row tells whether a page follows
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.next_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.previous_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        """The JSON-encoded sort key of ``instance``."""
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                if name == 'pk':
+                    name = instance._meta.pk.attname
+                else:
+                    try:
+                        name = instance._meta.get_field(name).attname
+                    except FieldDoesNotExist:
+                        pass
+                value = getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return json.dumps(values, separators=(',', ':'))
+
+    def get_paginated_response(self, data):
+        fields = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]
+        if self.count is not None:
+            fields.insert(0, ('count', self.count))
+        fields.append(('results', data))
+        return Response(OrderedDict(fields))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'example': 123,
+            'description': 'Estimated total, only present with ?count=true',
+        }
+        return response_schema
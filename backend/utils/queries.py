@@ -0,0 +1,186 @@
+"""
+Query planning helpers derived from serializer definitions.
+
+Nested read-only serializers make every row of a list page fetch its related
+objects one query at a time. ``plan_query`` walks a serializer tree and
+works out the ``select_related``/``prefetch_related`` paths that cover it,
+plus the columns its fields read, and ``RelatedQuerysetMixin`` applies them
+to a view's queryset. The columns narrow the SQL with ``only()`` when a
+client asks for a sparse fieldset (see ``fieldsets.py``).
+
+Method fields are opaque; a serializer lists what they read in
+``Meta.method_sources``, e.g. ``{'photo_variants': ['photo.photo']}``.
+Without it the model's columns are all loaded.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+from .fieldsets import parse_fieldset, prune_fields, requested_fieldset
+
+
+def _resolve(model, source_attrs):
+    """
+    Follow ``source_attrs`` through model relations.
+
+    Returns the relation path, the model at the end of it and whether any step
+    is to-many. Stops at the first attribute that is not a relation.
+    """
+    path, many = [], False
+    for attr in source_attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        path.append(attr)
+        many = many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return path, model, many
+
+
+def _is_column(model, name):
+    if name == 'pk':
+        return True
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return field.concrete and not field.many_to_many
+
+
+def _walk(serializer, model, prefix, in_prefetch, select, prefetch):
+    """
+    Add the relation paths ``serializer`` follows to ``select`` and ``prefetch``.
+
+    Returns the ``only()`` paths of the columns it reads, or ``None`` when a
+    field reads something that is not a column, such as a model property.
+    """
+    columns, known = set(), True
+    method_sources = getattr(getattr(serializer, 'Meta', None), 'method_sources', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in method_sources:
+                known = False
+                continue
+            sources = [source.split('.') for source in method_sources[name]]
+        elif field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                nested = _walk(field, model, prefix, in_prefetch, select, prefetch)
+                if nested is None:
+                    known = False
+                else:
+                    columns |= nested
+            continue
+        else:
+            sources = [field.source_attrs]
+
+        for attrs in sources:
+            path, related_model, many = _resolve(model, attrs)
+            if not path:
+                if attrs and _is_column(model, attrs[0]):
+                    columns.add(prefix + attrs[0])
+                elif attrs:
+                    known = False
+                continue
+            # A plain primary-key field reads the local foreign key column
+            if (
+                isinstance(field, RelatedField) and field.use_pk_only_optimization()
+                and len(path) == 1 and not many
+            ):
+                columns.add(prefix + path[0])
+                continue
+
+            full_path = prefix + '__'.join(path)
+            nested_prefetch = in_prefetch or many
+            (prefetch if nested_prefetch else select).add(full_path)
+
+            if isinstance(field, serializers.ListSerializer):
+                child = field.child
+            elif isinstance(field, ManyRelatedField):
+                child = field.child_relation
+            else:
+                child = field
+            if isinstance(child, serializers.BaseSerializer) and attrs is field.source_attrs:
+                nested = _walk(child, related_model, full_path + '__', nested_prefetch, select, prefetch)
+            else:
+                rest = attrs[len(path):]
+                nested = {f'{full_path}__{rest[0]}'} if rest and _is_column(related_model, rest[0]) else None
+
+            if many:
+                # Prefetched rows come from their own queries; this model
+                # only supplies a leading foreign key
+                if _is_column(model, path[0]):
+                    columns.add(prefix + path[0])
+            elif nested is None:
+                columns.add(full_path)
+            else:
+                columns |= nested or {f'{full_path}__{related_model._meta.pk.name}'}
+    return columns if known else None
+
+
+@lru_cache(maxsize=256)
+def plan_query(serializer_class, model, fields='', omit=''):
+    """
+    Return ``(select_related, prefetch_related, only)`` for ``serializer_class``.
+
+    Forward single-valued relations reached without crossing a to-many
+    relation are joined; everything below a to-many relation is prefetched.
+    ``fields`` and ``omit`` are the sparse fieldset parameters; ``only`` is
+    ``None`` when the columns read cannot be worked out.
+    """
+    serializer = serializer_class()
+    prune_fields(serializer.fields, parse_fieldset(fields), parse_fieldset(omit))
+    select, prefetch = set(), set()
+    columns = _walk(serializer, model, '', False, select, prefetch)
+    return (
+        tuple(sorted(select)),
+        tuple(sorted(prefetch)),
+        None if columns is None else tuple(sorted(columns)),
+    )
+
+
+def plan_related(serializer_class, model):
+    """Return ``(select_related, prefetch_related)`` paths for ``serializer_class``."""
+    return plan_query(serializer_class, model)[:2]
+
+
+class RelatedQuerysetMixin:
+    """
+    View mixin that loads everything the serializer will render, and no more.
+
+    The relation paths are computed once per serializer class and fieldset,
+    so the number of queries for a page no longer grows with the number of
+    rows on it. Reads with ``?fields=`` or ``?omit=`` select only the
+    columns the remaining fields need.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, omit = '', ''
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            fields, omit = requested_fieldset(self.request)
+        select, prefetch, columns = plan_query(self.get_serializer_class(), queryset.model, fields, omit)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if (fields or omit) and columns is not None:
+            queryset = queryset.only(*columns, *self._ordering_columns(queryset))
+        return queryset
+    
+    def _ordering_columns(self, queryset):
+        # Keyset pagination reads the ordering values of the page's rows
+        paginator = self.paginator
+        if hasattr(paginator, 'get_ordering'):
+            ordering = paginator.get_ordering(self.request, queryset, self)
+        else:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+        names = (str(name).lstrip('-') for name in ordering)
+        return [name for name in names if '__' not in name and _is_column(queryset.model, name)]
@@ -0,0 +1,307 @@
+"""
+Per-center database shards.
+
+With ``CENTER_SHARDS`` set, every center listed gets its own database alias
+(``center_<id>``) and the center-scoped apps (candidates, questions, exams,
+results and evaluations) are routed to the shard of the row's center, so
+writes at one center never contend with another's. Users, centers, sessions
+and login attempts stay in ``default``; users and centers are copied to every
+shard so foreign keys resolve locally and each shard is a self-contained
+center database.
+
+Queries without a center in their hints go to the local center
+(``CENTER_ID``), or to ``default`` when the local center has no shard of its
+own; centers without a shard share that database. Cross-center reports use
+``fan_out`` and ``fan_out_list`` to run a query on every shard concurrently
+and merge the results.
+
+Primary keys are only unique within a shard. API views therefore resolve
+single rows on the shard of the center named by ``?center=`` (default: the
+user's own center) through ``CenterShardMixin``, and lists without
+``?center=`` read every shard.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter, itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, models, router, DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.db.models.expressions import OrderBy
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+SHARDED_APPS = {'candidates', 'questions', 'exams', 'exam_results', 'evaluation'}
+
+ALIAS_FORMAT = 'center_{center_id}'
+
+
+def sharding_enabled():
+    return bool(settings.CENTER_SHARDS)
+
+
+def center_alias(center_id):
+    """Database alias holding ``center_id``'s rows."""
+    if not sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    if center_id not in settings.CENTER_SHARDS:
+        # Centers without a shard of their own share the local center's
+        # database, which is ``default`` when the local center has no shard
+        if settings.CENTER_ID not in settings.CENTER_SHARDS:
+            return DEFAULT_DB_ALIAS
+        center_id = settings.CENTER_ID
+    return ALIAS_FORMAT.format(center_id=center_id)
+
+
+def shard_aliases():
+    """
+    Every database holding center-scoped rows.
+
+    That is each shard, plus ``default`` when the local center has no shard,
+    or just ``default`` when sharding is off.
+    """
+    if not sharding_enabled():
+        return [DEFAULT_DB_ALIAS]
+    aliases = [ALIAS_FORMAT.format(center_id=center_id) for center_id in settings.CENTER_SHARDS]
+    if settings.CENTER_ID not in settings.CENTER_SHARDS:
+        aliases.insert(0, DEFAULT_DB_ALIAS)
+    return aliases
+
+
+def replica_aliases():
+    """Shards that hold copies of the global rows kept in ``default``."""
+    return [alias for alias in shard_aliases() if alias != DEFAULT_DB_ALIAS]
+
+
+def is_sharded(model):
+    return sharding_enabled() and model._meta.app_label in SHARDED_APPS
+
+
+class CenterRouter:
+    """Route center-scoped models to the shard of their center."""
+
+    def _shard_for(self, model, instance=None):
+        if not is_sharded(model):
+            return None
+        if instance is not None:
+            if instance._meta.label == settings.AUTH_USER_MODEL or instance._meta.model_name == 'center':
+                # Hint from assigning a global row, e.g. ``exam.center = center``
+                center_id = instance.pk if instance._meta.model_name == 'center' else instance.center_id
+                if center_id:
+                    return center_alias(center_id)
+            elif getattr(instance, 'center_id', None):
+                return center_alias(instance.center_id)
+            elif instance._state.db in shard_aliases():
+                # Children such as answers follow the row they were loaded through
+                return instance._state.db
+        return center_alias(settings.CENTER_ID)
+
+    def db_for_read(self, model, **hints):
+        return self._shard_for(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._shard_for(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Global rows are replicated to every shard
+        if sharding_enabled():
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Shards carry the full schema so each is a complete center database
+        return None
+
+
+class CenterQuerySet(models.QuerySet):
+    """
+    Queryset whose ``create``/``bulk_create`` honour the router per object.
+
+    Django resolves the database of ``create()`` and ``bulk_create()`` before
+    it sees the objects, which would put every new row in the local shard.
+    """
+
+    def create(self, **kwargs):
+        if self._db is not None or not is_sharded(self.model):
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True)
+        return obj
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if self._db is not None or not is_sharded(self.model):
+            return super().bulk_create(objs, *args, **kwargs)
+        groups = defaultdict(list)
+        for obj in objs:
+            groups[router.db_for_write(self.model, instance=obj)].append(obj)
+        created = []
+        for alias, group in groups.items():
+            created.extend(super(CenterQuerySet, self.using(alias)).bulk_create(group, *args, **kwargs))
+        return created
+
+
+CenterManager = models.Manager.from_queryset(CenterQuerySet)
+
+
+def replicate(instances, batch_size=1000):
+    """
+    Upsert global rows (users, centers) into every shard.
+
+    Uses ``bulk_create`` so the copies send no signals.
+    """
+    instances = list(instances)
+    if not sharding_enabled() or not instances:
+        return
+    model = type(instances[0])
+    fields = model._meta.concrete_fields
+    for alias in replica_aliases():
+        copies = [model(**{field.attname: getattr(instance, field.attname) for field in fields}) for instance in instances]
+        model._base_manager.using(alias).bulk_create(
+            copies,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=[model._meta.pk.name],
+            update_fields=[field.name for field in fields if not field.primary_key],
+        )
+
+
+def fan_out(fn, aliases=None):
+    """
+    Call ``fn(alias)`` for every shard concurrently.
+
+    Returns ``{alias: result}``. Each worker closes its connections, which are
+    thread-local and would otherwise leak.
+    """
+    aliases = list(aliases or shard_aliases())
+    if len(aliases) == 1:
+        return {aliases[0]: fn(aliases[0])}
+
+    def run(alias):
+        try:
+            return fn(alias)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=min(len(aliases), settings.SHARD_FAN_OUT_WORKERS)) as executor:
+        return dict(zip(aliases, executor.map(run, aliases)))
+
+
+def fan_out_list(queryset, limit=None):
+    """
+    Evaluate ``queryset`` on every shard and merge the rows in its ordering.
+
+    ``limit`` caps both each shard's fetch and the merged result.
+    """
+    def fetch(alias):
+        shard_queryset = queryset.using(alias)
+        return list(shard_queryset[:limit] if limit else shard_queryset)
+
+    rows = [row for shard_rows in fan_out(fetch).values() for row in shard_rows]
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    # Stable sorts from the last key to the first honour mixed directions;
+    # NULLs sort last ascending and first descending
+    for field in reversed(ordering):
+        if isinstance(field, OrderBy) and isinstance(field.expression, F):
+            field = ('-' if field.descending else '') + field.expression.name
+        if not isinstance(field, str) or '__' in field:
+            continue
+        name = field.lstrip('-')
+        if isinstance(rows[0] if rows else None, dict):
+            key = itemgetter(name)
+        else:
+            try:
+                name = queryset.model._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                if name == 'pk':
+                    name = queryset.model._meta.pk.attname
+            key = attrgetter(name)
+        rows.sort(key=lambda row, key=key: (key(row) is None, key(row)), reverse=field.startswith('-'))
+    return rows[:limit] if limit else rows
+
+
+def requested_center_id(request):
+    """
+    Center a request is about: ``?center=``, else the user's own center,
+    else the local ``CENTER_ID``.
+    """
+    params = getattr(request, 'query_params', request.GET)
+    value = params.get('center')
+    if value:
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({'center': 'A valid integer is required.'})
+    return getattr(request.user, 'center_id', None) or settings.CENTER_ID
+
+
+def request_alias(request):
+    """Database alias of the center a request is about."""
+    return center_alias(requested_center_id(request))
+
+
+class FanOutQuery:
+    """
+    Read-only stand-in for a queryset spanning every shard.
+
+    Supports what list views, ``KeysetPagination`` and exports use:
+    ``filter``, ``order_by``, ``count``, iteration and slicing. A slice
+    fetches up to its end from each shard and merges the rows in the
+    queryset's ordering (see ``fan_out_list``).
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self.model = queryset.model
+
+    def filter(self, *args, **kwargs):
+        return FanOutQuery(self.queryset.filter(*args, **kwargs))
+
+    def order_by(self, *fields):
+        return FanOutQuery(self.queryset.order_by(*fields))
+
+    def shard_querysets(self):
+        return [self.queryset.using(alias) for alias in shard_aliases()]
+
+    def count(self):
+        return sum(fan_out(lambda alias: self.queryset.using(alias).count()).values())
+
+    def __iter__(self):
+        return iter(fan_out_list(self.queryset))
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError("FanOutQuery only supports slices without a step")
+        return fan_out_list(self.queryset, limit=item.stop)[item.start or 0:]
+
+
+class CenterShardMixin:
+    """
+    Run a generic view's queries on the shard of the center it is about.
+
+    Detail, update and delete views look rows up on the shard of
+    ``requested_center_id``, e.g. ``/api/exams/1/?center=2``. List views
+    without ``?center=`` read every shard and merge the page.
+    """
+
+    def fans_out(self):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        return (
+            len(shard_aliases()) > 1
+            and self.request.method in SAFE_METHODS
+            and lookup not in self.kwargs
+            and 'center' not in self.request.query_params
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not sharding_enabled() or self.fans_out():
+            return queryset
+        return queryset.using(request_alias(self.request))
+
+    def paginate_queryset(self, queryset):
+        if self.fans_out():
+            queryset = FanOutQuery(queryset)
+        return super().paginate_queryset(queryset)
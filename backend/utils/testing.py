@@ -0,0 +1,94 @@
+"""
+Test helpers shared by the app test suites.
+"""
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.authentication.models import Center, User
+from apps.candidates.models import Candidate
+from apps.exam_results.models import Result
+from apps.exams.models import Exam, ExamQuestion
+from apps.questions.models import Question
+
+
+class QueryCountTestMixin:
+    """
+    ``TestCase`` mixin for checking that list endpoints avoid N+1 queries.
+    """
+
+    def assertConstantQueries(self, url, add_rows, batches=(1, 10), client=None):
+        """
+        Assert that ``url`` issues the same number of queries as rows grow.
+
+        ``add_rows(n)`` must create ``n`` more rows visible at ``url``. The
+        endpoint is fetched after each batch and the query counts compared.
+        """
+        client = client or self.client
+        counts = []
+        for size in batches:
+            add_rows(size)
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:500])
+            counts.append(len(context.captured_queries))
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"Query count for {url} grew with the number of rows: {counts}"
+        )
+        return counts[0]
+
+
+# Builders for the smallest valid row of each model
+
+def make_center(code='CTR001', **fields):
+    defaults = {
+        'name': f'{code} Center', 'address': 'HQ Complex', 'city': 'New Delhi', 'state': 'Delhi',
+        'contact_person': 'Admin', 'contact_email': 'admin@example.com', 'contact_phone': '9999999999',
+    }
+    return Center.objects.create(code=code, **{**defaults, **fields})
+
+
+def make_user(username, center=None, user_type='admin', password=None, **fields):
+    # No password by default: hashing one is most of a test's run time
+    return User.objects.create_user(
+        username=username, password=password, email=f'{username}@example.com',
+        user_type=user_type, center=center, **fields
+    )
+
+
+def make_candidate(center, army_no, **fields):
+    defaults = {
+        'rank': 'Sepoy', 'first_name': 'Test', 'last_name': army_no, 'date_of_birth': date(2000, 1, 1),
+        'gender': 'M', 'phone_number': '9999999999', 'address': 'Lines', 'city': 'Delhi', 'state': 'Delhi',
+        'pincode': '110001', 'father_name': 'Father', 'enrollment_date': date(2020, 1, 1),
+        'trade': 'Clerk', 'unit': '1 Signals',
+    }
+    return Candidate.objects.create(center=center, army_no=army_no, **{**defaults, **fields})
+
+
+def make_question(center, created_by, **fields):
+    defaults = {
+        'question_text': 'Capital of India?', 'option_a': 'Mumbai', 'option_b': 'Delhi',
+        'option_c': 'Kolkata', 'option_d': 'Chennai', 'correct_answer': 'B', 'marks': 1,
+    }
+    return Question.objects.create(center=center, created_by=created_by, **{**defaults, **fields})
+
+
+def make_exam(center, created_by, questions=(), **fields):
+    defaults = {
+        'title': 'General Knowledge Test', 'start_date': timezone.now() - timedelta(minutes=10),
+        'end_date': timezone.now() + timedelta(hours=1), 'duration_minutes': 60,
+        'status': 'ongoing', 'total_marks': len(questions) or 1,
+    }
+    exam = Exam.objects.create(center=center, created_by=created_by, **{**defaults, **fields})
+    for order, question in enumerate(questions, start=1):
+        ExamQuestion.objects.create(exam=exam, question=question, order=order)
+    return exam
+
+
+def make_result(candidate, exam, **fields):
+    defaults = {'total_marks': exam.total_marks, 'status': 'completed'}
+    return Result.objects.create(candidate=candidate, exam=exam, center=exam.center, **{**defaults, **fields})
@@ -0,0 +1,126 @@
+"""
+Single-writer queue for SQLite.
+
+SQLite allows one writer at a time. When many request threads write at once
+they spin on the database lock until ``busy_timeout`` expires, which shows up
+as tail latency and ``database is locked`` errors. With ``SQLITE_WRITE_QUEUE``
+enabled, the write paths of hot endpoints are handed to one writer thread per
+process and database and executed in arrival order, while reads keep running
+concurrently against the WAL snapshot. Each center shard is its own SQLite
+file with its own lock, so each gets its own writer.
+"""
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, DEFAULT_DB_ALIAS
+
+
+class WriteQueue:
+    """Run write callables for one database one at a time on a dedicated thread."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+                return
+            # A forked worker needs its own thread
+            self.pid = os.getpid()
+            self.jobs = queue.Queue()
+            self.thread = threading.Thread(target=self.run, name=f'sqlite-writer-{self.using}', daemon=True)
+            self.thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, fn, *args, **kwargs):
+        self.start()
+        future = Future()
+        self.jobs.put((future, fn, args, kwargs))
+        return future
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.jobs.put(None)
+            self.thread.join(timeout=5)
+
+    def on_writer_thread(self):
+        return threading.current_thread() is self.thread
+
+
+write_queues = {}
+_write_queues_lock = threading.Lock()
+
+
+def get_write_queue(using=DEFAULT_DB_ALIAS):
+    with _write_queues_lock:
+        if using not in write_queues:
+            write_queues[using] = WriteQueue(using)
+        return write_queues[using]
+
+
+def on_writer_thread():
+    return any(write_queue.on_writer_thread() for write_queue in list(write_queues.values()))
+
+
+def queue_enabled(using=DEFAULT_DB_ALIAS):
+    return settings.SQLITE_WRITE_QUEUE and connections[using].vendor == 'sqlite'
+
+
+def run_serialized(fn, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Call ``fn`` through the write queue of ``using`` and return its result.
+
+    ``using`` must be the database ``fn`` writes to. Runs inline when the
+    queue is disabled, on a writer thread itself, or inside an open
+    transaction, whose lock the writer thread could never get.
+    """
+    if (
+        not queue_enabled(using)
+        or on_writer_thread()
+        or connections[using].in_atomic_block
+    ):
+        return fn(*args, **kwargs)
+    return get_write_queue(using).submit(fn, *args, **kwargs).result()
+
+
+class SerializedWriteMixin:
+    """
+    Route a generic view's create/update/destroy through the write queue.
+
+    New rows are queued for the database of their ``center``, existing ones
+    for the database they were loaded from.
+    """
+
+    def perform_create(self, serializer):
+        model = serializer.Meta.model
+        using = router.db_for_write(model, instance=serializer.validated_data.get('center'))
+        run_serialized(super().perform_create, serializer, using=using)
+
+    def perform_update(self, serializer):
+        run_serialized(super().perform_update, serializer, using=serializer.instance._state.db)
+
+    def perform_destroy(self, instance):
+        run_serialized(super().perform_destroy, instance, using=instance._state.db)